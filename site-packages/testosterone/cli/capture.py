@@ -0,0 +1,174 @@
+"""Capture what each test writes to stdout and stderr, in bounded memory.
+
+While a test runs, sys.stdout and sys.stderr are each replaced by a Capture.
+A Capture holds output in memory up to a limit, and past that spills it to a
+file in the capture directory, writing straight through to the file from then
+on, so a test that prints without end costs us disk, not memory.
+
+When a test fails or errs, its output is kept on disk, and a line is added to
+the end of its traceback in the report for each stream it wrote to:
+
+    <OUTPUT> <stream> <size> <path>
+
+The output of passing tests is thrown away.
+
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+from testosterone.cli.failfast import StoppingResult
+from testosterone.cli.utils import OUTPUT
+
+
+DEBUGGERS = ('bdb', 'cmd', 'pdb') # modules whose output we don't capture
+
+
+class Capture:
+    """Stand in for sys.stdout or sys.stderr while a test runs.
+
+    Output from the debugger goes straight through to the real stream, so that
+    an interactive parent can still talk to pdb.
+
+    """
+
+    limit = 64 << 10    # the most bytes we hold in memory before spilling
+    file = None         # our spill file, once we have one
+    path = None         # the path to our spill file
+
+
+    def __init__(self, stream, name, directory):
+        """Takes the stream we stand in for, its name, and a directory path.
+        """
+        self.stream = stream
+        self.name = name    # 'stdout' or 'stderr'
+        self.directory = directory
+        self.chunks = []    # output held in memory
+        self.buffered = 0   # the number of bytes in chunks
+        self.size = 0       # the number of bytes written all told
+
+    def write(self, data):
+        if sys._getframe(1).f_globals.get('__name__') in DEBUGGERS:
+            self.stream.write(data)
+            return
+        if isinstance(data, unicode):
+            data = data.encode('utf-8', 'replace')
+        self.size += len(data)
+        if self.file is not None:
+            self.file.write(data)
+        else:
+            self.chunks.append(data)
+            self.buffered += len(data)
+            if self.buffered > self.limit:
+                self.spill()
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def isatty(self):
+        return False
+
+
+    def spill(self):
+        """Move the output we hold in memory to a new file in our directory.
+        """
+        fd, self.path = tempfile.mkstemp( dir=self.directory
+                                        , prefix=self.name + '-'
+                                        , suffix='.txt'
+                                         )
+        self.file = os.fdopen(fd, 'wb')
+        self.file.write(''.join(self.chunks))
+        self.chunks = []
+        self.buffered = 0
+
+    def keep(self):
+        """Put all of our output on disk, and return an OUTPUT line for it.
+
+        If nothing was written we keep nothing, and return None.
+
+        """
+        if self.size == 0:
+            return None
+        if self.file is None:
+            self.spill()
+        self.file.close()
+        self.file = None
+        return ' '.join((OUTPUT, self.name, str(self.size), self.path))
+
+    def discard(self):
+        """Throw away our output.
+        """
+        self.chunks = []
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            os.remove(self.path)
+
+
+class CapturingResult(StoppingResult):
+    """A test result that captures output per test, and notes it on failures.
+
+    Given a Budget, we also stop when it's exhausted; see the failfast module.
+
+    """
+
+    def __init__(self, stream, descriptions, verbosity, directory,
+                 budget=None):
+        StoppingResult.__init__(self, stream, descriptions, verbosity, budget)
+        self.directory = directory
+        self.captures = ()  # our Captures for stdout and stderr
+
+    def startTest(self, test):
+        StoppingResult.startTest(self, test)
+        self.captures = ( Capture(sys.stdout, 'stdout', self.directory)
+                        , Capture(sys.stderr, 'stderr', self.directory)
+                         )
+        sys.stdout, sys.stderr = self.captures
+
+    def stopTest(self, test):
+        """Put the real streams back, then keep or discard what we captured.
+
+        A failure or error has already been recorded by now, with its traceback
+        as text, and we append OUTPUT lines to that text. Output from tearDown
+        is included, since it runs after the failure is recorded.
+
+        """
+        captures, self.captures = self.captures, ()
+        sys.stdout, sys.stderr = [capture.stream for capture in captures]
+        StoppingResult.stopTest(self, test)
+        for flops in (self.errors, self.failures):
+            if flops and flops[-1][0] is test:
+                lines = [capture.keep() for capture in captures]
+                lines = [line for line in lines if line is not None]
+                if lines:
+                    text = flops[-1][1]
+                    if not text.endswith('\n'):
+                        text += '\n'
+                    flops[-1] = (test, text + '\n'.join(lines) + '\n')
+                return
+        for capture in captures:
+            capture.discard()
+
+
+class CapturingRunner(unittest.TextTestRunner):
+    """A test runner that captures output into files in directory.
+    """
+
+    def __init__(self, stream, directory, budget=None):
+        unittest.TextTestRunner.__init__(self, stream)
+        self.directory = directory
+        self.budget = budget
+
+    def _makeResult(self):
+        return CapturingResult( self.stream
+                              , self.descriptions
+                              , self.verbosity
+                              , self.directory
+                              , self.budget
+                               )
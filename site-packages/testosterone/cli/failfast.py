@@ -0,0 +1,65 @@
+"""Stop running tests after so many failures, for --fail-fast.
+
+A Budget is shared by the runs of all of the TestCases in a summary report,
+and each failure or error spends one from it. Once it's spent, the run in
+progress stops before its next test, and no more TestCases are run.
+
+"""
+import unittest
+
+
+class Budget:
+    """Count failures and errors across test runs, up to a limit.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.spent = 0
+
+    def spend(self):
+        self.spent += 1
+
+    def exhausted(self):
+        return self.spent >= self.limit
+
+
+class StoppingResult(unittest._TextTestResult):
+    """A test result that stops its run once a Budget is exhausted.
+
+    Without a Budget, this is just a _TextTestResult.
+
+    """
+
+    def __init__(self, stream, descriptions, verbosity, budget=None):
+        unittest._TextTestResult.__init__(self, stream, descriptions, verbosity)
+        self.budget = budget
+
+    def addError(self, test, err):
+        unittest._TextTestResult.addError(self, test, err)
+        self.spend()
+
+    def addFailure(self, test, err):
+        unittest._TextTestResult.addFailure(self, test, err)
+        self.spend()
+
+    def spend(self):
+        if self.budget is not None:
+            self.budget.spend()
+            if self.budget.exhausted():
+                self.stop()
+
+
+class StoppingRunner(unittest.TextTestRunner):
+    """A test runner whose runs stop once a Budget is exhausted.
+    """
+
+    def __init__(self, stream, budget=None):
+        unittest.TextTestRunner.__init__(self, stream)
+        self.budget = budget
+
+    def _makeResult(self):
+        return StoppingResult( self.stream
+                             , self.descriptions
+                             , self.verbosity
+                             , self.budget
+                              )
@@ -0,0 +1,80 @@
+"""Hunt for TestCases that leak, for --hunt-leaks.
+
+We run a TestCase several times in the same process, and take a footprint
+after each run: the number of objects the garbage collector tracks, the total
+reference count (on debug builds of Python only), the number of open file
+descriptors (where we can count them), and the number of live threads. The
+first run warms up imports and caches, so its footprint is our baseline, and a
+TestCase leaks a resource if the count grows on every run after that.
+
+Counts are kept as ints in lists made up front, so that keeping them doesn't
+itself show up as more objects.
+
+"""
+import gc
+import os
+import sys
+import threading
+
+
+def count_objects():
+    return len(gc.get_objects())
+
+def count_fds():
+    """Return the number of open file descriptors, or None if we can't tell.
+    """
+    for path in ('/proc/self/fd', '/dev/fd'):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            pass
+    return None
+
+
+RESOURCES = [('objects', count_objects)]   # [(name, counter)]
+if hasattr(sys, 'gettotalrefcount'):        # debug builds
+    RESOURCES.append(('refs', sys.gettotalrefcount))
+if count_fds() is not None:
+    RESOURCES.append(('fds', count_fds))
+RESOURCES.append(('threads', threading.activeCount))
+
+
+def footprint(counts):
+    """Given a list of lists, one per resource, append the current counts.
+    """
+    gc.collect()
+    for i in range(len(RESOURCES)):
+        counts[i].append(RESOURCES[i][1]())
+
+
+def growth(counts):
+    """Given a list of lists of counts, one per resource, return what grew.
+
+    The return value is a list of (name, first, last) for the resources whose
+    counts grew at every step. One step could just be noise, so we need two.
+
+    """
+    out = []
+    for i in range(len(RESOURCES)):
+        series = counts[i]
+        steps = zip(series[:-1], series[1:])
+        flat = [1 for before, after in steps if after <= before]
+        if len(steps) >= 2 and not flat:
+            out.append((RESOURCES[i][0], series[0], series[-1]))
+    return out
+
+
+def hunt(run, n):
+    """Given a callable that runs a TestCase, and an int, hunt for leaks.
+
+    The TestCase has just been run once, and we call run n-1 more times,
+    taking a footprint before the first call and after each. We return a list
+    of (name, first, last) per growth.
+
+    """
+    counts = [[] for resource in RESOURCES]
+    footprint(counts)
+    for i in range(n - 1):
+        run()
+        footprint(counts)
+    return growth(counts)
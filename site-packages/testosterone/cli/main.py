@@ -2,12 +2,15 @@
 
     http://www.artima.com/weblogs/viewpost.jsp?thread=4829
 
+We import as little as we can up front, since we are run once for the curses
+interface and then again in a child process for every refresh. The reporters
+are only needed in scripted mode, and the curses interface only otherwise, and
+logging is only configured if asked for with -v or --log.
+
 """
 import getopt
 import sys
 
-from testosterone.cli.reporters import detail, summarize
-
 
 WINDOWS = sys.platform.find('win') == 0
 
@@ -22,49 +25,182 @@ def main(argv=None):
         argv = sys.argv
     try:
         try:
-            short = "fst:x:"
-            long_ = [ "find-only"
+            short = "fst:vx:"
+            long_ = [ "allow-flaky"
+                    , "bisect-pollution="
+                    , "bisect-trial="
+                    , "capture="
+                    , "fail-fast="
+                    , "find-only"
+                    , "hunt-leaks="
+                    , "log="
+                    , "memory"
+                    , "progress"
+                    , "random-order="
+                    , "rerun-failures="
                     , "scripted"
+                    , "spool="
+                    , "test="
                     , "testcase=","TestCase="
                     , "stopwords="
+                    , "verbose"
                      ]
+            # getopt has no optional values, so bare options that take them get
+            # an empty one.
+            optional = ('--fail-fast', '--random-order')
+            argv = [ (arg in optional) and (arg + '=') or arg
+                     for arg in argv
+                    ]
             opts, args = getopt.getopt(argv[1:], short, long_)
         except getopt.error, msg:
             raise Usage(msg)
 
+        allow_flaky = False # --allow-flaky
+        bisect = None       # --bisect-pollution
+        bisect_trial = None # --bisect-trial
+        capture = None      # --capture
+        fail_fast = 0       # --fail-fast
         find_only = False   # -f
+        hunt_leaks = 0      # --hunt-leaks
+        logfile = None      # --log
+        memory = False      # --memory
+        progress = None     # --progress
+        rerun_failures = 0  # --rerun-failures
+        seed = None         # --random-order
         scripted = False    # -s
+        spool = None        # --spool
         stopwords = []      # -x
         testcase = None     # -t
+        tests = None        # --test
+        verbose = False     # -v
 
         for opt, value in opts:
-            if opt in ('-f', '--find-only'):
+            if opt == '--allow-flaky':
+                allow_flaky = True
+            elif opt == '--bisect-pollution':
+                bisect = value
+            elif opt == '--bisect-trial':
+                bisect_trial = value
+            elif opt == '--capture':
+                capture = value
+            elif opt == '--fail-fast':
+                if value == '':
+                    value = '1'
+                if not (value.isdigit() and int(value) >= 1):
+                    raise Usage("Please fail fast after one or more failures.")
+                fail_fast = int(value)
+            elif opt in ('-f', '--find-only'):
                 find_only = True
+            elif opt == '--hunt-leaks':
+                if not (value.isdigit() and int(value) >= 3):
+                    raise Usage("Please hunt leaks over three or more runs.")
+                hunt_leaks = int(value)
+            elif opt == '--log':
+                logfile = value
+            elif opt == '--memory':
+                memory = True
+            elif opt == '--progress':
+                progress = sys.stdout
+            elif opt == '--random-order':
+                if value == '':
+                    from testosterone.cli.ordering import new_seed
+                    seed = new_seed()
+                elif value.isdigit():
+                    seed = int(value)
+                else:
+                    raise Usage("Please give a seed as a whole number.")
+            elif opt == '--rerun-failures':
+                if not (value.isdigit() and int(value) >= 1):
+                    raise Usage("Please rerun failures one or more times.")
+                rerun_failures = int(value)
             elif opt in ('-s', '--scripted'):
                 scripted = True
+            elif opt == '--spool':
+                spool = value
+            elif opt in ('-v', '--verbose'):
+                verbose = True
             elif opt in ('-x', '--stopwords'):
                 stopwords = value.split(',')
             elif opt in ('-t', '--testcase', '--TestCase'):
+                if testcase not in (None, value):
+                    raise Usage("Please specify only one TestCase.")
                 testcase = value
+            elif opt == '--test':
+                if tests is None:
+                    tests = []
+                for test in value.split(','):
+                    if test.count('.') != 1:
+                        raise Usage("Please specify tests as Class.method.")
+                    _testcase, method = test.split('.')
+                    if testcase not in (None, _testcase):
+                        raise Usage("Please specify only one TestCase.")
+                    testcase = _testcase
+                    tests.append(method)
+
+        if allow_flaky and not rerun_failures:
+            raise Usage("Please rerun failures to tell which are flaky.")
 
         if len(args) == 1:
             module = args[0]
         else:
             raise Usage("Please specify a module.")
 
-        if WINDOWS or scripted:
-            if testcase is None:
-                report = summarize(module, find_only, stopwords)
+        if spool is not None:
+            spool = open(spool, 'a') # closed below, once we're done with it
+
+        listener = None
+        if verbose or (logfile is not None):
+            from testosterone import log
+            listener = log.start(logfile)
+
+        try:
+            if WINDOWS or scripted:
+                from testosterone.cli.reporters import detail, summarize
+                if bisect_trial is not None:
+                    from testosterone.cli import pollution
+                    names = sys.stdin.read().split()
+                    if pollution.trial(module, bisect_trial, names, seed):
+                        return 2 # the failure reproduced
+                    return 0
+                elif bisect is not None:
+                    from testosterone.cli import pollution
+                    names = summarize.order(module, stopwords, seed)
+                    report, found = pollution.bisect(module, names, bisect,
+                                                     seed=seed)
+                    failed = not found
+                elif testcase is None:
+                    report = summarize(module, find_only, stopwords, progress,
+                                       spool, capture, memory, hunt_leaks,
+                                       rerun_failures, seed, fail_fast)
+                    tfail, terr, tall = summarize._Summarize__totals
+                    flops = tfail + terr
+                    if allow_flaky:
+                        from testosterone.cli.reruns import FLAKY
+                        for name, verdict in summarize._Summarize__verdicts:
+                            if verdict == FLAKY:
+                                flops -= 1
+                    failed = flops > 0
+                    if hunt_leaks and summarize._Summarize__leaking:
+                        failed = True
+                    if summarize._Summarize__stopped is not None:
+                        failed = True   # even if the failures were flaky
+                else:
+                    report = detail(module, testcase, tests, capture, seed)
+                    failed = report.rstrip().splitlines()[-1]
+                    failed = failed.startswith('FAILED')
+                sys.stdout.write(report)
+
+                if failed: return 2 # non-zero exit-code on errors
+                else: return 0
             else:
-                report = detail(module, testcase)
-            sys.stdout.write(report)
-            
-            tfail, terr, tall = summarize._Summarize__totals
-            if tfail > 0 or terr > 0: return 2 # non-zero exit-code on errors
-            else: return 0
-        else:
-            from testosterone.interactive import CursesInterface
-            CursesInterface(module, stopwords)
+                from testosterone.interactive import CursesInterface
+                CursesInterface(module, stopwords, memory, rerun_failures,
+                                seed)
+        finally:
+            if spool is not None:
+                spool.close()
+            if listener is not None:
+                listener.stop()
 
     except Usage, err:
         print >> sys.stderr, err.msg
@@ -0,0 +1,103 @@
+"""Measure how much memory each TestCase uses, for --memory.
+
+Peak resident size comes from /proc/self/status where there is one (Linux).
+Since Linux 4.0 we can also reset the peak before each TestCase, by writing 5
+to /proc/self/clear_refs, so each TestCase gets a peak of its own. Elsewhere we
+fall back to getrusage, whose peak can't be reset; each TestCase then gets the
+peak of the process so far, and only the TestCases that raise it stand out.
+
+Where the tracemalloc module is available, we also note the lines that
+allocated the most memory that was still held when each TestCase finished.
+
+"""
+import sys
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:     # Python < 3.4
+    tracemalloc = None
+
+
+SITES = 3   # the number of allocation sites to note per TestCase
+
+
+class Meter:
+    """Measure the peak memory use, and allocation sites, of a piece of work.
+
+    Call start before the work, and stop after it.
+
+    """
+
+    snapshot = None # a tracemalloc snapshot from start, or None
+
+    def __init__(self):
+        self.resettable = reset_peak()
+        if (tracemalloc is not None) and (not tracemalloc.is_tracing()):
+            tracemalloc.start()
+
+    def start(self):
+        if self.resettable:
+            reset_peak()
+        if tracemalloc is not None:
+            self.snapshot = tracemalloc.take_snapshot()
+
+    def stop(self):
+        """Return the peak in bytes, and a list of (site, bytes) allocated.
+
+        Sites are 'path:lineno' strings, heaviest first. The list is empty
+        without tracemalloc.
+
+        """
+        peak = peak_rss()
+        sites = []
+        if self.snapshot is not None:
+            ignore = tracemalloc.Filter(False, tracemalloc.__file__)
+            snapshot = tracemalloc.take_snapshot().filter_traces([ignore])
+            stats = snapshot.compare_to(self.snapshot, 'lineno')
+            stats = [stat for stat in stats if stat.size_diff > 0]
+            for stat in stats[:SITES]:
+                frame = stat.traceback[0]
+                site = '%s:%d' % (frame.filename, frame.lineno)
+                sites.append((site, stat.size_diff))
+            self.snapshot = None
+        return peak, sites
+
+
+def peak_rss():
+    """Return the peak resident size of this process, in bytes.
+    """
+    try:
+        fp = open('/proc/self/status')
+        try:
+            for line in fp:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+        finally:
+            fp.close()
+    except IOError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak             # bytes there, kilobytes elsewhere
+    return peak * 1024
+
+
+def reset_peak():
+    """Reset the peak resident size of this process; return success.
+    """
+    try:
+        fp = open('/proc/self/clear_refs', 'w')
+        try:
+            fp.write('5')
+        finally:
+            fp.close()
+    except (IOError, OSError):
+        return False
+    return True
@@ -0,0 +1,50 @@
+"""Run tests in a random order that can be replayed, for --random-order.
+
+We shuffle at three levels: the modules below the one being run, the TestCases
+in each module, and the test methods on each TestCase. Each shuffle gets its
+own generator, seeded from the seed for the run plus the name of what is being
+shuffled, so the order of one list doesn't depend on how many others were
+shuffled before it. Running a single TestCase with the same seed (as a detail
+report, or a trial for --bisect-pollution) thus runs its methods in the same
+order as they ran in the summary report.
+
+"""
+import random
+import unittest
+import zlib
+
+
+def shuffle(items, seed, key):
+    """Given a list, an int and a name, shuffle the list in place.
+    """
+    generator = random.Random(zlib.crc32('%d:%s' % (seed, key)) & 0xffffffff)
+    generator.shuffle(items)
+
+
+def new_seed():
+    """Return a seed for a run that wasn't given one.
+    """
+    return random.randrange(1000000)
+
+
+class Loader(unittest.TestLoader):
+    """A test loader that shuffles the methods on each TestCase.
+    """
+
+    def __init__(self, seed):
+        self.seed = seed
+
+    def getTestCaseNames(self, testCaseClass):
+        names = unittest.TestLoader.getTestCaseNames(self, testCaseClass)
+        names = list(names)
+        key = testCaseClass.__module__ + '.' + testCaseClass.__name__
+        shuffle(names, self.seed, key)
+        return names
+
+
+def loader(seed=None):
+    """Given a seed, or None for the usual order, return a test loader.
+    """
+    if seed is None:
+        return unittest.defaultTestLoader
+    return Loader(seed)
@@ -0,0 +1,250 @@
+"""Find the TestCases that pollute another, for --bisect-pollution.
+
+A TestCase that passes by itself but fails in a run of its package is being
+polluted by state left behind by some of the TestCases that ran before it. We
+find a minimal set of those by delta debugging: we split the candidates into
+chunks, and try running each chunk, and each complement of a chunk, before the
+polluted TestCase. A trial reproduces the failure if the TestCase fails after
+it. The first trial that reproduces becomes the new set of candidates;
+otherwise we split finer, until no single TestCase can be left out. The
+result is minimal in that sense, though not necessarily the smallest possible.
+
+Each trial runs in a fresh process, ourselves in scripted mode with
+--bisect-trial, which reads the names of the TestCases to run from stdin, and
+exits 2 if the polluted TestCase fails after them (see trial). The trials in a
+round are independent, so we run them in parallel, up to workers at a time.
+Given the seed of a run in random order, trials run the methods of each
+TestCase in the same order as that run did.
+
+"""
+import errno
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import types
+import unittest
+
+from testosterone.cli import ordering
+from testosterone.cli.utils import BANNER, BORDER, dev_null, load
+
+
+def cpu_count():
+    """Return the number of processors we can use, or 2 if we can't tell.
+    """
+    try:
+        return max(1, os.sysconf('SC_NPROCESSORS_ONLN'))
+    except (AttributeError, ValueError, OSError):
+        return 2
+
+WORKERS = cpu_count() # the number of trials to run at once
+
+
+class TrialError(StandardError):
+    """Signals that a trial process failed to run at all.
+    """
+
+
+# Parent
+# ======
+
+def bisect(module, names, target, workers=WORKERS, seed=None):
+    """Given a module name, a list of TestCase names, and one of them, bisect.
+
+    names are all of the TestCases under module, in the order they are run,
+    and target is the one that is polluted. We return a report, and whether we
+    found the polluters. seed is for a run in random order, or None.
+
+    """
+    lines = [BANNER]
+    if target not in names:
+        lines.append("%s is not a TestCase in %s." % (target, module))
+        return '\n'.join(lines) + '\n', False
+    candidates = names[:names.index(target)]
+    reproduces = lambda trials: run_trials(module, target, trials, workers,
+                                           seed)
+
+    try:
+        alone, after_all = reproduces([[], candidates])
+        if alone:
+            lines.append("%s fails by itself." % target)
+            return '\n'.join(lines) + '\n', False
+        if not after_all:
+            lines.append("%s doesn't fail after the %d TestCases before it."
+                          % (target, len(candidates)))
+            return '\n'.join(lines) + '\n', False
+        polluters, trials = ddmin(candidates, reproduces)
+    except TrialError, err:
+        lines.append("A trial failed to run:")
+        lines.append(BORDER)
+        lines.append(str(err).rstrip())
+        return '\n'.join(lines) + '\n', False
+
+    heading = "POLLUTERS OF %s" % target
+    counts = "(%d of %d, %d trials)" % (len(polluters), len(candidates),
+                                        trials + 2)
+    lines.append(heading.ljust(79 - len(counts)) + ' ' + counts)
+    lines.append(BORDER)
+    lines.extend(polluters)
+    return '\n'.join(lines) + '\n', True
+
+
+def ddmin(candidates, reproduces):
+    """Given a list of candidates and a callable, return a minimal subset.
+
+    reproduces takes a list of lists of candidates, and returns a list of
+    booleans, one per list, saying whether the failure reproduces with it. The
+    full list of candidates must reproduce. We return the minimal subset, and
+    the number of trials it took.
+
+    """
+    n = 2
+    trials = 0
+    while len(candidates) >= 2:
+        chunks = split(candidates, n)
+        complements = []
+        if n > 2:       # for two chunks, these are the chunks themselves
+            for i in range(len(chunks)):
+                complement = []
+                for chunk in chunks[:i] + chunks[i+1:]:
+                    complement.extend(chunk)
+                complements.append(complement)
+        results = reproduces(chunks + complements)
+        trials += len(results)
+        if True in results[:len(chunks)]:
+            candidates = chunks[results.index(True)]
+            n = 2
+        elif True in results:
+            candidates = complements[results.index(True) - len(chunks)]
+            n = max(n - 1, 2)
+        elif n < len(candidates):
+            n = min(n * 2, len(candidates))
+        else:
+            break
+    return candidates, trials
+
+
+def split(candidates, n):
+    """Given a list and an int, return the list cut into n nearly even chunks.
+    """
+    chunks = []
+    start = 0
+    for i in range(n):
+        stop = start + (len(candidates) - start) // (n - i)
+        chunks.append(candidates[start:stop])
+        start = stop
+    return chunks
+
+
+def run_trials(module, target, trials, workers, seed=None):
+    """Given a module name, a TestCase name, a list of lists, and an int, run.
+
+    Each list in trials is a list of TestCase names to run before target. We
+    return a list of booleans, one per trial, saying whether target failed.
+    If a trial fails to run at all we raise TrialError, with its output, and
+    kill the rest.
+
+    """
+    results = [None] * len(trials)
+    waiting = range(len(trials))
+    running = {}            # {pid: (i, proc, output)}
+    try:
+        while waiting or running:
+            while waiting and (len(running) < workers):
+                i = waiting.pop(0)
+                proc, output = spawn(module, target, trials[i], seed)
+                running[proc.pid] = (i, proc, output)
+            pid, status = wait()
+            if pid not in running:
+                continue    # not one of ours
+            i, proc, output = running.pop(pid)
+            proc.returncode = returncode(status)
+            if proc.returncode not in (0, 2):
+                output.seek(0)
+                raise TrialError(output.read())
+            output.close()
+            results[i] = proc.returncode == 2
+    finally:
+        for i, proc, output in running.values():
+            if proc.poll() is None:
+                os.kill(proc.pid, signal.SIGTERM)
+                proc.wait()
+            output.close()
+    return results
+
+
+def wait():
+    """Block until a child process exits; return its pid and exit status.
+    """
+    while 1:
+        try:
+            return os.wait()
+        except OSError, err:
+            if err.errno != errno.EINTR:
+                raise
+
+
+def returncode(status):
+    """Given an exit status from os.wait, return it as a Popen returncode.
+    """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def spawn(module, target, names, seed=None):
+    """Start a trial process; return it, and the file its output goes to.
+
+    The child is ourselves, in scripted mode, with our sys.path handed on.
+
+    """
+    args = [ sys.executable
+           , sys.argv[0]
+           , '--scripted'
+           , '--bisect-trial=%s' % target
+           , module
+            ]
+    if seed is not None:
+        args.insert(3, '--random-order=%d' % seed)
+    environ = os.environ.copy()
+    environ['PYTHONPATH'] = os.pathsep.join(sys.path)
+    output = tempfile.TemporaryFile()
+    proc = subprocess.Popen( args
+                           , stdin=subprocess.PIPE
+                           , stdout=output
+                           , stderr=subprocess.STDOUT
+                           , env=environ
+                            )
+    proc.stdin.write(''.join([name + '\n' for name in names]))
+    proc.stdin.close()
+    return proc, output
+
+
+# Child
+# =====
+
+def trial(module, target, names, seed=None):
+    """Given a module name, a TestCase name and a list of others, run a trial.
+
+    We import module first, as a summary report would, then run the TestCases
+    in names, in order, then target. We return whether target failed.
+
+    """
+    load(module)
+    runner = unittest.TextTestRunner(dev_null())
+    make_suite = ordering.loader(seed).loadTestsFromTestCase
+    for name in names:
+        runner.run(make_suite(find(name)))
+    return not runner.run(make_suite(find(target))).wasSuccessful()
+
+
+def find(name):
+    """Given a dotted TestCase name, return the TestCase class.
+    """
+    module_name, testcase_name = name.rsplit('.', 1)
+    testcase = getattr(load(module_name), testcase_name, None)
+    if not isinstance(testcase, (type, types.ClassType)) or \
+       not issubclass(testcase, unittest.TestCase):
+        raise TypeError("%s is not a TestCase." % name)
+    return testcase
@@ -1,14 +1,26 @@
 import os
 import sys
+import time
 import types
 import unittest
 from StringIO import StringIO
 
+from testosterone.cli import leaks, ordering, reruns
+from testosterone.cli.capture import CapturingRunner
+from testosterone.cli.failfast import Budget, StoppingRunner
+from testosterone.cli.memory import Meter
 from testosterone.cli.utils import *
 
 
-def detail(module_name, testcase_name):
+def detail(module_name, testcase_name, tests=None, capture=None, seed=None):
     """Given a module name and a TestCase name, return a detail report.
+
+    If tests is given, it is a sequence of names of test methods on the
+    TestCase, and only those are run. If capture is given, it is the path to a
+    directory, and the output of each test is captured there; see the capture
+    module. If seed is given, the tests are run in random order, as they would
+    be in a summary report with that seed; see the ordering module.
+
     """
 
     # Get a TestSuite for a single TestCase.
@@ -24,7 +36,15 @@ def detail(module_name, testcase_name):
         raise TypeError("%s is not a TestCase." % testcase_name)
     if not issubclass(testcase, unittest.TestCase):
         raise TypeError("%s is not a TestCase." % testcase_name)
-    suite = unittest.defaultTestLoader.loadTestsFromTestCase(testcase)
+    if tests is None:
+        suite = ordering.loader(seed).loadTestsFromTestCase(testcase)
+    else:
+        suite = unittest.TestSuite()
+        for name in tests:
+            if not callable(getattr(testcase, name, None)):
+                raise ImportError("Unable to find %s in " % name +
+                                  "%s.%s." % (module_name, testcase_name))
+            suite.addTest(testcase(name))
 
 
     # Run tests.
@@ -35,7 +55,10 @@ def detail(module_name, testcase_name):
 
     report = StringIO()
     print >> report, BANNER
-    runner = unittest.TextTestRunner(report)
+    if capture is None:
+        runner = unittest.TextTestRunner(report)
+    else:
+        runner = CapturingRunner(report, capture)
     runner.run(suite)
     return report.getvalue()
 
@@ -57,7 +80,7 @@ class _Summarize:
     in absolute terms. Data rows will be longer than 80 characters iff the field
     values exceed the following character lengths:
 
-        name        60
+        name        60 (55 with a MEM column)
         failures     4
         errors       4
         total        4
@@ -69,7 +92,80 @@ class _Summarize:
 
     The report is delivered after it is fully complete. We do this rather than
     delivering data in real time in order to avoid program output and pdb
-    sessions from cluttering up our report.
+    sessions from cluttering up our report. If progress is given, it is a
+    stream to which we write each row as soon as its TestCase has been run,
+    prefixed with TICK and preceded by a single plan row giving the total
+    number of tests to be run:
+
+        <TICK> PLAN <total>
+        <TICK> <name> <passing> <failures> <errors> <total> <seconds>
+
+    <seconds> is the time it took to run the TestCase, as a float.
+
+    These are only hints for an interactive parent; the report proper is still
+    authoritative.
+
+    If spool is given, it is a stream to which we append a detail report (as
+    from detail) for each TestCase with failures or errors, so that an
+    interactive parent can show tracebacks without running the TestCase again.
+    See spill for the format.
+
+    If capture is given, it is the path to a directory, and the output of each
+    test is captured, so that it doesn't flood our parent; the output of
+    failing tests is kept there, and noted in spooled reports. See the capture
+    module.
+
+    If memory is True, we measure the peak memory use of each TestCase as it
+    runs (see the memory module), and add a MEM column to the report, and to
+    progress rows in bytes, after <seconds>. After the footer we then list the
+    heaviest TestCases, with the lines that allocated the most memory in each
+    where we can tell:
+
+        HEAVIEST TESTCASES                        PEAK
+        --------------------------------------------
+        <name>                                  <peak>
+            <path>:<lineno>                    <bytes>
+
+    If hunt_leaks is an int, N, we run each TestCase N times, and list those
+    whose footprint grew on every run after the first (see the leaks module)
+    after the footer, and after any heaviest TestCases:
+
+        LEAKING TESTCASES (<N> runs)                    GROWTH
+        ----------------------------------------------------
+        <name>                              <resource> +<growth>
+
+    Results are from the first run; the others are only for hunting.
+
+    If rerun_failures is an int, N, we rerun each failing test by itself, N
+    times here and then N times in a fresh process, and give it a verdict
+    (see the reruns module). The verdicts are listed last, each with a marker:
+
+        RERUN FAILURES (<N> runs)                               VERDICT
+        ----------------------------------------------------
+        <name>.<method>                               <marker> <verdict>
+
+    If progress is given, each verdict is also written as a progress row, after
+    the row for its TestCase:
+
+        <TICK> RERUN <name>.<method> <verdict>
+
+    Results are still from the first run.
+
+    If seed is an int, we run modules, TestCases and test methods in a random
+    order (see the ordering module), and give the seed in our banner:
+
+        -------------<| testosterone |>-----<| seed <seed> |>---
+
+    The same seed always gives the same order.
+
+    If fail_fast is an int, N, we stop after N failures and errors, partway
+    through a TestCase if need be, and don't run the TestCases after that (see
+    the failfast module). Those are given as not run, with dashes, and the
+    footer is followed by:
+
+        STOPPED AFTER FAILURE <N> (TestCases not run: <n>)
+
+    Percentages are then of the tests that were run.
 
     This callable is implemented as a class to make testing easier. It should be
     used via the singleton named summarize.
@@ -84,18 +180,57 @@ class _Summarize:
         self.make_suite = unittest.defaultTestLoader.loadTestsFromTestCase
 
 
-    def __call__(self, module, find_only=False, stopwords=()):
+    progress = None # a stream for progress rows, or None
+    spool = None    # a stream for detail reports on failing TestCases, or None
+    capture = None  # a directory to capture test output into, or None
+    memory = False  # whether to measure the memory use of each TestCase
+    width = 60      # the width of the name column; narrower for MEM
+    heaviest = 10   # the number of TestCases to list when measuring memory
+    hunt_leaks = 0  # the number of times to run each TestCase, hunting leaks
+    rerun_failures = 0 # the number of times to rerun each failing test
+    seed = None     # the seed for running in random order, or None
+    fail_fast = 0   # the number of failures and errors to stop after
+    budget = None   # a failfast.Budget when failing fast, or None
+    __stopped = None # (tests run, TestCases not run), if we stopped early
+
+
+    def __call__(self, module, find_only=False, stopwords=(), progress=None,
+                 spool=None, capture=None, memory=False, hunt_leaks=0,
+                 rerun_failures=0, seed=None, fail_fast=0):
         """
         """
         self.module = module
         self.find_only = find_only
         self.stopwords = stopwords
+        self.progress = progress
+        self.spool = spool
+        self.capture = capture
+        self.memory = memory and not find_only
+        self.width = 60
+        if self.memory:
+            self.width = 55
+        self.hunt_leaks = (not find_only) and hunt_leaks
+        self.rerun_failures = (not find_only) and rerun_failures
+        self.seed = seed
+        self.make_suite = ordering.loader(seed).loadTestsFromTestCase
+        self.fail_fast = (not find_only) and fail_fast
+        self.budget = None
+        if self.fail_fast:
+            self.budget = Budget(self.fail_fast)
 
         self.find_testcases()
 
         self.print_header()
         self.print_body()
         self.print_footer()
+        if self.__stopped is not None:
+            self.print_stopped()
+        if self.memory:
+            self.print_heaviest()
+        if self.hunt_leaks:
+            self.print_leaks()
+        if self.rerun_failures:
+            self.print_reruns()
 
         return self.report.getvalue()
 
@@ -121,10 +256,14 @@ class _Summarize:
 
     def find_testcases(self):
         """Store a list of TestCases below the currently named module.
+
+        The list is grouped by module, in order by name, unless we have a seed,
+        in which case we shuffle the modules, and the TestCases in each.
+
         """
 
         basemod = load(self.module)
-        testcases = self.load_testcases(basemod)
+        groups = [(basemod.__name__, self.load_testcases(basemod))]
 
         path = os.path.dirname(basemod.__file__)
         for name in sorted(sys.modules):
@@ -145,66 +284,225 @@ class _Summarize:
             if not module.__file__.startswith(path):
                 # Skip external modules that ended up in our namespace.
                 continue
-            testcases.extend(self.load_testcases(module))
+            groups.append((name, self.load_testcases(module)))
+
+        if self.seed is not None:
+            ordering.shuffle(groups, self.seed, self.module)
+        testcases = []
+        for name, group in groups:
+            if self.seed is not None:
+                ordering.shuffle(group, self.seed, name)
+            testcases.extend(group)
 
         self.__testcases = testcases
 
 
+    def order(self, module, stopwords=(), seed=None):
+        """Given a module name and stopwords, return names of TestCases below it.
+
+        The names are in the order that we run the TestCases in, given seed.
+
+        """
+        self.module = module
+        self.stopwords = stopwords
+        self.seed = seed
+        self.find_testcases()
+        return [name for name, testcase in self.__testcases]
+
+
     def print_header(self):
         """Print the report header.
         """
-        print >> self.report, BANNER
-        print >> self.report, HEADERS
+        print >> self.report, banner(self.seed)
+        if self.memory:
+            print >> self.report, HEADERS_MEM
+        else:
+            print >> self.report, HEADERS
         print >> self.report, BORDER
 
 
     def print_body(self):
         """Print the report body; set three members on self for print_footer.
+
+        When measuring memory, we also set a list of (peak, name, sites) for
+        print_footer and print_heaviest; when hunting leaks, a list of (name,
+        resource, first, last) for print_leaks; and when rerunning failures, a
+        list of (name, verdict) for print_reruns and our caller. If we stop
+        early, we set the number of tests run and of TestCases not run.
+
         """
 
         tfail = terr = tall = 0
+        tran = skipped = 0
+        weights = []
+        leaking = []
+        verdicts = []
+        if self.memory:
+            meter = Meter()
+
+        if (self.progress is not None) and (not self.find_only):
+            planned = 0
+            for name, testcase in self.__testcases:
+                planned += self.make_suite(testcase).countTestCases()
+            self.tick('PLAN', planned)
 
         for name, testcase in self.__testcases:
 
             pass5 = fail = err = 0 # FWIW: pass -> pass% -> pass5
+            seconds = 0.0
+            peak = 0
+            rerun = []
             suite = self.make_suite(testcase)
             all = suite.countTestCases()
+            stopped = (self.budget is not None) and self.budget.exhausted()
 
 
             # Run tests if requested.
             # =======================
 
-            if not self.find_only:
+            if not (self.find_only or stopped):
                 pass5 = fail = err = 0
+                ran = all
                 if all != 0:
-                    result = self.runner.run(suite)
+                    runner = self.runner
+                    details = dev_null()
+                    if self.spool is not None:
+                        details = StringIO()
+                        runner = unittest.TextTestRunner(details)
+                    if self.budget is not None:
+                        runner = StoppingRunner(details, self.budget)
+                    if self.capture is not None:
+                        runner = CapturingRunner( details
+                                                , self.capture
+                                                , self.budget
+                                                 )
+                    if self.memory:
+                        meter.start()
+                    start = time.time()
+                    result = runner.run(suite)
+                    seconds = time.time() - start
+                    if self.memory:
+                        peak, sites = meter.stop()
+                        weights.append((peak, name, sites))
                     fail = len(result.failures)
                     err = len(result.errors)
-                    pass5 = (all - fail - err) / float(all)
+                    ran = result.testsRun   # fewer than all if we stopped
+                    pass5 = (ran - fail - err) / float(ran)
                     pass5 =  int(round(pass5*100))
+                    if (self.spool is not None) and (fail or err):
+                        self.spill(name, details.getvalue())
+                    if self.hunt_leaks:
+                        for grew in self.hunt(testcase):
+                            leaking.append((name,) + grew)
+                    if self.rerun_failures:
+                        rerun = self.rerun(name, testcase, result)
+                        verdicts.extend(rerun)
 
                 tall += all
+                tran += ran
                 tfail += fail
                 terr += err
 
             else:
                 pass5 = fail = err = '-'
                 tall += all
+                if stopped:
+                    skipped += 1
 
 
             # Format and print.
             # =================
 
-            name = name.ljust(60)
+            name = name.ljust(self.width)
             sfail, serr, sall = [str(s).rjust(4) for s in (fail, err, all)]
             if pass5 == '-':
                 pass5 = '  - '
             else: # int
                 pass5 = str(pass5).rjust(3)+'%'
-            print >> self.report, name, pass5, sfail, serr, sall
+            row = [name, pass5, sfail, serr, sall]
+            if self.memory:
+                mem = '-'
+                if peak:
+                    mem = format_size(peak)
+                row.append(mem.rjust(4))
+            print >> self.report, ' '.join(row)
+            if (self.progress is not None) and not (self.find_only or stopped):
+                ticked = row[:5] + ['%.3f' % seconds]
+                if self.memory:
+                    ticked.append(peak)
+                self.tick(*ticked)
+                for test, verdict in rerun:
+                    self.tick('RERUN', test, verdict)
 
 
         self.__totals = tfail, terr, tall
+        self.__weights = weights
+        self.__leaking = leaking
+        self.__verdicts = verdicts
+        if (self.budget is not None) and self.budget.exhausted():
+            self.__stopped = (tran, skipped)
+        else:
+            self.__stopped = None
+
+
+    def hunt(self, testcase):
+        """Given a TestCase we just ran, run it again to hunt for leaks.
+
+        We return a list of (resource, first, last) for what grew. Output is
+        captured as it was on the first run, if we are capturing.
+
+        """
+        runner = self.runner
+        if self.capture is not None:
+            runner = CapturingRunner(dev_null(), self.capture)
+        run = lambda: runner.run(self.make_suite(testcase))
+        return leaks.hunt(run, self.hunt_leaks)
+
+
+    def rerun(self, name, testcase, result):
+        """Given a TestCase name and class, and its result, rerun its failures.
+
+        We return a list of (name, verdict), where name is the TestCase name
+        plus the method name.
+
+        """
+        verdicts = []
+        for test, traceback_ in result.errors + result.failures:
+            method = test.id().split('.')[-1]
+            verdict = reruns.rerun( testcase
+                                  , name
+                                  , method
+                                  , self.rerun_failures
+                                  , self.capture
+                                   )
+            verdicts.append((name + '.' + method, verdict))
+        return verdicts
+
+
+    def tick(self, *fields):
+        """Write one progress row to self.progress, and flush it right away.
+        """
+        fields = [str(f).strip() for f in fields]
+        print >> self.progress, TICK, ' '.join(fields)
+        self.progress.flush()
+
+
+    def spill(self, name, details):
+        """Given a TestCase name and runner output, append it to self.spool.
+
+        Each record is a header line giving the name and the length of the
+        report that follows it, which is the same as detail would return:
+
+            <SPOOL> <name> <length>
+            <report>
+
+        The lengths let a reader index the spool without parsing reports.
+
+        """
+        report = BANNER + '\n' + details
+        print >> self.spool, SPOOL, name, len(report)
+        self.spool.write(report)
+        self.spool.flush()
 
 
     def print_footer(self, *totals):
@@ -212,11 +510,14 @@ class _Summarize:
         """
 
         tfail, terr, tall = self.__totals
+        tran = tall
+        if self.__stopped is not None:
+            tran = self.__stopped[0]
 
         if not self.find_only:
             tpass5 = 0
-            if tall:
-                tpass5 = (tall - tfail - terr) / float(tall)
+            if tran:
+                tpass5 = (tran - tfail - terr) / float(tran)
             tpass5 = int(round(tpass5*100))
             tpass5 = str(tpass5).rjust(3)+'%'
         else:
@@ -227,8 +528,64 @@ class _Summarize:
         raw = (tpass5, tfail, terr, tall)
         tpass5, tfail, terr, tall = [str(s).rjust(4) for s in raw]
 
+        row = ["TOTALS".ljust(self.width), tpass5, tfail, terr, tall]
+        if self.memory:
+            mem = '-'
+            if self.__weights:
+                mem = format_size(max(self.__weights)[0])
+            row.append(mem.rjust(4))
+
+        print >> self.report, BORDER
+        print >> self.report, ' '.join(row)
+
+
+    def print_stopped(self):
+        """Say that we stopped early; uses the numbers set by print_body.
+        """
+        tran, skipped = self.__stopped
+        print >> self.report
+        print >> self.report, "STOPPED AFTER FAILURE %d" % self.fail_fast,
+        print >> self.report, "(TestCases not run: %d)" % skipped
+
+
+    def print_heaviest(self):
+        """List the heaviest TestCases; uses the list set by print_body.
+        """
+        weights = sorted(self.__weights)
+        weights.reverse()
+        print >> self.report
+        print >> self.report, "HEAVIEST TESTCASES".ljust(75), "PEAK"
+        print >> self.report, BORDER
+        for peak, name, sites in weights[:self.heaviest]:
+            print >> self.report, name.ljust(75), format_size(peak).rjust(4)
+            for site, size in sites:
+                print >> self.report, ('    ' + site).ljust(75),
+                print >> self.report, format_size(size).rjust(4)
+
+
+    def print_leaks(self):
+        """List the leaking TestCases; uses the list set by print_body.
+        """
+        heading = "LEAKING TESTCASES (%d runs)" % self.hunt_leaks
+        print >> self.report
+        print >> self.report, heading.ljust(69), "GROWTH".rjust(10)
+        print >> self.report, BORDER
+        for name, resource, first, last in self.__leaking:
+            growth = '+%d' % (last - first)
+            print >> self.report, name.ljust(60), resource.rjust(8),
+            print >> self.report, growth.rjust(10)
+
+
+    def print_reruns(self):
+        """List verdicts on rerun failures; uses the list set by print_body.
+        """
+        heading = "RERUN FAILURES (%d runs)" % self.rerun_failures
+        print >> self.report
+        print >> self.report, heading.ljust(62), "VERDICT".rjust(17)
         print >> self.report, BORDER
-        print >> self.report, "TOTALS".ljust(60), tpass5, tfail, terr, tall
+        for name, verdict in self.__verdicts:
+            marker = reruns.MARKERS[verdict]
+            print >> self.report, name.ljust(60), marker, verdict.rjust(17)
 
 
 summarize = _Summarize()
@@ -0,0 +1,104 @@
+"""Rerun failing tests to tell failures from flakes, for --rerun-failures.
+
+Each test that failed or erred is run again by itself, n times in the same
+process (the worker that ran the TestCase), and then, unless that already
+settled it, n times in a fresh process of its own. The results give a verdict:
+
+    consistent      it failed every time, everywhere
+    flaky           it both passed and failed under the same conditions; the
+                    run that failed in the first place counts as one in the
+                    same process
+    order-dependent it failed every time in the same process, but passed every
+                    time in a fresh one, so it only fails after whatever ran
+                    before it
+
+A fresh process costs an import of the module under test, so we only start one
+when the reruns in our own process were consistent among themselves.
+
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+from testosterone.cli.capture import CapturingRunner
+from testosterone.cli.utils import dev_null
+
+
+CONSISTENT = 'consistent'
+FLAKY = 'flaky'
+ORDER_DEPENDENT = 'order-dependent'
+
+MARKERS = { CONSISTENT: '!'         # how each verdict shows up, in the report
+          , FLAKY: '~'              #   and the curses interface
+          , ORDER_DEPENDENT: '?'
+           }
+
+
+def run_here(testcase, method, capture=None):
+    """Given a TestCase class and a method name, run it here; return success.
+
+    Given a capture directory, the test's output is captured into it, as it
+    was on the first run, rather than going to our stdout.
+
+    """
+    runner = unittest.TextTestRunner(dev_null())
+    if capture is not None:
+        runner = CapturingRunner(dev_null(), capture)
+    result = runner.run(testcase(method))
+    return result.wasSuccessful()
+
+
+def run_fresh(name, method):
+    """Given a dotted TestCase name and a method name, run it in a new process.
+
+    We return success. The child is ourselves, in scripted mode, with our
+    sys.path handed on; its report is thrown away.
+
+    """
+    module, testcase = name.rsplit('.', 1)
+    args = [ sys.executable
+           , sys.argv[0]
+           , '--scripted'
+           , '--testcase=%s' % testcase
+           , '--test=%s.%s' % (testcase, method)
+           , module
+            ]
+    environ = os.environ.copy()
+    environ['PYTHONPATH'] = os.pathsep.join(sys.path)
+    proc = subprocess.Popen( args
+                           , stdout=subprocess.PIPE
+                           , stderr=subprocess.STDOUT
+                           , env=environ
+                            )
+    proc.communicate()
+    return proc.returncode == 0
+
+
+def classify(here, fresh):
+    """Given two lists of booleans, one per rerun, return a verdict.
+
+    here are the reruns in our own process, which follow the original failure
+    there. fresh may be empty, if we didn't need a fresh process.
+
+    """
+    here = [False] + here
+    for runs in (here, fresh):
+        if (True in runs) and (False in runs):
+            return FLAKY
+    if True in fresh:
+        return ORDER_DEPENDENT
+    return CONSISTENT
+
+
+def rerun(testcase, name, method, n, capture=None):
+    """Given a TestCase class, its dotted name, a method, and an int, rerun.
+
+    We return a verdict per classify. capture is per run_here.
+
+    """
+    here = [run_here(testcase, method, capture) for i in range(n)]
+    fresh = []
+    if classify(here, []) != FLAKY:
+        fresh = [run_fresh(name, method) for i in range(n)]
+    return classify(here, fresh)
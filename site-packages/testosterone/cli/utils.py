@@ -1,14 +1,21 @@
 import unittest
 
-__all__ = ( 'BANNER', 'BORDER', 'HEADERS', 'StopWord', 'dev_null', 'flatten'
-          , 'load')
+__all__ = ( 'BANNER', 'BANNER_LEFT', 'BORDER', 'HEADERS', 'HEADERS_MEM'
+          , 'OUTPUT', 'SPOOL', 'TICK', 'StopWord', 'banner', 'dev_null'
+          , 'flatten', 'format_size', 'load', 'parse_size')
 
 
 
 C = '-'
-BANNER = C*31 + "<| testosterone |>" + C*31
+BANNER_LEFT = C*31 + "<| testosterone |>" # all banners start with this
+BANNER = BANNER_LEFT + C*31
 BORDER = C * 80
 HEADERS = ' '.join(["MODULE".ljust(60), "PASS", "FAIL", " ERR", " ALL"])
+HEADERS_MEM = ' '.join([ "MODULE".ljust(55) # for --memory; still 80 wide
+                       , "PASS", "FAIL", " ERR", " ALL", " MEM"])
+TICK = "<| tick |>" # prefixes progress lines; see _Summarize.print_body
+SPOOL = "<| spool |>" # prefixes spooled detail reports; see _Summarize.spill
+OUTPUT = "<| output |>" # prefixes captured output lines; see capture.Capture
 
 
 class StopWord(StandardError):
@@ -21,6 +28,17 @@ class dev_null:
     """
     def write(self, wheeeee):
         pass
+    def flush(self):
+        pass
+
+
+def banner(seed=None):
+    """Given the seed for a run in random order, or None, return our banner.
+    """
+    if seed is None:
+        return BANNER
+    tag = "<| seed %d |>" % seed
+    return BANNER_LEFT + C*max(1, 28 - len(tag)) + tag + C*3
 
 
 def flatten(_suite):
@@ -35,6 +53,27 @@ def flatten(_suite):
     return suite
 
 
+def format_size(n):
+    """Given a number of bytes, return it in four characters or less.
+
+    Sizes are given in K, M, G or T, with one decimal place below ten: 512K,
+    1.5M, 12G.
+
+    """
+    for unit in 'KMGT':
+        n = n / 1024.0
+        if n < 9.95:
+            return '%.1f%s' % (n, unit)
+        elif (n < 999.5) or (unit == 'T'):
+            return '%d%s' % (round(n), unit)
+
+
+def parse_size(size):
+    """Given a size per format_size, return a number of bytes (roughly).
+    """
+    return int(float(size[:-1]) * 1024 ** ('KMGT'.index(size[-1]) + 1))
+
+
 def load(name):
     """Given a dotted name, return the last-named module instead of the first.
 
@@ -1,18 +1,37 @@
 """Interactive interface.
 """
 import curses
+import logging
 import os
 
+from testosterone.interactive.loop import EventLoop
 from testosterone.interactive.screens.summary import SummaryScreen
 from testosterone.interactive.screens.detail import DetailScreen
 from testosterone.interactive.utils import Bucket
 
 
+class NullHandler(logging.Handler):
+    """Swallow log records, so that logging stays quiet unless configured.
+
+    Without a handler, the logging module complains to stderr, which would
+    garble our screen.
+
+    """
+    def emit(self, record):
+        pass
+
+logging.getLogger('testosterone').addHandler(NullHandler())
+
+
 class CursesInterface:
 
-    def __init__(self, module, stopwords):
+    def __init__(self, module, stopwords, memory=False, rerun_failures=0,
+                 seed=None):
         self.module = module
         self.stopwords = stopwords
+        self.memory = memory
+        self.rerun_failures = rerun_failures
+        self.seed = seed
         curses.wrapper(self.wrapme)
         os.system('clear')
 
@@ -47,13 +66,18 @@ class CursesInterface:
         self.blocks.GRAY = curses.color_pair(6)|curses.A_DIM
         self.blocks.BLUE = curses.color_pair(7)|curses.A_BOLD
 
-        screen = SummaryScreen(self)
+        self.loop = EventLoop()
+        summary = screen = SummaryScreen(self)
         try:
-            while 1:
-                # Each screen returns the next screen.
-                # screens are responsible for their own error handling so that
-                # they can return themselves and we can therefore get back to
-                # them.
-                screen = screen.go()
-        except KeyboardInterrupt:
-            pass
+            try:
+                while 1:
+                    # Each screen returns the next screen.
+                    # screens are responsible for their own error handling so
+                    # that they can return themselves and we can therefore get
+                    # back to them.
+                    screen = screen.go()
+            except KeyboardInterrupt:
+                pass
+        finally:
+            summary.close()
+            self.loop.close()
@@ -3,9 +3,12 @@ import os
 import re
 import subprocess
 import sys
+import time
+import zlib
 
-from testosterone.cli.utils import BANNER, BORDER, HEADERS
+from testosterone.cli.utils import BANNER, BORDER, HEADERS, OUTPUT
 from testosterone.interactive.utils import RefreshError, Process
+from testosterone.log import span
 
 
 BREAK1 = ("=" * 70) + '\n'
@@ -16,26 +19,41 @@ OBJ_RE = re.compile('\((\S)\)')
 FAIL_RE = re.compile('failures=(\d*)')
 ERR_RE = re.compile('errors=(\d*)')
 
-logger = logging.getLogger('testosterone.tests')
+logger = logging.getLogger('testosterone.interactive.detail')
 
 
 class Detail:
     """Represent the data from an inter-process detail() call.
 
     This is designed to be a persistent object. Repeated calls to refresh will
-    update the dataset. Unlike Summary, there are no partial updates here. The
-    assumption is that you will always want to re-run all tests at once. There
+    update the dataset. By default we re-run all tests at once, but refresh and
+    start take a list of test names to re-run only those; their results are
+    then merged with the ones we already have, and totals are recomputed. There
     is a show flag for each record; only items for which this are true are
     included in the name, index and __len__ calls.
 
+    Tracebacks are stored compressed, since they are bulky and repetitive, and
+    we only ever look at one at a time; use traceback to get one back.
+
+    If capture is set, it is a directory in which the child keeps the output of
+    failing tests. We only hold the sizes and paths of those files, and output
+    reads just the end of them.
+
     """
 
     module = ''     # the current module dotted module name
-    data = None     # a dictionary, {name:<2-list>}:
+    data = None     # a dictionary, {name:<2-tuple>}:
                     #   0 'error' or 'failure'
-                    #   1 full report
+                    #   1 full report, compressed with zlib
     names = None    # a sorted list of names for which show is True
     totals = ()     # a 4-tuple: (pass5, fail, err, all)
+    started = None  # when all of our tests were last started, per time.time()
+    tests = None    # the names of the tests being re-run, or None for all
+    capture = None  # a directory for the child to capture output into, or None
+    outputs = None  # a dictionary, {name:[(stream, size, path)]} of captured
+                    #   output, for tests that wrote any
+    output_limit = 64 << 10 # the most bytes of each stream that output reads
+    seed = None     # the seed for running tests in random order, or None
 
 
     def __init__(self, module):
@@ -43,6 +61,7 @@ class Detail:
         """
         self.module = module
         self.data = {}
+        self.outputs = {}
         self.names = []
 
     def __repr__(self):
@@ -54,10 +73,10 @@ class Detail:
     # ===================
 
     def __getitem__(self, i):
-        """Takes an int index into self.names
+        """Takes an int index into self.names; returns (name, flop).
         """
         name = self.names[i]
-        return [name] + self.data[name]
+        return (name, self.data[name][0])
 
     def __len__(self):
         return len(self.names)
@@ -66,43 +85,152 @@ class Detail:
         return self.names.__iter__()
 
 
+    def traceback(self, name):
+        """Given a test name, return its full report as a string.
+        """
+        return zlib.decompress(self.data[name][1])
+
+    def output(self, name):
+        """Given a test name, return the output it captured, as a string.
+
+        For each stream we read at most output_limit bytes from the end, and
+        say where to find the rest. If there is no output we return ''.
+
+        """
+        parts = []
+        for stream, size, path in self.outputs.get(name, ()):
+            header = "%s: %d bytes" % (stream, size)
+            try:
+                skipped, text = tail(path, self.output_limit)
+            except (IOError, OSError):
+                skipped, text = 0, "[gone]"
+            if skipped:
+                header += " (the first %d are in %s)" % (skipped, path)
+            parts.append(header + '\n\n' + text)
+        return '\n\n'.join(parts)
+
+    def size(self):
+        """Return roughly how many bytes our results take up.
+        """
+        size = 0
+        for name, (flop, traceback_) in self.data.iteritems():
+            size += len(name) + len(traceback_)
+        return size
+
+    def is_current(self):
+        """Return a boolean: is our source unchanged since our tests started?
+
+        Our source is the file for our TestCase's module, and the __init__.py
+        files of the packages above it, as found on sys.path. Changes to other
+        modules are not noticed.
+
+        """
+        paths = sources(self.module)
+        if (self.started is None) or (not paths):
+            return False
+        for path in paths:
+            try:
+                if os.stat(path).st_mtime >= self.started:
+                    return False
+            except OSError:
+                return False    # gone
+        return True
+
+
     # Main callable
     # =============
 
-    def refresh(self):
-        """Re-run our tests.
+    def refresh(self, tests=None):
+        """Re-run our tests, or just the ones named in the list tests.
+        """
+        proc = self.start(tests)
+        proc.drain()
+        self.finish(proc)
+
+
+    def start(self, tests=None, nice=False):
+        """Start re-running our tests, and return the child Process.
+
+        This is the first half of refresh, for use with an EventLoop. Read the
+        Process as it becomes readable, and when it is done pass it to finish.
+        Only pass tests if we have results for all of our tests already. If
+        nice is True, the child runs at the lowest CPU priority.
+
         """
-        self._call()
+        self.tests = tests
+        if tests is None:
+            self.started = time.time()
+        return self._spawn(nice)
+
+
+    def finish(self, proc):
+        """Given the Process from start, store the results.
+        """
+        try:
+            self.load(proc.result())
+        finally:
+            self.tests = None
+
+
+    def load(self, raw):
+        """Given a detail report as a string, store the results.
+
+        This is how we use a report spooled during a summary run, without
+        running our tests again; set started to when that run started.
+
+        """
+        if BANNER not in raw:
+            raise RefreshError(raw)
+        self.__raw = raw
+        parsing = span(logger, 'parse', module=self.module, bytes=len(raw))
         self._set_data()
+        parsing.end(tests=len(self.names))
 
 
     # Helpers
     # =======
 
     def _call(self):
-        """Invoke a child process and return its output.
+        """Invoke a child process and store its output.
+        """
+        raw = self._spawn().communicate()
+        if BANNER not in raw:
+            raise RefreshError(raw)
+        self.__raw = raw
+
+
+    def _spawn(self, nice=False):
+        """Start a child process and return it.
 
         We hand on our environment and any sys.path manipulations to the child,
         and we capture stderr as well as stdout so we can handle errors.
 
         """
         module, testcase = self.module.rsplit('.', 1)
-        args = ( sys.executable
+        args = [ sys.executable
                , '-u' # unbuffered, so we can interact with it
                , sys.argv[0]
                , '--scripted'
                , '--testcase=%s' % testcase
                , module
-                )
+                ]
+        if self.tests is not None:
+            tests = ['%s.%s' % (testcase, name) for name in self.tests]
+            args.insert(4, '--test=%s' % ','.join(tests))
+        if self.capture is not None:
+            args.insert(4, '--capture=%s' % self.capture)
+        if self.seed is not None:
+            args.insert(4, '--random-order=%d' % self.seed)
         environ = os.environ.copy()
         environ['PYTHONPATH'] = ':'.join(sys.path)
 
-        proc = Process(args=args, env=environ)
-
-        raw = proc.communicate()
-        if BANNER not in raw:
-            raise RefreshError(raw)
-        self.__raw = raw
+        preexec_fn = None
+        if nice:
+            preexec_fn = lambda: os.nice(19)
+        spawning = span(logger, 'spawn', module=self.module)
+        proc = Process(args=args, env=environ, preexec_fn=preexec_fn)
+        spawning.end(pid=proc.pid)
+        return proc
 
 
     def _set_data(self):
@@ -121,7 +249,8 @@ class Detail:
         try:
             all = m.group(1)
         except:
-            logger.debug(self.__raw)
+            logger.debug("no totals in report for %s: %r"
+                        , self.module, result[-200:])
             raise
         fail = err = '0'
         if 'FAILED' in result:
@@ -142,6 +271,7 @@ class Detail:
         # ====
 
         data = {}
+        outputs = {}
         for detail in details:
             flop, name, module, break2, traceback_ = detail.split(None, 4)
             if flop == 'FAIL:':
@@ -150,13 +280,181 @@ class Detail:
                 flop = 'error'
             name = '.'.join((module[1:-1], name))[len(self.module)+1:]
             traceback_ = traceback_.strip()
-            data[name] = [flop, traceback_]
+            if OUTPUT in traceback_:
+                traceback_, outputs[name] = split_output(traceback_)
+            data[name] = (flop, zlib.compress(traceback_))
 
 
         # Update self.
         # ============
-
-        self.totals = totals
-        self.data = data
-        self.names = sorted(data)
+        # If we only re-ran some tests, the totals in the report are just for
+        # those, so we merge and count again.
+
+        if self.tests is None:
+            self.totals = totals
+            self.data = data
+            self.outputs = outputs
+        else:
+            for name in self.tests:
+                if name in self.data:
+                    del self.data[name]
+                if name in self.outputs:
+                    del self.outputs[name]
+            self.data.update(data)
+            self.outputs.update(outputs)
+            self.totals = self._count()
+        self.names = sorted(self.data)
         del self.__raw
+
+
+    def _count(self):
+        """Return totals for all of our tests, from data and our old totals.
+
+        The number of tests comes from our old totals, since data only has
+        records for the tests that didn't pass.
+
+        """
+        all = self.totals[3]
+        fail = err = 0
+        for flop, traceback_ in self.data.itervalues():
+            if flop == 'failure':
+                fail += 1
+            else:
+                err += 1
+        pass5 = '0'
+        if all != '0':
+            pass5 = int(100 * (int(all) - fail - err) / float(all))
+        pass5 = str(pass5) + '%'
+        return (pass5, str(fail), str(err), all)
+
+
+class Cache:
+    """Keep recently used Details, so we can go back to them without a rerun.
+
+    Details are keyed by TestCase name, and are only given back if the TestCase
+    hasn't been run since (per the generation we were given with it), and its
+    source hasn't changed since (per Detail.is_current). We hold at most budget
+    bytes of results, and when we need room we drop the least recently used.
+
+    """
+
+    budget = 16 << 20   # the most bytes of results to hold
+    size = 0            # the bytes of results we hold now
+    clock = 0           # incremented on each use; orders entries by recency
+
+
+    def __init__(self, budget=None):
+        """Takes an int.
+        """
+        if budget is not None:
+            self.budget = budget
+        self.entries = {}   # {name:[used, size, generation, Detail]}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+
+    def get(self, name, generation):
+        """Given a TestCase name and its current generation, return a Detail.
+
+        If we have nothing current, return None.
+
+        """
+        if name not in self.entries:
+            return None
+        entry = self.entries[name]
+        used, size, _generation, detail = entry
+        if (_generation != generation) or (not detail.is_current()):
+            self.discard(name)
+            return None
+        self.clock += 1
+        entry[0] = self.clock
+        return detail
+
+    def put(self, detail, generation):
+        """Given a Detail and the generation its results belong to, keep it.
+        """
+        self.discard(detail.module)
+        size = detail.size()
+        if size > self.budget:
+            return              # too big to keep
+        while self.size + size > self.budget:
+            lru = min([(e[0], n) for n, e in self.entries.iteritems()])[1]
+            self.discard(lru)
+        self.clock += 1
+        self.entries[detail.module] = [self.clock, size, generation, detail]
+        self.size += size
+
+    def discard(self, name):
+        """Given a TestCase name, forget any Detail we have for it.
+        """
+        if name in self.entries:
+            self.size -= self.entries.pop(name)[1]
+
+
+def split_output(traceback_):
+    """Given a traceback from a report, split off its OUTPUT lines.
+
+    We return the traceback without them, and a list of (stream, size, path).
+
+    """
+    lines = traceback_.splitlines()
+    outputs = []
+    while lines and lines[-1].startswith(OUTPUT):
+        stream, size, path = lines.pop()[len(OUTPUT):].split(None, 2)
+        outputs.insert(0, (stream, int(size), path))
+    return '\n'.join(lines).rstrip(), outputs
+
+
+def tail(path, limit):
+    """Given a path and a number of bytes, read at most that many from the end.
+
+    We return the number of bytes skipped, and the text read. If we skip any, we
+    skip on to the start of a line too, where there is one.
+
+    """
+    fp = open(path, 'rb')
+    try:
+        fp.seek(0, 2)
+        skipped = max(0, fp.tell() - limit)
+        fp.seek(skipped)
+        text = fp.read(limit)
+    finally:
+        fp.close()
+    if skipped:
+        i = text.find('\n')
+        if i != -1:
+            skipped += i + 1
+            text = text[i+1:]
+    return skipped, text
+
+
+def sources(name):
+    """Given a TestCase name, return a list of paths to its module's source.
+
+    That's the __init__.py file of each package, and then the module's file,
+    found on sys.path the way import would find them.
+
+    """
+    parts = name.split('.')[:-1]
+    for entry in sys.path:
+        base = os.path.join(entry or os.curdir, parts[0])
+        if os.path.isfile(base + '.py') or \
+           os.path.isfile(os.path.join(base, '__init__.py')):
+            break
+    else:
+        return []
+
+    paths = []
+    path = entry or os.curdir
+    for part in parts:
+        path = os.path.join(path, part)
+        if os.path.isdir(path):
+            paths.append(os.path.join(path, '__init__.py'))
+        else:
+            paths.append(path + '.py')
+            break
+    return paths
@@ -0,0 +1,149 @@
+"""A single-threaded event loop for the interactive interface.
+"""
+import curses
+import errno
+import fcntl
+import heapq
+import logging
+import os
+import select
+import signal
+import struct
+import sys
+import termios
+import time
+
+
+logger = logging.getLogger('testosterone.interactive.loop')
+
+
+class EventLoop:
+    """Wait on the terminal, on worker processes, and on timers, all at once.
+
+    Everything happens in the main thread: we block in select until stdin is
+    readable, the terminal is resized, a watched file descriptor is readable,
+    or a timer is due. SIGWINCH is turned into an event by way of a self-pipe.
+    Nothing is polled, so we use no CPU while idle.
+
+    """
+
+    def __init__(self, stdin=None):
+        """Takes the file descriptor of the terminal; defaults to sys.stdin.
+        """
+        if stdin is None:
+            stdin = sys.stdin.fileno()
+        self.stdin = stdin
+        self.watched = {}   # {fd: callback}
+        self.timers = []    # a heap of (when, seq, timer); timer: [callback]
+        self.seq = 0        # breaks ties between timers due at the same time
+
+        self.pipe = os.pipe()
+        for fd in self.pipe:
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self.__winch = signal.signal(signal.SIGWINCH, self._winch)
+
+    def close(self):
+        """Restore the SIGWINCH handler and close our self-pipe.
+        """
+        signal.signal(signal.SIGWINCH, self.__winch)
+        for fd in self.pipe:
+            os.close(fd)
+
+
+    # Registration
+    # ============
+
+    def watch(self, fd, callback):
+        """Call callback (with no arguments) whenever fd is readable.
+        """
+        self.watched[fd] = callback
+
+    def unwatch(self, fd):
+        if fd in self.watched:
+            del self.watched[fd]
+
+    def call_later(self, delay, callback):
+        """Call callback (with no arguments) in delay seconds; return a timer.
+        """
+        timer = [callback]
+        self.seq += 1
+        heapq.heappush(self.timers, (time.time() + delay, self.seq, timer))
+        return timer
+
+    def cancel(self, timer):
+        """Given a timer from call_later, make sure it never fires.
+        """
+        timer[0] = None
+
+
+    # Main callable
+    # =============
+
+    def wait(self, timeout=None):
+        """Block until something happens, and dispatch it; return a boolean.
+
+        The return value is True if the terminal has input for us. Timers and
+        watched file descriptors are dispatched here; a resize is applied to
+        curses here, and noticed by our caller via getmaxyx.
+
+        """
+        now = time.time()
+        if self._run_timers(now):
+            timeout = 0 # something happened already; don't block
+        elif self.timers:
+            due = self.timers[0][0] - now
+            if (timeout is None) or (due < timeout):
+                timeout = max(due, 0)
+
+        fds = [self.stdin, self.pipe[0]] + self.watched.keys()
+        try:
+            readable = select.select(fds, [], [], timeout)[0]
+        except select.error, err:
+            if err[0] != errno.EINTR:
+                raise
+            readable = [] # a signal; SIGWINCH will be in our pipe next time
+
+        if self.pipe[0] in readable:
+            self._resize()
+        for fd in readable:
+            if fd in self.watched: # may have been unwatched by a callback
+                self.watched[fd]()
+        self._run_timers(time.time())
+
+        return self.stdin in readable
+
+
+    # Helpers
+    # =======
+
+    def _run_timers(self, now):
+        """Fire any timers due by now; return the number fired.
+        """
+        fired = 0
+        while self.timers and self.timers[0][0] <= now:
+            when, seq, timer = heapq.heappop(self.timers)
+            if timer[0] is not None:
+                timer[0]()
+                fired += 1
+        return fired
+
+    def _winch(self, signum, frame):
+        """Signal handler; must be cheap and safe, so just poke our pipe.
+        """
+        try:
+            os.write(self.pipe[1], 'x')
+        except OSError:
+            pass # pipe is full; we've been poked enough already
+
+    def _resize(self):
+        """Drain our pipe, and tell curses about the new terminal size.
+        """
+        try:
+            while os.read(self.pipe[0], 512):
+                pass
+        except OSError:
+            pass
+        raw = fcntl.ioctl(self.stdin, termios.TIOCGWINSZ, 'x'*8)
+        rows, cols = struct.unpack('hhhh', raw)[:2]
+        curses.resizeterm(rows, cols)
@@ -0,0 +1,159 @@
+"""Speculative detail runs for failing TestCases near the cursor.
+"""
+import logging
+import os
+import signal
+import time
+
+from testosterone.interactive.detail import Cache, Detail
+from testosterone.interactive.tree import MODULE
+from testosterone.interactive.utils import CommunicationProblem, Job
+from testosterone.interactive.utils import RefreshError
+
+
+logger = logging.getLogger('testosterone.interactive.prefetch')
+
+
+class Prefetcher:
+    """Run Details in the background, so that going to them is instant.
+
+    While the user is idle on a SummaryScreen, we look near the cursor for
+    failing TestCases that we have no current Detail for, and run them one at a
+    time, in a child process at the lowest CPU priority. Finished Details are
+    held until the user goes to them; see take.
+
+    We stay out of the way of real work: the screen calls cancel before it
+    starts a run of its own, which kills our child process, and we only start
+    when the screen has no Job. We also keep to a CPU budget: after each
+    prefetch we wait long enough that we spend at most budget of wall-clock
+    time running children.
+
+    """
+
+    budget = 0.25   # the most of wall-clock time to spend prefetching
+    delay = 0.5     # how many seconds the user must be idle before we start
+    detail = None   # the Detail we are prefetching, or None
+    enabled = False # whether to prefetch at all
+    generation = 0  # the generation of the TestCase we are prefetching
+    job = None      # the Job for the Detail we are prefetching, or None
+    rows = 5        # how many rows above and below the cursor to look at
+    started = 0     # when we started prefetching detail, per time.time()
+    timer = None    # a timer for when to start, or None
+    wait_until = 0  # when our budget lets us start again, per time.time()
+
+
+    def __init__(self, screen):
+        """Takes a SummaryScreen.
+        """
+        self.screen = screen
+        self.loop = screen.loop
+        self.done = Cache(4 << 20)  # Details we've run; see take
+        self.failed = {}            # {name:generation} for runs that broke
+
+
+    # Called by the screen
+    # ====================
+
+    def schedule(self):
+        """Start prefetching once the user has been idle for a while.
+
+        This is called after each user action. If we're already running a
+        child we leave it be; otherwise we push back our start.
+
+        """
+        if self.timer is not None:
+            self.loop.cancel(self.timer)
+            self.timer = None
+        if self.enabled and (self.job is None):
+            delay = max(self.delay, self.wait_until - time.time())
+            self.timer = self.loop.call_later(delay, self.start)
+
+    def cancel(self):
+        """Stop prefetching, killing any child process, until schedule.
+        """
+        if self.timer is not None:
+            self.loop.cancel(self.timer)
+            self.timer = None
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+            self.detail = None
+
+    def take(self, name, generation):
+        """Given a TestCase name and its generation, return a Detail or None.
+
+        We give a Detail back only once, and only if the TestCase hasn't been
+        run since we prefetched it and its source hasn't changed since.
+
+        """
+        detail = self.done.get(name, generation)
+        if detail is not None:
+            self.done.discard(name)
+        return detail
+
+
+    # Helpers
+    # =======
+
+    def start(self):
+        """Start prefetching the best candidate, if any and if we may.
+        """
+        self.timer = None
+        if (self.screen.job is not None) or (self.job is not None):
+            return
+        name = self.pick()
+        if name is None:
+            return
+        self.detail = Detail(name)
+        self.detail.capture = self.screen.summary.capture_dir()
+        self.detail.seed = self.screen.summary.seed
+        self.generation = self.screen.summary.tree[name].generation
+        self.started = time.time()
+        self.job = Job(self.loop, self.detail.start(nice=True), self.finish)
+
+    def finish(self, proc):
+        """Called by our Job when a prefetch is done; keep it and go on.
+        """
+        detail, self.detail, self.job = self.detail, None, None
+        elapsed = time.time() - self.started
+        self.wait_until = time.time() + elapsed * (1 - self.budget)/self.budget
+        try:
+            detail.finish(proc)
+        except (CommunicationProblem, RefreshError):
+            if proc.poll() is None: # waiting at a Pdb prompt
+                os.kill(proc.pid, signal.SIGTERM)
+                proc.wait()
+            logger.debug("prefetch failed for %s" % detail.module)
+            self.failed[detail.module] = self.generation
+        else:
+            self.done.put(detail, self.generation)
+        self.schedule()
+
+    def pick(self):
+        """Return the name of the failing TestCase to prefetch next, or None.
+
+        We look outward from the cursor, and skip any TestCase that we or the
+        screen already have a current Detail for.
+
+        """
+        listing = self.screen.listing
+        if (listing is None) or (listing.numitems == 0):
+            return None
+        rows = self.screen.rows()
+        for offset in range(self.rows + 1):
+            for i in (listing.curitem + offset, listing.curitem - offset):
+                if not (0 <= i < len(rows)):
+                    continue
+                node = rows[i]
+                if (node.status == MODULE) or not (node.fail or node.err):
+                    continue
+                name = node.name
+                if self.failed.get(name) == node.generation:
+                    continue
+                if name in self.done:
+                    if self.done.get(name, node.generation) is not None:
+                        continue
+                if self.screen.recall(name) is not None:
+                    continue
+                return name
+        return None
@@ -1,10 +1,11 @@
 import logging
 import traceback
 
-from testosterone.interactive.utils import CommunicationProblem
+from testosterone.interactive.utils import Canvas, CommunicationProblem
+from testosterone.log import NULL_SPAN, span
 
 
-logger = logging.getLogger('testosterone.base')
+logger = logging.getLogger('testosterone.screens.base')
 
 
 class BaseScreen:
@@ -13,6 +14,7 @@ class BaseScreen:
     Provides:
 
         H, W -- the height and width of the screen, 0-indexed
+        canvas -- a Canvas on our window; it is flushed after each event
         __loop() -- main event loop; calls react()
         go() -- called by CursesInterface; returns another BaseScreen
                 error handling happens here
@@ -23,6 +25,7 @@ class BaseScreen:
 
     Expects:
 
+        loop -- the EventLoop shared by all screens
         init() -- called after the object is created, but before entering the
                   UI event loop; not called on resizes.
         react() -- method that takes a single curses key character, and returns
@@ -31,16 +34,22 @@ class BaseScreen:
                     resized.
         ui_chars -- sequence of keys to trap
 
+    Work that happens outside of react (in callbacks from the EventLoop) can
+    switch screens by setting next_screen.
+
     """
 
     inited = False
     console_mode = False
+    next_screen = None
 
     def go(self):
         """Interact with the user, return the next screen.
         """
         try:
             self.H = self.W = 0 # triggers a call to resize, redrawing screen
+            self.canvas = Canvas(self.win)
+            self.win.nodelay(not self.console_mode)
             return self.__loop()
         except KeyboardInterrupt, SystemExit:
             raise
@@ -59,6 +68,9 @@ class BaseScreen:
 
     def __loop(self):
         """Main loop.
+
+        We block in our EventLoop between events, so we use no CPU while idle.
+
         """
 
         while 1:
@@ -70,38 +82,67 @@ class BaseScreen:
 
             if (H <= 10) or (W <= 40): # terminal is too small
                 self.win.clear()
-                self.win.refresh()
+                self.canvas.reset()
                 msg = "Terminal too small."
-                if (H == 0) or (W < len(msg)):
-                    continue
-                self.win.addstr(H/2,(W-len(msg))/2,msg)
+                if (H > 0) and (W >= len(msg)):
+                    self.win.addstr(H/2,(W-len(msg))/2,msg)
                 self.win.refresh()
-                c = self.win.getch()
-                if c == ord('q'):
+                if self.__getch() == ord('q'):
                     raise KeyboardInterrupt
                 continue
 
             elif (self.H, self.W) != (H, W): # terminal has been resized
+                rendering = span( logger, 'render'
+                                , screen=self.__class__.__name__
+                                , key='resize'
+                                 )
                 self.win.clear()
-                self.win.refresh()
+                self.canvas.reset()
                 self.H, self.W = (H, W)
                 self.resize()
+                self.canvas.flush()
+                rendering.end()
 
             elif not self.inited:
                 if hasattr(self, 'init'):
                     self.init()
                 self.inited = True
+                self.canvas.flush()
 
-            else: # react to key presses
+            else: # react to key presses and other events
                 screen = None
+                rendering = NULL_SPAN
                 if self.console_mode:
-                    screen = self.react(self.win.getstr())
+                    if self.loop.wait():
+                        screen = self.react(self.win.getstr())
                 else:
-                    c = self.win.getch()
+                    c = self.__getch()
+                    rendering = span( logger, 'render'
+                                    , screen=self.__class__.__name__
+                                    , key=c
+                                     )
                     if c in self.ui_chars:
                         screen = self.react(c)
+                if screen is None:
+                    screen, self.next_screen = self.next_screen, None
                 if screen is not None:
                     return screen
+                self.canvas.flush() # one physical update per event
+                rendering.end()
+
+
+    def __getch(self):
+        """Return the next key press, or None after handling any other event.
+
+        curses may already have input buffered, so we ask it first, and only
+        block in our EventLoop if it has nothing for us.
+
+        """
+        c = self.win.getch()
+        if c == -1:
+            self.loop.wait()
+            c = None
+        return c
 
 
     def getsize(self):
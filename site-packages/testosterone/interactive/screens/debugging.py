@@ -23,6 +23,7 @@ class DebuggingScreen(BaseScreen):
         self.blocks = screen.blocks
         self.proc = proc
         self.win = self.screen.win
+        self.loop = self.screen.loop
 
         curses.nocbreak()
         curses.echo()
@@ -1,11 +1,10 @@
-import Queue
 import curses
 import logging
 import traceback
 from curses import ascii
 
-from testosterone.interactive.detail import Detail
-from testosterone.interactive.utils import Spinner, ScrollArea, format_tb
+from testosterone.interactive.utils import Job, Spinner, ScrollArea
+from testosterone.interactive.utils import format_output, format_tb
 from testosterone.interactive.screens.base import BaseScreen
 from testosterone.interactive.screens.error import ErrorScreen
 
@@ -20,6 +19,9 @@ class DetailScreen(BaseScreen):
     """Represent a detail report for a specific module.
 
         F5/space -- rerun the tests for this module
+        r -- rerun just the selected test
+        f -- rerun just the tests that are failing
+        o -- toggle between the traceback and the output of the selected test
 
 
     """
@@ -31,21 +33,27 @@ class DetailScreen(BaseScreen):
     tests = None    # the left ScrollArea
     result = None   # the right ScrollArea
     detail = None   # a Detail instance
-    curresult = ()  # list of lines in the currently displayed result text
+    curresult = ()  # the lines of the currently displayed result, a Layout
+                    #   for a traceback, or a list for output
+    output = False  # whether to show captured output instead of tracebacks
+    __output = None # (key, lines) for the output last shown; see format_output
     selected = ''   # the name of the currently selected test
+    job = None      # the Job for the child process we are waiting on
 
 
-    def __init__(self, summary):
-        """Takes a dotted module name.
+    def __init__(self, summary, detail):
+        """Takes a SummaryScreen and a Detail that has been refreshed.
         """
         self.summary = summary
         self.win = summary.win
-        self.base = summary.selected
+        self.loop = summary.loop
+        self.base = detail.module
         self.colors = summary.colors
         self.blocks = summary.blocks
-        self.spinner = Spinner(self.spin)
-        self.detail = Detail(self.base)
-        self.refresh()
+        self.spinner = Spinner(self.loop, self.spin)
+        self.detail = detail
+        if self.detail.names:
+            self.selected = self.detail.names[0]
 
 
     # BaseScreen contracts
@@ -53,6 +61,9 @@ class DetailScreen(BaseScreen):
 
     ui_chars = ( ord('q')
                , ord(' ')
+               , ord('r')
+               , ord('f')
+               , ord('o')
                , curses.KEY_F5
                , curses.KEY_BACKSPACE
                , curses.KEY_ENTER
@@ -68,7 +79,7 @@ class DetailScreen(BaseScreen):
                , ascii.TAB
                , ascii.LF
                , ascii.ESC
-                )
+                ) + tuple(range(ord('0'), ord('9')+1))
 
     def init(self):
         if self.detail.names:
@@ -97,6 +108,10 @@ class DetailScreen(BaseScreen):
                 , ascii.ESC
                 , ascii.BS
                 , curses.KEY_LEFT):
+            if self.job is not None:
+                self.job.cancel()
+                self.job = None
+                self.spinner.stop()
             return self.summary
 
         elif c in ( curses.KEY_ENTER            # forward to traceback
@@ -106,16 +121,26 @@ class DetailScreen(BaseScreen):
             if self.selected == '':
                 return StandardError("No test selected.")
             else:
-                traceback_ = self.detail.data[self.selected][1]
+                traceback_ = self.detail.traceback(self.selected)
                 return ErrorScreen(self, traceback_)
 
         elif c in (ord(' '), curses.KEY_F5):    # stay put and refresh
-            self.spinner(self.refresh)
-            if self.detail.totals[0] == '100%': # all tests passed!
-                return self.summary
-            if self.selected not in self.detail.names:
-                self.selected = self.detail.names[0]
-            self.populate()
+            if self.job is not None:
+                curses.beep()
+            else:
+                self.start()
+
+        elif c in (ord('r'), ord('f')):         # refresh some tests
+            if (self.job is not None) or (not self.detail.names):
+                curses.beep()
+            elif c == ord('r'):
+                self.start([self.selected])
+            else:
+                self.start(list(self.detail.names))
+
+        elif c == ord('o'):                     # output <-> traceback
+            self.output = not self.output
+            self.populate_result()
 
 
         # Focus/paging commands
@@ -137,6 +162,8 @@ class DetailScreen(BaseScreen):
                 self.tests.home()
             elif c == curses.KEY_END:   # down
                 self.tests.end()
+            elif ord('0') <= c <= ord('9'): # jump to 0%, 10%, ... 90%
+                self.tests.jump_percent((c - ord('0')) * 10)
         else:
             if c == curses.KEY_UP:      # up
                 self.result.move_cursor(0)
@@ -148,6 +175,8 @@ class DetailScreen(BaseScreen):
                 self.result.page_up()
             elif c == curses.KEY_NPAGE: # page down
                 self.result.page_down()
+            elif ord('0') <= c <= ord('9'): # jump to 0%, 10%, ... 90%
+                self.result.jump_percent((c - ord('0')) * 10)
 
         self.draw_content()
 
@@ -155,24 +184,18 @@ class DetailScreen(BaseScreen):
     # Helpers
     # =======
 
-    def spin(self):
+    def spin(self, frame):
         """Put a 'working' indicator in the banner.
 
-        This is called by our Spinner instance.
+        This is called by our Spinner instance, with None when we're done.
 
         """
-        l = (self.W - len(self.banner)) / 2
-        stop = False
-        while not stop:
-            for i in range(4):
-                spun = "  working%s  " % ('.'*i).ljust(3)
-                self.win.addstr(0,l,spun,self.colors.BLUE)
-                self.win.refresh()
-                try:
-                    stop = self.spinner.flag.get(timeout=0.25)
-                except Queue.Empty:
-                    pass
-        self.draw_banner()
+        if frame is None:
+            self.draw_banner()
+        else:
+            l = (self.W - len(self.banner)) / 2
+            spun = "  working%s  " % ('.'*frame).ljust(3)
+            self.canvas.addstr(0,l,spun,self.colors.BLUE)
 
     def populate(self):
         """[Re]create both ScrollAreas.
@@ -197,27 +220,60 @@ class DetailScreen(BaseScreen):
 
         self.populate_result()
 
+    def format_output(self):
+        """Return the lines of output for the selected test.
+
+        We keep the last one, since we're asked for it on every key press, and
+        it means reading files.
+
+        """
+        name = self.selected
+        key = (name, self.c2[1], tuple(self.detail.outputs.get(name, ())))
+        if (self.__output is None) or (self.__output[0] != key):
+            output = self.detail.output(name) or "No output captured."
+            self.__output = (key, format_output(self.c2[1], output))
+        return self.__output[1]
+
     def populate_result(self):
         """[Re]create just the result ScrollArea.
         """
         if self.selected == '':
             curresult = ()
+        elif self.output:
+            self.curresult = self.format_output()
         else:
-            traceback_ = self.detail.data[self.selected][1]
+            traceback_ = self.detail.traceback(self.selected)
             self.curresult = format_tb(self.c2[1], traceback_)
         self.result = ScrollArea( self.c1[0]+1
                                 , len(self.curresult)
                                 , self.toprows
                                  )
 
-    def refresh(self):
-        """Refresh our results and update the summary too.
+    def start(self, tests=None):
+        """Start refreshing our results in a child process.
+
+        If tests is given, it is a list of test names, and only those are run.
+
         """
-        self.detail.refresh()
-        if not self.selected:
-            if self.detail.names:
-                self.selected = self.detail.names[0]
+        self.summary.prefetcher.cancel()
+        self.job = Job(self.loop, self.detail.start(tests), self.finish)
+        self.spinner.start()
+
+    def finish(self, proc):
+        """Called by our Job; update our results and the summary too.
+        """
+        self.job = None
+        self.spinner.stop()
+        self.detail.finish(proc)
         self.summary.summary.update(self.base, *self.detail.totals)
+        self.summary.remember(self.detail)
+        if self.detail.totals[0] == '100%': # all tests passed!
+            self.next_screen = self.summary
+            return
+        if self.selected not in self.detail.names:
+            self.selected = self.detail.names[0]
+        self.populate()
+        self.draw_content()
 
 
     # Writers
@@ -225,7 +281,7 @@ class DetailScreen(BaseScreen):
 
     def draw_banner(self):
         l = (self.W - len(self.banner)) / 2
-        self.win.addstr(0,l,self.banner,self.colors.BLUE_DIM)
+        self.canvas.addstr(0,l,self.banner,self.colors.BLUE_DIM)
 
 
     def draw_frame(self):
@@ -286,14 +342,9 @@ class DetailScreen(BaseScreen):
         self.win.addch(0,r+1,curses.ACS_RARROW,color)
 
 
-        # Commit our changes.
-        # ===================
-
-        self.win.refresh()
-
 
     def draw_content(self):
-        """Erase the current listing and redraw.
+        """Redraw both panes and the totals, by way of self.canvas.
         """
 
         W = self.W
@@ -318,22 +369,22 @@ class DetailScreen(BaseScreen):
         bg = curses.ACS_CKBOARD
 
         for i in range(self.toprows, self.toprows+self.c1[0]+1):
-            self.win.addstr(i,1,' '*(c1w+4))
-            self.win.addstr(i,c1w+6,' '*(c2w+2))
+            self.canvas.addstr(i,1,' '*(c1w+4))
+            self.canvas.addstr(i,c1w+6,' '*(c2w+2))
 
             if self.tests.bar is None:
-                self.win.addch(i,0,curses.ACS_VLINE,self.colors.WHITE)
+                self.canvas.addch(i,0,curses.ACS_VLINE,self.colors.WHITE)
             elif i in self.tests.bar:
-                self.win.addstr(i,0,' ',tests_scrollbar_color)
+                self.canvas.addstr(i,0,' ',tests_scrollbar_color)
             else:
-                self.win.addch(i,0,bg,tests_scrollbg_color)
+                self.canvas.addch(i,0,bg,tests_scrollbg_color)
 
             if self.result.bar is None:
-                self.win.addch(i,W,curses.ACS_VLINE,self.colors.WHITE)
+                self.canvas.addch(i,W,curses.ACS_VLINE,self.colors.WHITE)
             elif i in self.result.bar:
-                self.win.addstr(i,W,' ',result_scrollbar_color)
+                self.canvas.addstr(i,W,' ',result_scrollbar_color)
             else:
-                self.win.addch(i,W,bg,result_scrollbg_color)
+                self.canvas.addch(i,W,bg,result_scrollbg_color)
 
 
         # tests
@@ -355,7 +406,7 @@ class DetailScreen(BaseScreen):
         if self.focus == RESULT:
             color = self.colors.WHITE
         for index, rownum in self.result:
-            self.win.addstr(rownum,c1w+7,self.curresult[index],color)
+            self.canvas.addstr(rownum,c1w+7,self.curresult[index],color)
 
 
         # Totals
@@ -376,23 +427,17 @@ class DetailScreen(BaseScreen):
 
         h = self.H-1
         w = self.W-21
-        self.win.addstr(h,w,pass5.rjust(4),color)
-        self.win.addstr(h,w+5,fail.rjust(4),color)
-        self.win.addstr(h,w+10,err.rjust(4),color)
-        self.win.addstr(h,w+15,all.rjust(4),color)
+        self.canvas.addstr(h,w,pass5.rjust(4),color)
+        self.canvas.addstr(h,w+5,fail.rjust(4),color)
+        self.canvas.addstr(h,w+10,err.rjust(4),color)
+        self.canvas.addstr(h,w+15,all.rjust(4),color)
 
         base = self.base
         w = w-4
         if len(base) > w:
             base = base[:w-3] + '...'
         base = base.ljust(w)
-        self.win.addstr(self.H-1,3,base,color)
-
-
-        # Commit changes.
-        # ===============
-
-        self.win.refresh()
+        self.canvas.addstr(self.H-1,3,base,color)
 
 
     def draw_row(self, index, rownum):
@@ -406,7 +451,7 @@ class DetailScreen(BaseScreen):
         c1h, c1w = self.c1
         c2h, c2w = self.c2
 
-        name, flub, result = self.detail[index]
+        name, flub = self.detail[index]
 
 
         # Determine highlighting for this row.
@@ -436,13 +481,13 @@ class DetailScreen(BaseScreen):
         if len(name) > c1w:
             name = name[:c1w-3] + '...'
         name = name.ljust(c1w)
-        self.win.addstr(rownum,3,name,color)
+        self.canvas.addstr(rownum,3,name,color)
 
         l = ' '
         r = ' '
         if index == self.tests.curitem:
             l = curses.ACS_RARROW
             r = curses.ACS_LARROW
-        self.win.addch(rownum,1,l,bullet_color)
-        self.win.addch(rownum,c1w+4,r,bullet_color)
+        self.canvas.addch(rownum,1,l,bullet_color)
+        self.canvas.addch(rownum,c1w+4,r,bullet_color)
 
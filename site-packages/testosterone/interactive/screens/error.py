@@ -22,6 +22,7 @@ class ErrorScreen(BaseScreen):
         self.blocks = screen.blocks
         self.traceback_ = traceback_
         self.win = self.screen.win
+        self.loop = self.screen.loop
         self.win.clear()
         self.win.refresh()
 
@@ -36,7 +37,7 @@ class ErrorScreen(BaseScreen):
                , curses.KEY_PPAGE
                , curses.KEY_NPAGE
                , curses.KEY_BACKSPACE
-                )
+                ) + tuple(range(ord('0'), ord('9')+1))
 
     def resize(self):
         try:
@@ -65,6 +66,8 @@ class ErrorScreen(BaseScreen):
                 self.area.page_up()
             elif c == curses.KEY_NPAGE: # page down
                 self.area.page_down()
+            elif ord('0') <= c <= ord('9'): # jump to 0%, 10%, ... 90%
+                self.area.jump_percent((c - ord('0')) * 10)
             self.draw()
         except:
             logger.critical(traceback.format_exc())
@@ -75,13 +78,13 @@ class ErrorScreen(BaseScreen):
 
     def draw(self):
 
-        # Clear the screen and then draw our rows.
+        # Blank the screen and then draw our rows.
         # ========================================
 
-        self.win.clear()
-        self.win.refresh()
+        for i in range(self.H):
+            self.canvas.addstr(i,0,' '*self.W)
         for index, rownum in self.area:
-            self.win.addstr(rownum,0,self.lines[index])
+            self.canvas.addstr(rownum,0,self.lines[index])
 
 
         # Continuation indicators
@@ -93,16 +96,10 @@ class ErrorScreen(BaseScreen):
             c = curses.ACS_UARROW
         else:
             c = ord(' ')
-        self.win.addch(0,self.W,c,color)
+        self.canvas.addch(0,self.W,c,color)
 
         if self.area.end_ < self.area.numitems:
             c = curses.ACS_LANTERN
         else:
             c = ord(' ')
-        self.win.addch(self.H-1,self.W,c,color)
-
-
-        # Commit
-        # ======
-
-        self.win.refresh()
+        self.canvas.addch(self.H-1,self.W,c,color)
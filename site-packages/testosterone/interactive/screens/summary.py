@@ -1,11 +1,15 @@
-import Queue
 import curses
 import logging
+import time
 import traceback
 from curses import ascii
 
+from testosterone.cli.utils import format_size
+from testosterone.interactive.detail import Cache, Detail
+from testosterone.interactive.prefetch import Prefetcher
 from testosterone.interactive.summary import Summary
-from testosterone.interactive.utils import ScrollArea, Spinner
+from testosterone.interactive.tree import MODULE, NOT_RUN, STALE, FRESH
+from testosterone.interactive.utils import Job, ScrollArea, Spinner
 from testosterone.interactive.screens.base import BaseScreen
 from testosterone.interactive.screens.detail import DetailScreen
 from testosterone.interactive.screens.error import ErrorScreen
@@ -20,16 +24,43 @@ class SummaryScreen(BaseScreen):
     UI-driven events:
 
         <ctrl>-F5 -- refresh list of modules, resetting tests to un-run
-        F5/enter/space -- run selected tests, possibly going to results screen
+        F5/enter/space -- run selected tests, possibly going to results screen;
+            enter goes straight to failures from the last run if we have them
+        +/- -- expand/collapse the selected module
+        c -- toggle flat/cumulative results for modules
+        / -- search; type to filter, enter to keep the filter, esc to clear it
+        esc -- cancel the run in flight, keeping finished results; else clear
+            any search
+        f -- toggle showing only failing TestCases
+        n/p -- select the next/previous failing TestCase
+        s -- toggle prefetching details for failing TestCases near the cursor
 
     """
 
     banner = " testosterone " # shows up at the top
     bottomrows = 3          # the number of boilerplate rows at the bottom
+    cache = None            # a Cache of Details from earlier runs
+    cumulative = False      # whether to show rolled-up results for modules
+    growing = None          # a timer for computing more of view
+    interval = 0.1          # the minimum number of seconds between redraws
+                            #   in response to progress
+    job = None              # the Job for the child process we are waiting on
     listing = None          # a ScrollArea
+    memory = False          # whether to measure and show the memory use of
+                            #   TestCases, in a MEM column
+    pending = None          # a timer for a redraw in response to progress
+    prefetcher = None       # a Prefetcher, for speculative detail runs
+    query = None            # the search being typed after '/', or None
+    rerun_failures = 0      # the number of times to rerun failing tests,
+                            #   marking TestCases with their verdicts
+    seed = None             # the seed for running tests in random order,
+                            #   shown in the banner; or None
     selected = ''           # the dotted name of the currently selected item
     summary = {}            # a data dictionary per summarize()
+    target = None           # the name we are running, while we have a job
     toprows = 3             # the number of boilerplate rows at the top
+    view = None             # a View to show instead of summary (search
+                            #   results or failures), or None
     win = None              # a curses window
 
 
@@ -37,20 +68,30 @@ class SummaryScreen(BaseScreen):
         """Takes a CursesInterface object.
         """
         self.win = iface.win
+        self.loop = iface.loop
         self.module = iface.module
         self.colors = iface.colors
         self.blocks = iface.blocks
         self.stopwords = iface.stopwords
-        self.spinner = Spinner(self.spin)
-        self.summary = Summary(self.stopwords)
+        self.memory = iface.memory
+        self.rerun_failures = iface.rerun_failures
+        self.seed = iface.seed
+        if self.seed is not None:
+            self.banner = " testosterone (seed %d) " % self.seed
+        self.spinner = Spinner(self.loop, self.spin)
+        self.summary = Summary( self.stopwords
+                              , self.memory
+                              , self.rerun_failures
+                              , self.seed
+                               )
+        self.cache = Cache()
+        self.prefetcher = Prefetcher(self)
 
 
     # BaseScreen contracts
     # ====================
 
-    ui_chars = ( ord('q')
-               , ord(' ')
-               , curses.KEY_F5
+    ui_chars = ( curses.KEY_F5
                , curses.KEY_ENTER
                , curses.KEY_UP
                , curses.KEY_DOWN
@@ -59,19 +100,24 @@ class SummaryScreen(BaseScreen):
                , curses.KEY_PPAGE
                , curses.KEY_HOME
                , curses.KEY_END
+               , curses.KEY_BACKSPACE
+               , ascii.BS
+               , ascii.DEL
+               , ascii.ESC
                , ascii.LF
                , ascii.FF
-                )
+                ) + tuple(range(32, 127)) # printable, for searching
 
     def init(self):
-        self.spinner(self.summary.refresh, self.module)
-        self.update_selection()
         self.populate()
         self.draw_content()
+        self.start(self.module)
 
     def resize(self):
         c1h = c2h = self.H - self.toprows - self.bottomrows
         c2w = 20
+        if self.memory:
+            c2w += 5
         c1w = self.W - c2w - 7
         self.c1 = (c1h, c1w)
         self.c2 = (c2h, c2w)
@@ -82,6 +128,11 @@ class SummaryScreen(BaseScreen):
 
     def react(self, c):
 
+        if self.query is not None:      # typing a search
+            self.type(c)
+            self.draw_content()
+            return
+
         if c == ord('q'):
             raise KeyboardInterrupt
         elif c == ord('h'):
@@ -107,10 +158,39 @@ class SummaryScreen(BaseScreen):
             self.listing.home()
         elif c == curses.KEY_END:       # end
             self.listing.end()
+        elif ord('0') <= c <= ord('9'): # jump to 0%, 10%, ... 90%
+            self.listing.jump_percent((c - ord('0')) * 10)
+        elif c == ord('+'):             # expand
+            self.expand()
+        elif c == ord('-'):             # collapse
+            self.collapse()
+        elif c == ord('c'):             # toggle flat/cumulative
+            self.cumulative = not self.cumulative
+        elif c == ord('/'):             # start a search
+            self.query = ''
+            self.search('')
+        elif c == ascii.ESC:            # cancel any run, else clear search
+            if self.job is not None:
+                self.cancel()
+            else:
+                self.search(None)
+        elif c == ord('f'):             # toggle failures only
+            self.toggle_failures()
+        elif c == ord('n'):             # next failure
+            self.next_failure(forward=True)
+        elif c == ord('p'):             # previous failure
+            self.next_failure(forward=False)
+        elif c == ord('s'):             # toggle prefetching
+            self.prefetcher.enabled = not self.prefetcher.enabled
+            if not self.prefetcher.enabled:
+                self.prefetcher.cancel()
 
 
         # Actions that do work
         # ====================
+        # One thing at a time: a new run preempts the one in flight, which
+        # keeps whatever results it has so far, unless it's for the same row.
+        # Showing results we already have leaves the run in flight alone.
 
         elif c == ascii.FF:             # refresh our TestCase list
             self.reload()
@@ -122,47 +202,305 @@ class SummaryScreen(BaseScreen):
                    ):
 
             # Update the summary if we are on a module/package, or go to a
-            # DetailScreen if we are on a TestCase and not all tests pass.
-
-            if self.selected:
-                isTestCase = self.summary.data[self.selected][0]
-                if isTestCase:          # TestCase
-                    detailscreen = self.spinner(DetailScreen, self)
-                    if c != ord(' '):
-                        if detailscreen.detail.totals[0] != '100%':
-                            return detailscreen
+            # DetailScreen if we are on a TestCase and not all tests pass. If
+            # we still have failures from the last run of the TestCase, we show
+            # those right away, unless asked to run it again (space or F5).
+
+            if self.listing.numitems == 0:
+                curses.beep()           # nothing matches our search
+            elif (self.job is not None) and (self.selected == self.target):
+                curses.beep()           # already running it
+            elif self.selected:
+                node = self.summary.tree[self.selected]
+                if node.status != MODULE:   # TestCase
+                    detail = prefetched = None
+                    if c not in (ord(' '), curses.KEY_F5):
+                        detail = self.recall(self.selected)
+                        prefetched = self.prefetcher.take( self.selected
+                                                         , node.generation
+                                                          )
+                    if detail is not None:
+                        return DetailScreen(self, detail)
+                    elif prefetched is not None:
+                        self.finish_detail(prefetched, enter=True)
+                    else:
+                        self.start_detail(enter=(c != ord(' ')))
                 else:                   # module/package
-                    self.spinner( self.summary.refresh
-                                , self.selected
-                                , find_only=False
-                                 )
-                    self.update_selection()
+                    self.start(self.selected, find_only=False)
 
             else:
                 raise StandardError("No module selected.")
 
 
         self.draw_content()
+        self.prefetcher.schedule()
 
 
     # Helpers
     # =======
 
+    def close(self):
+        """Clean up after our Summary; called by CursesInterface on exit.
+        """
+        self.summary.close()
+
     def reload(self):
-        self.summary = Summary(self.stopwords)
-        self.spinner(self.summary.refresh, self.module)
+        self.cancel()
+        self.prefetcher.cancel()
+        self.prefetcher = Prefetcher(self)
+        self.summary.close()
+        self.summary = Summary( self.stopwords
+                              , self.memory
+                              , self.rerun_failures
+                              , self.seed
+                               )
+        self.cache = Cache()
+        self.search(None)
+        self.start(self.module)
+
+    def start(self, module, find_only=True):
+        """Start refreshing our summary in a child process.
+        """
+        self.cancel()
+        self.prefetcher.cancel()
+        progress = None
+        if not find_only:
+            progress = self.progress
+        proc = self.summary.start(module, find_only, progress)
+        self.job = Job(self.loop, proc, self.finish)
+        self.target = module
+        self.spinner.start()
+
+    def finish(self, proc):
+        """Called by our Job when the child process from start is done.
+        """
+        self.job = self.target = None
+        self.spinner.stop()
+        self.summary.finish(proc)
         self.update_selection()
+        self.refilter()             # pick up any new names
+        self.populate()
+        self.draw_content()
+        self.prefetcher.schedule()
+
+    def start_detail(self, enter):
+        """Start running the selected TestCase in a child process.
+
+        When it's done we update our summary, and if enter is True and not all
+        tests passed, we go to a DetailScreen.
+
+        """
+        self.cancel()
+        self.prefetcher.cancel()
+        detail = Detail(self.selected)
+        detail.capture = self.summary.capture_dir()
+        detail.seed = self.seed
+        def finish(proc):
+            self.job = self.target = None
+            self.spinner.stop()
+            detail.finish(proc)
+            self.finish_detail(detail, enter)
+        self.job = Job(self.loop, detail.start(), finish)
+        self.target = detail.module
+        self.spinner.start()
+
+    def cancel(self):
+        """Kill the run in flight, if any, keeping the results that came in.
+
+        For a module that means the TestCases that finished, and their spooled
+        failures; for a TestCase there's nothing to keep.
+
+        """
+        if self.job is None:
+            return
+        self.job.cancel()
+        self.job = self.target = None
+        self.spinner.stop()
+        self.summary.cancel()
+        self.refilter()
+        self.populate()
+
+    def finish_detail(self, detail, enter):
+        """Given a Detail that was just run, update our summary with it.
+
+        If enter is True and not all tests passed, we go to a DetailScreen.
+
+        """
+        self.summary.update(detail.module, *detail.totals)
+        self.remember(detail)
+        if enter and (detail.totals[0] != '100%'):
+            self.next_screen = DetailScreen(self, detail)
+        else:
+            self.draw_content()
+
+    def recall(self, name):
+        """Given a TestCase name, return a Detail from its last run, or None.
+
+        If it was last run on its own we may have the Detail in our cache, and
+        if it was last run as part of a module our summary may have spooled
+        its failures. Either way the source mustn't have changed since.
+
+        """
+        generation = self.summary.tree[name].generation
+        detail = self.cache.get(name, generation)
+        if detail is None:
+            detail = self.summary.detail(name)
+        return detail
+
+    def remember(self, detail):
+        """Given a Detail that was just run, cache it if any tests failed.
+
+        Call this after updating our summary with its totals.
+
+        """
+        if detail.totals[0] == '100%':
+            self.cache.discard(detail.module)
+        else:
+            generation = self.summary.tree[detail.module].generation
+            self.cache.put(detail, generation)
+
+    def expand(self):
+        """Show the children of the selected module.
+        """
+        if (self.view is not None) or (not self.selected) or \
+           (self.summary.tree[self.selected].status != MODULE):
+            curses.beep()   # nothing selected, or a TestCase
+            return
+        self.summary.expand(self.selected)
+        self.populate()
+
+    def collapse(self):
+        """Hide the children of the selected module, or of a TestCase's module.
+        """
+        if (self.view is not None) or (not self.selected):
+            curses.beep()
+            return
+        name = self.selected
+        node = self.summary.tree[name]
+        if (not node.kids) or (not node.expanded):
+            node = node.parent
+        if node is self.summary.tree.root:
+            curses.beep()   # top-level leaf or collapsed module
+            return
+        self.summary.collapse(node.name)
+        self.selected = node.name
+        self.populate()
+
+    def type(self, c):
+        """Given a key pressed while typing a search, update the search.
+        """
+        if c in (ascii.LF, curses.KEY_ENTER):   # keep the filter
+            self.query = None
+            if not self.view.query:
+                self.search(None)
+        elif c == ascii.ESC:                    # clear the filter
+            self.query = None
+            self.search(None)
+        elif c in (curses.KEY_BACKSPACE, ascii.BS, ascii.DEL):
+            self.query = self.query[:-1]
+            self.search(self.query)
+        elif 32 < c < 127:                      # no spaces in names
+            self.query += chr(c)
+            self.search(self.query)
+        else:
+            curses.beep()
+
+    def toggle_failures(self):
+        """Show only failing TestCases, or go back to showing all rows.
+        """
+        if (self.view is not None) and (self.view.query is None):
+            self.search(None)
+        else:
+            self.search(None)
+            self.view = self.summary.failures()
+            self.populate()
+
+    def refilter(self):
+        """Recompute our View, if we have one, to pick up new results.
+        """
+        if self.view is None:
+            return
+        elif self.view.query is None:   # failures
+            self.view = self.summary.failures()
+        else:
+            self.search(self.view.query)
+
+    def next_failure(self, forward):
+        """Select the next (or previous) failing TestCase that we can show.
+
+        Failures are found with the summary's failure index, not by looking
+        through rows. Collapsed modules are expanded as needed.
+
+        """
+        tree = self.summary.tree
+        rows = self.rows()
+        name = self.selected
+        while True:
+            if forward:
+                name = tree.next_failing(name)
+            else:
+                name = tree.previous_failing(name)
+            if name is None:
+                curses.beep()       # no more failures in that direction
+                return
+            if rows is self.summary:
+                self.summary.reveal(name)
+                break
+            try:
+                rows.index(name)
+                break
+            except ValueError:
+                continue            # not in our search View
+        self.selected = name
+        self.populate()
+        self.listing.jump(rows.index(name))
+
+    def search(self, query):
+        """Given a query, show only matching rows; given None, show all rows.
+
+        Matching rows are computed a chunk at a time, in between events, so the
+        first screenful shows up right away no matter how many rows there are.
+
+        """
+        if self.growing is not None:
+            self.loop.cancel(self.growing)
+            self.growing = None
+        if query is None:
+            self.view = None
+        else:
+            self.view = self.summary.search(query)
+            if self.view.extend():
+                self.growing = self.loop.call_later(0, self.grow)
+        self.populate()
+
+    def grow(self):
+        """Compute another chunk of our search View.
+        """
+        self.growing = None
+        if self.view.extend():
+            self.growing = self.loop.call_later(0, self.grow)
+        self.populate()
+        self.draw_content()
+
+    def rows(self):
+        """Return what we are listing: our search View, or else our Summary.
+        """
+        if self.view is not None:
+            return self.view
+        return self.summary
 
     def populate(self):
         """[Re]create the scroll area if needed.
 
         In order to retain the current page and selection, we only recreate the
-        pane if its size parameters have changed.
+        pane if its size parameters have changed, and when we do we jump to the
+        selected item.
 
         """
 
+        rows = self.rows()
         args = { 'numrows': self.c1[0]+1
-               , 'numitems':len(self.summary)
+               , 'numitems':len(rows)
                , 'toprow': self.toprows
                 }
 
@@ -172,27 +510,48 @@ class SummaryScreen(BaseScreen):
             for k,v in args.items():
                 if getattr(self.listing, k) != v:
                     self.listing = ScrollArea(**args)
+                    if self.selected in self.summary.tree:
+                        name = self.selected
+                        if rows is self.summary:
+                            while not self.summary.tree.is_visible(name):
+                                name = self.summary.tree[name].parent.name
+                        try:
+                            self.listing.jump(rows.index(name))
+                        except ValueError:
+                            pass # not in our search View (yet)
                     break
 
 
-    def spin(self):
+    def progress(self, name):
+        """Called by Summary each time a TestCase finishes during a run.
+
+        Results can arrive much faster than we can draw them, so we coalesce:
+        the first result schedules a redraw self.interval seconds out, and any
+        results that arrive in the meantime are picked up by that same redraw.
+
+        """
+        if self.pending is None:
+            self.pending = self.loop.call_later(self.interval, self.redraw)
+
+    def redraw(self):
+        self.pending = None
+        if (self.view is not None) and (self.view.query is None):
+            self.refilter()         # failures come and go during a run
+        self.populate()
+        self.draw_content()
+
+    def spin(self, frame):
         """Put a 'working' indicator in the banner.
 
-        This is called by our Spinner instance.
+        This is called by our Spinner instance, with None when we're done.
 
         """
-        l = (self.W - len(self.banner)) / 2
-        stop = False
-        while not stop:
-            for i in range(4):
-                spun = "  working%s  " % ('.'*i).ljust(3)
-                self.win.addstr(0,l,spun,self.colors.BLUE)
-                self.win.refresh()
-                try:
-                    stop = self.spinner.flag.get(timeout=0.25)
-                except Queue.Empty:
-                    pass
-        self.draw_banner()
+        if frame is None:
+            self.draw_banner()
+        else:
+            l = (self.W - len(self.banner)) / 2
+            spun = "  working%s  " % ('.'*frame).ljust(3)
+            self.canvas.addstr(0,l,spun,self.colors.BLUE)
 
     def update_selection(self):
         if (not self.selected) and self.summary.names:
@@ -204,7 +563,7 @@ class SummaryScreen(BaseScreen):
 
     def draw_banner(self):
         l = (self.W - len(self.banner)) / 2
-        self.win.addstr(0,l,self.banner,self.colors.BLUE_DIM)
+        self.canvas.addstr(0,l,self.banner,self.colors.BLUE_DIM)
 
 
     def draw_frame(self):
@@ -272,16 +631,17 @@ class SummaryScreen(BaseScreen):
         self.win.addstr(1,self.W-c2w-1+5,"FAIL",bold)
         self.win.addstr(1,self.W-c2w-1+10," ERR",bold)
         self.win.addstr(1,self.W-c2w-1+15," ALL",bold)
+        if self.memory:
+            self.win.addstr(1,self.W-c2w-1+20," MEM",bold)
 
 
-        # Commit writes.
-        # ==============
-
-        self.win.refresh()
-
 
     def draw_content(self):
         """Draw the list of modules; called on almost every UI event.
+
+        We write every visible cell, but through self.canvas, so only the cells
+        that actually changed reach the terminal when the canvas is flushed.
+
         """
 
         W = self.W
@@ -296,15 +656,15 @@ class SummaryScreen(BaseScreen):
         bg = curses.ACS_CKBOARD
 
         for i in range(self.toprows, self.toprows+self.listing.numrows):
-            self.win.addstr(i,1,' '*(c1w+3))
-            self.win.addstr(i,c1w+5,' '*(c2w+2))
+            self.canvas.addstr(i,1,' '*(c1w+3))
+            self.canvas.addstr(i,c1w+5,' '*(c2w+2))
 
             if self.listing.bar is None:
-                self.win.addch(i,W,curses.ACS_VLINE,self.colors.WHITE)
+                self.canvas.addch(i,W,curses.ACS_VLINE,self.colors.WHITE)
             elif i in self.listing.bar:
-                self.win.addstr(i,W,' ',self.blocks.BLUE)
+                self.canvas.addstr(i,W,' ',self.blocks.BLUE)
             else:
-                self.win.addch(i,W,bg,self.colors.BLUE)
+                self.canvas.addch(i,W,bg,self.colors.BLUE)
 
 
         # Write listing rows if we have any.
@@ -315,11 +675,26 @@ class SummaryScreen(BaseScreen):
             parent = ''
             for index, rownum  in self.listing:
                 parent = self.draw_row(index, rownum, parent)
-            self.selected = self.summary.names[self.listing.curitem]
+            self.selected = self.rows().names[self.listing.curitem]
+
+
+        # Update totals and search.
+        # =========================
 
+        if self.summary.running:
+            self.draw_running()
+        elif self.summary.totals:       # else nothing to show yet
+            self.draw_totals()
+        if (self.query is not None) or (self.view is not None):
+            self.draw_search()
+
+
+    def draw_totals(self):
+        """Draw totals for the most recent run in the footer.
+        """
 
-        # Update totals.
-        # ==============
+        c1h, c1w = self.c1
+        c2h, c2w = self.c2
 
         tpass5, tfail, terr, tall = self.summary.totals
         if tpass5 == '-':
@@ -340,22 +715,98 @@ class SummaryScreen(BaseScreen):
 
         h = self.toprows + 1 + c1h + 1
         w = self.W-c2w-1
-        self.win.addstr(h,w,tpass5.rjust(4),color)
-        self.win.addstr(h,w+5,tfail.rjust(4),color)
-        self.win.addstr(h,w+10,terr.rjust(4),color)
-        self.win.addstr(h,w+15,tall.rjust(4),color)
+        self.canvas.addstr(h,w,tpass5.rjust(4),color)
+        self.canvas.addstr(h,w+5,tfail.rjust(4),color)
+        self.canvas.addstr(h,w+10,terr.rjust(4),color)
+        self.canvas.addstr(h,w+15,tall.rjust(4),color)
 
         module = self.summary.module
+        if (module in self.summary.tree) and '%' in tpass5:
+            module += ' (%.2fs)' % self.summary.tree[module].seconds
         if len(module) > c1w:
             module = module[:c1w-3] + '...'
         module = module.ljust(c1w)
-        self.win.addstr(h,3,module,color)
+        self.canvas.addstr(h,3,module,color)
+
+
+    def draw_search(self):
+        """Draw the current search or filter, and how many rows it has.
+        """
+
+        c1h, c1w = self.c1
+
+        query = self.query
+        if query is None:
+            query = self.view.query
+        if query is None:               # failures only
+            msg = 'failures only'
+        else:
+            msg = '/' + query
+        if self.query is not None:      # still typing
+            msg += '_'
+        if self.view is not None:
+            more = ''
+            if not self.view.done:
+                more = '+'
+            msg += '  (%d%s rows)' % (len(self.view), more)
+        if len(msg) > c1w:
+            msg = msg[:c1w-3] + '...'
+        msg = msg.ljust(c1w)
+
+        h = self.toprows + 1 + c1h + 1
+        self.canvas.addstr(h,3,msg,self.colors.WHITE)
+
+
+    def draw_running(self):
+        """Draw running totals, throughput and an ETA in the footer.
+        """
 
+        c1h, c1w = self.c1
+        c2h, c2w = self.c2
 
-        # Finally, commit our writes.
-        # ===========================
+        planned, tfail, terr, tall, started = self.summary.running
+        done = tall
+
+        tpass5 = '- '
+        color = self.colors.WHITE
+        if tall:
+            tpass5 = int(100 * (tall - tfail - terr) / float(tall))
+            tpass5 = str(tpass5) + '%'
+            color = self.colors.GREEN
+            if tfail or terr:
+                color = self.colors.RED
+        tfail, terr, tall = [str(i) for i in (tfail, terr, tall)]
+        if len(tfail) > 4:
+            tfail = '9999'
+        if len(terr) > 4:
+            terr = '9999'
+        if len(tall) > 4:
+            tall = '9999'
 
-        self.win.refresh()
+        h = self.toprows + 1 + c1h + 1
+        w = self.W-c2w-1
+        self.canvas.addstr(h,w,tpass5.rjust(4),color)
+        self.canvas.addstr(h,w+5,tfail.rjust(4),color)
+        self.canvas.addstr(h,w+10,terr.rjust(4),color)
+        self.canvas.addstr(h,w+15,tall.rjust(4),color)
+
+
+        # Throughput and ETA
+        # ==================
+
+        elapsed = time.time() - started
+        rate = eta = '-'
+        if done and elapsed:
+            _rate = done / elapsed
+            rate = '%.1f' % _rate
+            if planned >= done:
+                eta = int((planned - done) / _rate)
+                eta = '%d:%02d' % divmod(eta, 60)
+        msg = "running: %d/%d tests, %s/s, ETA %s" % (done, planned, rate, eta)
+        if len(msg) > c1w:
+            msg = msg[:c1w-3] + '...'
+        msg = msg.ljust(c1w)
+        self.canvas.addstr(h,3,msg,color)
 
 
     def draw_row(self, index, rownum, parent):
@@ -370,30 +821,34 @@ class SummaryScreen(BaseScreen):
         c1h, c1w = self.c1
         c2h, c2w = self.c2
 
-        name, stats, fresh = self.summary[index]
+        node = self.rows()[index]
+        name = node.name
+        status = self.summary.status(node)
 
 
         # Pick a color, and see if we have a result to show.
         # ==================================================
+        # Results are stored as numbers; this is where they become strings.
 
-
-        if stats is None:           # module/package
+        if node.status == MODULE:   # module/package
 
             color = self.colors.GRAY
-            show_result = False
+            show_result = self.cumulative
+            if show_result:
+                pass5, fail, err, all = self.summary.rollup(name)
 
         else:                       # TestCase
 
-            pass5, fail, err, all = stats
+            pass5, fail, err, all = self.summary.rollup(name)
 
-            if fresh is None:           # not run yet
+            if status == NOT_RUN:       # not run yet
                 color = self.colors.WHITE
-            elif fresh is False:        # run but not most recently
+            elif status == STALE:       # run but not most recently
                 if pass5 != '100%':
                     color = self.colors.RED_DIM
                 else:
                     color = self.colors.GREEN_DIM
-            elif fresh is True:         # just run
+            elif status == FRESH:       # just run
                 if pass5 != '100%':
                     color = self.colors.RED
                 else:
@@ -419,10 +874,16 @@ class SummaryScreen(BaseScreen):
                 all = '9999'
 
             w = self.W-c2w-1
-            self.win.addstr(rownum,w,pass5.rjust(4),color)
-            self.win.addstr(rownum,w+5,fail.rjust(4),color)
-            self.win.addstr(rownum,w+10,err.rjust(4),color)
-            self.win.addstr(rownum,w+15,all.rjust(4),color)
+            self.canvas.addstr(rownum,w,pass5.rjust(4),color)
+            self.canvas.addstr(rownum,w+5,fail.rjust(4),color)
+            self.canvas.addstr(rownum,w+10,err.rjust(4),color)
+            self.canvas.addstr(rownum,w+15,all.rjust(4),color)
+
+        if self.memory:
+            mem = ''
+            if node.peak:
+                mem = format_size(node.peak)
+            self.canvas.addstr(rownum,self.W-c2w-1+20,mem.rjust(4),color)
 
 
         # Short name, with indent.
@@ -431,10 +892,14 @@ class SummaryScreen(BaseScreen):
         i = len('.'.join(self.module.split('.')[:-1]))
         parts = name[i:].lstrip('.').split('.')
         shortname = ('  '*(len(parts)-1)) + parts[-1]
+        if node.verdicts:
+            shortname += ' ' + node.verdicts
+        if (not node.expanded) and (self.view is None):
+            shortname += ' [+]'
         if len(shortname) > c1w:
             shortname = shortname[:c1w-3] + '...'
         shortname = shortname.ljust(c1w)
-        self.win.addstr(rownum,3,shortname,color)
+        self.canvas.addstr(rownum,3,shortname,color)
 
 
         # Bullet(s)
@@ -450,8 +915,8 @@ class SummaryScreen(BaseScreen):
             r = curses.ACS_LARROW
         elif parent and name.startswith(parent):
             l = r = curses.ACS_BULLET
-        self.win.addch(rownum,1,l,a)
-        self.win.addch(rownum,self.W-1,r,a)
+        self.canvas.addch(rownum,1,l,a)
+        self.canvas.addch(rownum,self.W-1,r,a)
 
 
         return parent
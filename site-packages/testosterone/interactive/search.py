@@ -0,0 +1,243 @@
+"""Incremental search, and other filtered views of the names in a Tree.
+"""
+import bisect
+import re
+
+
+class Index:
+    """Map the components of dotted names to the Nodes that have them.
+
+    Tree.add keeps this up to date, so it costs nothing to build at search
+    time. Components are lowercased, since we match case-insensitively. There
+    are usually far fewer distinct components than names (think 'TestCase'),
+    so matching a query against components is cheap even for huge trees.
+
+    """
+
+    def __init__(self):
+        self.nodes = {}         # {component:[Node]}
+        self.last = ('', None)  # (query, components) from the last match
+
+    def add(self, node):
+        """Given a Node, index it by each component of its part.
+        """
+        for component in node.part.lower().split('.'):
+            if component not in self.nodes:
+                self.nodes[component] = []
+                self.last = ('', None) # new component; start over next time
+            self.nodes[component].append(node)
+
+    def match(self, query):
+        """Given a query, return a list of matching components.
+
+        A component matches if it contains the query. If no component does, we
+        fall back to fuzzy matching: a component matches if it contains the
+        characters of the query in order. When a query extends the previous one
+        we only look at the components that matched last time.
+
+        """
+        query = query.lower()
+        previous, components = self.last
+        if (components is None) or (not query.startswith(previous)):
+            components = self.nodes.keys()
+        substring = [c for c in components if query in c]
+        if substring:
+            self.last = (query, substring)
+            return substring
+        fuzzy = re.compile('.*?'.join([re.escape(c) for c in query]))
+        self.last = ('', None) # fuzzy matches don't narrow substring matches
+        return [c for c in components if fuzzy.search(c) is not None]
+
+    def hits(self, query):
+        """Given a query, return a set of the Nodes whose parts match it.
+        """
+        hits = set()
+        for component in self.match(query):
+            hits.update(self.nodes[component])
+        return hits
+
+
+class View:
+    """Represent the names in a Tree that match a search, in sorted order.
+
+    A name is in the view if it matches, or if it is beneath one that does (so
+    searching for a module shows all of its TestCases), or if it is above one
+    that does (so results are shown in context). Collapsed modules are ignored.
+
+    The view is virtual: names are computed a bit at a time, by calling extend,
+    so that we can show the first screenful of results right away, and stay
+    responsive while the rest are found. The names computed so far are in
+    self.names, and done is True once they are all there. We support the same
+    container protocol as Summary.
+
+    """
+
+    chunk = 2000    # the default number of nodes to visit per extend call
+    sparse = 20000  # the most hits for which we prune the tree up front
+
+    def __init__(self, tree, query):
+        self.tree = tree
+        self.query = query
+        self.names = []
+        self.done = False
+
+        components = tree.index.match(query)
+        nhits = 0
+        for component in components:
+            nhits += len(tree.index.nodes[component])
+        if nhits <= self.sparse:
+            hits = set()
+            for component in components:
+                hits.update(tree.index.nodes[component])
+            self.__steps = self._prune(hits)
+        else:
+            self.__steps = self._stream(set(components))
+
+
+    # Container emulation
+    # ===================
+
+    def __getitem__(self, i):
+        """Takes an int index into self.names; returns a Node.
+        """
+        return self.tree[self.names[i]]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return self.names.__iter__()
+
+    def index(self, name):
+        """Given a name in the view, return its int index into self.names.
+        """
+        i = bisect.bisect_left(self.names, name)
+        if (i == len(self.names)) or (self.names[i] != name):
+            raise ValueError("%s is not in the view" % name)
+        return i
+
+
+    # Main callable
+    # =============
+
+    def extend(self, n=None):
+        """Visit up to n more nodes (default: self.chunk); return a boolean.
+
+        The return value is True if there are more nodes to visit.
+
+        """
+        if n is None:
+            n = self.chunk
+        names = self.names
+        for i in xrange(n):
+            try:
+                found = self.__steps.next()
+            except StopIteration:
+                self.done = True
+                break
+            names.extend(found)
+        return not self.done
+
+
+    # Helpers
+    # =======
+    # These are generators that visit one node per iteration, yielding a list
+    # of the names that the visit adds to the view (often empty).
+
+    def _prune(self, hits):
+        """Given a set of matching Nodes, walk only the parts that we need.
+
+        This is for when there are few hits. We first mark every ancestor of a
+        hit, and then skip any subtree that neither contains a hit nor is
+        beneath one.
+
+        """
+        above = set()
+        for node in hits:
+            node = node.parent
+            while (node is not None) and (node not in above):
+                above.add(node)
+                node = node.parent
+
+        root = self.tree.root
+        if root not in above:
+            return
+        stack = [(root.children[part], False) for part in reversed(root.kids)]
+        while stack:
+            node, beneath = stack.pop()
+            beneath = beneath or (node in hits)
+            if not (beneath or (node in above)):
+                yield []
+                continue
+            if node.kids:
+                children = node.children
+                for part in reversed(node.kids):
+                    stack.append((children[part], beneath))
+            yield [node.name]
+
+    def _stream(self, components):
+        """Given a set of matching components, walk the whole tree.
+
+        This is for when there are many hits, so that marking their ancestors
+        up front would be slow. Instead we keep track of the path to the node
+        we're visiting, and add the unshown part of it to the view when we come
+        to a hit.
+
+        """
+        root = self.tree.root
+        if not root.kids:
+            return
+        path = []   # [name, shown] for each ancestor of the current node
+        stack = [(root.children[part], False, 0) for part in reversed(root.kids)]
+        while stack:
+            node, beneath, depth = stack.pop()
+            del path[depth:]
+            if not beneath:
+                for component in node.part.lower().split('.'):
+                    if component in components:
+                        beneath = True
+                        break
+            found = []
+            if beneath:
+                for ancestor in path:
+                    if not ancestor[1]:
+                        found.append(ancestor[0])
+                        ancestor[1] = True
+                found.append(node.name)
+            path.append([node.name, beneath])
+            if node.kids:
+                children = node.children
+                for part in reversed(node.kids):
+                    stack.append((children[part], beneath, depth+1))
+            yield found
+
+
+class Failures(View):
+    """Represent the failing TestCases in a Tree, and their ancestors.
+
+    This is built from the Tree's failure index, so it costs time in proportion
+    to the number of failures, not the size of the tree, and is done at once.
+    Collapsed modules are ignored, as for View.
+
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.query = None
+        self.names = []
+        self.done = True
+
+        shown = set()
+        for name in tree.failing:   # sorted, and ancestors sort first
+            ancestors = []
+            node = tree[name].parent
+            while (node is not tree.root) and (node not in shown):
+                shown.add(node)
+                ancestors.append(node.name)
+                node = node.parent
+            ancestors.reverse()
+            self.names.extend(ancestors)
+            self.names.append(name)
+
+    def extend(self, n=None):
+        return False
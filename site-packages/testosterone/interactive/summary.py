@@ -1,10 +1,20 @@
+import bisect
 import logging
 import os
+import shutil
 import subprocess
 import sys
-
-from testosterone.cli.utils import BANNER, BORDER, HEADERS
+import tempfile
+import time
+
+from testosterone.cli.utils import BANNER_LEFT, BORDER, HEADERS, HEADERS_MEM
+from testosterone.cli.utils import SPOOL, TICK, parse_size
+from testosterone.cli.reruns import MARKERS
+from testosterone.interactive.detail import Detail
+from testosterone.interactive.search import Failures, View
+from testosterone.interactive.tree import Tree, RAN, FRESH, NOT_RUN, STALE
 from testosterone.interactive.utils import RefreshError, Process
+from testosterone.log import NULL_SPAN, span
 
 
 logger = logging.getLogger('testosterone.interactive.summary')
@@ -15,39 +25,95 @@ class Summary:
 
     This is designed to be a persistent object. Repeated calls to refresh will
     update the dataset. On partial updates, existing data will be marked as
-    stale. There is also a show flag for each record; only items for which this
-    are true are included in the name index and __len__ calls.
+    stale. Results are kept in a Tree, as numbers and status codes on each Node;
+    use rollup to format them for display, and status to tell whether they are
+    fresh. Modules may be expanded or collapsed in the Tree, and only names
+    whose ancestors are all expanded are included in the name index and __len__
+    calls.
+
+    When tests are run, the child also appends a detail report for each failing
+    TestCase to our spool file, and we keep the offset of each in details, so
+    that detail can give a Detail without running the TestCase again. Only the
+    offsets are held in memory. The spool lasts as long as we do; call close
+    to remove it.
+
+    Likewise, the output of failing tests is captured into a directory of ours,
+    which we share with the Details we hand out; see capture_dir.
+
+    If memory is True, the child measures the peak memory use of each TestCase
+    as well, and we keep it on the TestCase's Node as peak. If rerun_failures
+    is an int, the child reruns failing tests that many times, and we keep the
+    markers of their verdicts on the TestCase's Node as verdicts. If seed is an
+    int, the child runs tests in random order with that seed, the same order
+    each time.
 
     """
 
     module = ''     # the current module dotted module name
-    data = None     # a dictionary, {name:(stats, fresh)}:
-                    #   stats: None or (pass5, fail, err, all)
-                    #   fresh: None or False or True
-    names = None    # a sorted list of names for which show is True
+    names = None    # a sorted list of names that are visible in tree
+    tree = None     # a Tree of modules and TestCases, with their results
+    generation = 0  # incremented at the start of each run; results from
+                    #   earlier generations are stale
     run = True      # the current state of the run flag
+    memory = False  # whether to measure the memory use of TestCases
+    rerun_failures = 0 # the number of times to rerun failing tests
+    seed = None     # the seed for running tests in random order, or None
     totals = ()     # a single 4-tuple per summarize()
+    progress = None # a callable taking a TestCase name, or None
+    running = ()    # running totals while a run is in progress, a 5-tuple:
+                    #   (planned, fail, err, all, started)
+    spool = None    # the path to our spool file, or None before the first run
+    capture = None  # the path to our capture directory, or None before use
+    details = None  # a dictionary, {name:(offset, length, started)} of
+                    #   spooled detail reports for failing TestCases
+    __span = NULL_SPAN # times the current run, for the log
+    __spooled = 0   # the size of the spool when the current run started
+    __started = 0   # when the current run started, per time.time()
     __lines = None  # for communication between _set_totals and _set_data
+    __trailer = ()  # for communication between _set_totals and _set_verdicts
     __raw = ''      # for communication between _call and _set_data
 
 
-    def __init__(self, stopwords=()):
-        """Takes a sequence.
+    def __init__(self, stopwords=(), memory=False, rerun_failures=0,
+                 seed=None):
+        """Takes a sequence, a boolean, an int, and an int or None.
         """
         self.stopwords = stopwords
-        self.data = {}
+        self.memory = memory
+        self.rerun_failures = rerun_failures
+        self.seed = seed
         self.totals = ()
         self.names = []
+        self.tree = Tree()
+        self.details = {}
+
+    def close(self):
+        """Remove our spool file and capture directory, if we have them.
+        """
+        if self.spool is not None:
+            os.remove(self.spool)
+            self.spool = None
+        if self.capture is not None:
+            shutil.rmtree(self.capture, True)
+            self.capture = None
+
+    def capture_dir(self):
+        """Return the path to our capture directory, making it if need be.
+        """
+        if self.capture is None:
+            self.capture = tempfile.mkdtemp( prefix='testosterone-'
+                                           , suffix='.capture'
+                                            )
+        return self.capture
 
 
     # Container emulation
     # ===================
 
     def __getitem__(self, i):
-        """Takes an int index into self.names
+        """Takes an int index into self.names; returns a Node.
         """
-        name = self.names[i]
-        return [name] + self.data[name]
+        return self.tree[self.names[i]]
 
     def __len__(self):
         """Only count items for which show is True.
@@ -58,21 +124,200 @@ class Summary:
         return self.names.__iter__()
     iterkeys = __iter__
 
+    def status(self, node):
+        """Given a Node, return its status code: MODULE, NOT_RUN, STALE or FRESH.
+        """
+        if node.status != RAN:
+            return node.status
+        elif node.generation == self.generation:
+            return FRESH
+        else:
+            return STALE
+
+    def rollup(self, name):
+        """Given a name, return cumulative (pass5, fail, err, all) for it.
+
+        The format is the same as for the rows of a summarize() report, and for
+        a TestCase these are its own results.
+
+        """
+        node = self.tree[name]
+        if not node.ran:
+            return ('-', '-', '-', str(node.all))
+        pass5 = (node.ran - node.fail - node.err) / float(node.ran)
+        pass5 = str(int(round(pass5*100))) + '%'
+        return (pass5, str(node.fail), str(node.err), str(node.all))
+
+    def index(self, name):
+        """Given a visible name, return its int index into self.names.
+        """
+        i = bisect.bisect_left(self.names, name)
+        if (i == len(self.names)) or (self.names[i] != name):
+            raise ValueError("%s is not visible" % name)
+        return i
+
+
+    def search(self, query):
+        """Given a query, return a View of the matching names.
+        """
+        return View(self.tree, query)
+
+    def detail(self, name):
+        """Given a TestCase name, return a Detail from the spool, or None.
+
+        We only have a Detail for a TestCase that had failures or errors when
+        it was last run as part of a module, and whose source hasn't changed
+        since.
+
+        """
+        if name not in self.details:
+            return None
+        offset, length, started = self.details[name]
+        fp = open(self.spool)
+        fp.seek(offset)
+        raw = fp.read(length)
+        fp.close()
+        detail = Detail(name)
+        detail.capture = self.capture
+        detail.seed = self.seed
+        detail.load(raw)
+        detail.started = started
+        if not detail.is_current():
+            del self.details[name]
+            return None
+        return detail
+
+    def failures(self):
+        """Return a View of the failing TestCases and their ancestors.
+        """
+        return Failures(self.tree)
+
+
+    # Expanding and collapsing
+    # ========================
+    # Since names is sorted, the visible descendants of a name are exactly the
+    # names that immediately follow it and start with name + '.'; we splice
+    # them in or out without touching the rest of the list.
+
+    def expand(self, name):
+        """Show the children of the module name.
+        """
+        node = self.tree[name]
+        if node.expanded:
+            return
+        node.expanded = True
+        if self.tree.is_visible(name):
+            i = self.index(name) + 1
+            self.names[i:i] = list(self.tree.walk(node))
+
+    def collapse(self, name):
+        """Hide the descendants of the module name.
+        """
+        node = self.tree[name]
+        if (not node.expanded) or (not node.kids):
+            return
+        node.expanded = False
+        if self.tree.is_visible(name):
+            i = self.index(name) + 1
+            j = bisect.bisect_left(self.names, name + '/', i) # '/' follows '.'
+            del self.names[i:j]
+
+
+    def reveal(self, name):
+        """Expand any collapsed ancestors of name, so that it is visible.
+        """
+        ancestors = []
+        node = self.tree[name].parent
+        while node is not self.tree.root:
+            ancestors.append(node.name)
+            node = node.parent
+        ancestors.reverse()     # expand from the top down
+        for ancestor in ancestors:
+            self.expand(ancestor)
+
 
     # Main callable
     # =============
 
-    def refresh(self, module, find_only=True):
+    def refresh(self, module, find_only=True, progress=None):
         """Update our information.
+
+        If progress is given, it is called with the name of each TestCase as
+        soon as the child reports a result for it, and self.running is kept up
+        to date until we return.
+
+        """
+        proc = self.start(module, find_only, progress)
+        proc.drain()
+        self.finish(proc)
+
+
+    def start(self, module, find_only=True, progress=None):
+        """Start updating our information, and return the child Process.
+
+        This is the first half of refresh, for use with an EventLoop. Read the
+        Process as it becomes readable, and when it is done pass it to finish.
+
         """
         self.module = module
         self.find_only = find_only
-
-        self._call()
+        self.progress = progress
+        self.__span = span(logger, find_only and 'discover' or 'run'
+                          , module=module)
 
         self._set_stale()
+        if not find_only:
+            self.running = (0, 0, 0, 0, time.time())
+            if self.spool is None:
+                fd, self.spool = tempfile.mkstemp( prefix='testosterone-'
+                                                 , suffix='.spool'
+                                                  )
+                os.close(fd)
+            self.__spooled = os.path.getsize(self.spool)
+            self.__started = time.time()
+        return self._spawn()
+
+
+    def finish(self, proc):
+        """Given the Process from start, finish updating our information.
+        """
+        self.running = ()
+        self.progress = None
+        self.__span.end()
+
+        raw = proc.result()
+        if BANNER_LEFT not in raw:
+            raise RefreshError(raw)
+        self.__raw = raw
+
+        parsing = span(logger, 'parse', module=self.module, bytes=len(raw))
         self._set_totals()
         self._set_data()
+        if not self.find_only:
+            self._set_details()
+            self._set_verdicts()
+        parsing.end(names=len(self.tree))
+
+
+    def cancel(self):
+        """Stop updating our information, keeping the results we have so far.
+
+        Call this after killing the Process from start. The TestCases that the
+        child finished are already in our tree, from progress ticks, and we
+        index whatever detail reports it got into our spool. Cancelling a
+        find_only update leaves us as we were.
+
+        """
+        if not self.running:
+            return      # not running tests
+        self.running = ()
+        self.progress = None
+        self.__span.end(cancelled=1)
+        self._set_details()
+        if self.module in self.tree:
+            self.totals = self.rollup(self.module)
+        else:
+            self.totals = ()
 
 
     def update(self, name, pass5, fail, err, all):
@@ -81,19 +326,31 @@ class Summary:
         This is called from DetailScreen.
 
         """
-        if name not in self.data:
+        if name not in self.tree:
             raise StandardError("Running detail for module not in " +
                                 "summary: %s." % name)
         self._set_stale()
-        self.data[name] = [(pass5, fail, err, all), True]
-        self.totals = [pass5, fail, err, all]
+        self._record(name, (pass5, fail, err, all))
+        if name in self.details:    # superseded by the caller's Detail
+            del self.details[name]
+        if self.module in self.tree:
+            self.totals = self.rollup(self.module)
 
 
     # Helpers
     # =======
 
     def _call(self):
-        """Invoke a child process and return its output.
+        """Invoke a child process and store its output.
+        """
+        raw = self._spawn().communicate()
+        if BANNER_LEFT not in raw:
+            raise RefreshError(raw)
+        self.__raw = raw
+
+
+    def _spawn(self):
+        """Start a child process and return it.
 
         We hand on our environment and any sys.path manipulations to the child,
         and we capture stderr as well as stdout so we can handle errors.
@@ -106,42 +363,213 @@ class Summary:
                , '--scripted'
                , self.module
                 ]
+        if self.seed is not None:
+            args.insert(4, '--random-order=%d' % self.seed)
         if self.find_only:
             args.insert(4, '--find-only')
+        else:
+            if self.spool is not None:
+                args.insert(4, '--spool=%s' % self.spool)
+                args.insert(4, '--capture=%s' % self.capture_dir())
+            if self.progress is not None:
+                args.insert(4, '--progress')
+            if self.memory:
+                args.insert(4, '--memory')
+            if self.rerun_failures:
+                args.insert(4, '--rerun-failures=%d' % self.rerun_failures)
 
         environ = os.environ.copy()
         environ['PYTHONPATH'] = ':'.join(sys.path)
 
+        spawning = span(logger, 'spawn', module=self.module)
         proc = Process(args=args, env=environ)
+        spawning.end(pid=proc.pid)
+        if self.progress is not None:
+            proc.listener = self._tick
+        return proc
 
-        raw = proc.communicate()
-        if BANNER not in raw:
-            raise RefreshError(raw)
-        self.__raw = raw
+
+    def _tick(self, line):
+        """Given one line of output from our child, apply it if it's progress.
+        """
+        if not line.startswith(TICK):
+            return
+        tokens = line[len(TICK):].split()
+        planned, tfail, terr, tall, started = self.running
+
+        if tokens[0] == 'PLAN':
+            self.running = (int(tokens[1]), tfail, terr, tall, started)
+            return
+        if tokens[0] == 'RERUN':
+            self._verdict(tokens[1], tokens[2])
+            self.progress(tokens[1].rsplit('.', 1)[0])
+            return
+
+        name = tokens[0]
+        stats = tuple(tokens[1:5])
+        seconds = peak = None
+        if len(tokens) > 5:
+            seconds = float(tokens[5])
+        if len(tokens) > 6:
+            peak = int(tokens[6])
+        if name not in self.tree:
+            names = set([name])
+            self._add_ancestors(name, names)
+            self._add_names(names)
+        self._record(name, stats, seconds, peak)
+
+        pass5, fail, err, all = stats
+        self.running = ( planned
+                       , tfail + int(fail)
+                       , terr + int(err)
+                       , tall + int(all)
+                       , started
+                        )
+        self.progress(name)
+
+
+    def _add_ancestors(self, name, names):
+        """Given a TestCase name, add the names of its parent modules to names.
+        """
+        module_dotted, testcase = name.rsplit('.',1)
+
+        parts = module_dotted.split('.')
+        for i in range(len(parts),self.module.count('.'),-1):
+            names.add('.'.join(parts[:i]))
+
+
+    def _add_names(self, names):
+        """Given a sequence of names, add any new ones to tree and names.
+
+        The first time through we build names with a walk of the tree; after
+        that we insert each new visible name in place.
+
+        """
+        new = sorted([n for n in names if n not in self.tree])
+        for name in new:    # parents sort before their children
+            self.tree.add(name)
+        if not self.names:
+            self.names = list(self.tree.walk())
+        else:
+            for name in new:
+                if self.tree.is_visible(name):
+                    bisect.insort(self.names, name)
+
+
+    def _record(self, name, stats, seconds=None, peak=None):
+        """Given a TestCase name and its stats as strings, store them in tree.
+
+        This is where we convert from the report format to numbers. If seconds
+        is None we keep the time we had, since only progress ticks tell us how
+        long a TestCase took. Likewise for peak, in bytes, since only runs that
+        measure memory give it. Verdicts are cleared, since any for this result
+        come after it.
+
+        """
+        node = self.tree[name]
+        pass5, fail, err, all = stats
+        all = int(all)
+        if pass5 == '-':            # found but not run
+            fail = err = ran = 0
+            seconds = 0.0
+            node.status = NOT_RUN
+        else:
+            fail, err, ran = int(fail), int(err), all
+            if seconds is None:
+                seconds = node.seconds
+            node.status = RAN
+            node.generation = self.generation
+        if (not (fail or err)) and (name in self.details):
+            del self.details[name]  # passing now, or not run
+        if peak is not None:
+            node.peak = peak
+        node.verdicts = ''
+        self.tree.record(name, fail, err, all, ran, seconds)
+
+
+    def _verdict(self, test, verdict):
+        """Given a test name (TestCase plus method) and a verdict, mark it.
+        """
+        name = test.rsplit('.', 1)[0]
+        if name not in self.tree:
+            return
+        node = self.tree[name]
+        marker = MARKERS.get(verdict, '')
+        if marker not in node.verdicts:
+            node.verdicts += marker
+
+
+    def _set_details(self):
+        """Index the detail reports that the child added to our spool.
+
+        Reports are preceded by a header line with the name and length, so we
+        read headers and seek past reports, without parsing them. If the child
+        was killed partway through a report, we stop before it.
+
+        """
+        fp = open(self.spool)
+        size = os.fstat(fp.fileno()).st_size
+        fp.seek(self.__spooled)
+        while True:
+            header = fp.readline()
+            if not (header.startswith(SPOOL) and header.endswith('\n')):
+                break               # end of file
+            name, length = header[len(SPOOL):].split()
+            length = int(length)
+            if fp.tell() + length > size:
+                break               # cut off
+            self.details[name] = (fp.tell(), length, self.__started)
+            fp.seek(length, 1)
+        fp.close()
 
 
     def _set_stale(self):
-        """Mark currently fresh data as stale.
+        """Mark currently fresh data as stale, by starting a new generation.
+
+        This is constant-time: nodes remember the generation they were run in,
+        and status compares that with ours.
+
         """
-        for name, datum in self.data.iteritems():
-            if datum[1] is True:
-                datum[1] = False
+        self.generation += 1
 
 
     def _set_totals(self):
         """Given self.__raw, set totals and __lines on self.
+
+        The footer is the last TOTALS line; what comes after it (the heaviest
+        TestCases, leaks, verdicts) we keep in __trailer for _set_verdicts.
+
         """
         lines = self.__raw.splitlines()
-        self.totals = tuple(lines[-1].split()[1:])
-        del lines[-1]
-        self.__lines = lines
+        i = len(lines) - 1
+        while (i > 0) and not lines[i].startswith('TOTALS'):
+            i -= 1
+        self.totals = tuple(lines[i].split()[1:5])
+        self.__lines = lines[:i]
+        self.__trailer = lines[i+1:]
+
+
+    def _set_verdicts(self):
+        """Mark TestCases with the verdicts listed in __trailer, if any.
+        """
+        reading = False
+        for line in self.__trailer:
+            if line.startswith('RERUN FAILURES'):
+                reading = True
+            elif not line:
+                reading = False
+            elif reading and line != BORDER:
+                test, marker, verdict = line.split()
+                self._verdict(test, verdict)
+        self.__trailer = ()
 
 
     def _set_data(self):
         """Extract and store data from __lines.
         """
 
-        data = {}
+        rows = []
+        names = set()
         reading_report = False # ignore any output that precedes our report
 
         for line in self.__lines:
@@ -150,10 +578,11 @@ class Summary:
             # ===========================================================
 
             line = line.strip('\n')
-            if line == BANNER:
+            if line.startswith(BANNER_LEFT):
                 reading_report = True
                 continue
-            if (not reading_report) or (not line) or line in (HEADERS, BORDER):
+            if (not reading_report) or (not line) or \
+               line in (HEADERS, HEADERS_MEM, BORDER):
                 continue
             tokens = line.split()
 
@@ -162,25 +591,19 @@ class Summary:
             # =====================================
             # The raw report lists TestCases by full dotted name, but we want to
             # only show short names, and indent under a module tree. So we add
-            # all parent modules to data, and set their value to (None, None)
+            # all parent modules to the tree as well.
 
             name = tokens[0]
-            stats = tuple(tokens[1:])
-
-            module_dotted, testcase = name.rsplit('.',1)
-
-            parts = module_dotted.split('.')
-            for i in range(len(parts),self.module.count('.'),-1):
-                ancestor = '.'.join(parts[:i])
-                data[ancestor] = [None, None]
-
-            fresh = None
-            if '-' not in stats:
-                fresh = True
-
-            data[name] = [stats, fresh]
-
-        self.data.update(data)
-        self.names = sorted(self.data.keys())
+            stats = tuple(tokens[1:5])
+            peak = None
+            if len(tokens) > 5 and tokens[5] != '-':
+                peak = parse_size(tokens[5])
+
+            self._add_ancestors(name, names)
+            names.add(name)
+            rows.append((name, stats, peak))
+
+        self._add_names(names)
+        for name, stats, peak in rows:
+            self._record(name, stats, None, peak)
         del self.__lines
-
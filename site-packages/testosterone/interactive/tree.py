@@ -0,0 +1,226 @@
+"""A tree of modules and TestCases, for display with expand/collapse.
+"""
+import bisect
+
+from testosterone.interactive.search import Index
+
+
+# Status codes
+# ============
+
+MODULE = 0      # a module or package; it has no results of its own
+NOT_RUN = 1     # a TestCase that has been found but not run
+RAN = 2         # a TestCase that was run, in generation Node.generation
+
+# These are derived from RAN by comparing generations; see Summary.status.
+STALE = 3       # a TestCase that was run, but not most recently
+FRESH = 4       # a TestCase that was part of the most recent run
+
+
+class Node(object):
+    """Represents one module, package, or TestCase in a Tree.
+
+    The counts and seconds are cumulative: for a TestCase they are its own, and
+    for a module or package they are the sums over all TestCases beneath it.
+    They are kept as numbers; it's up to the caller to format them for display.
+
+    We use __slots__, and the components of names are interned, so that each
+    Node costs a fixed couple hundred bytes. See Tree for measurements.
+
+    """
+
+    __slots__ = ( 'name'        # the full dotted name; '' for the root
+                , 'part'        # name relative to our parent's, interned
+                , 'parent'      # a Node, or None for the root
+                , 'children'    # None, or a dictionary, {part:Node}
+                , 'kids'        # None, or a sorted list of children's keys
+                , 'expanded'    # whether our children are shown
+                , 'status'      # MODULE, NOT_RUN, or RAN
+                , 'generation'  # for RAN, the generation it was run in
+                , 'fail'        # the number of failures
+                , 'err'         # the number of errors
+                , 'all'         # the number of tests, run or not
+                , 'ran'         # the number of tests that have been run
+                , 'seconds'     # the time it took to run them
+                , 'peak'        # for a TestCase, its peak memory use in bytes,
+                                #   when measured; 0 otherwise
+                , 'verdicts'    # for a TestCase, the markers of the verdicts
+                                #   on its rerun failures; '' otherwise
+                 )
+
+    def __init__(self, name, parent):
+        self.name = name
+        if parent is None or parent.parent is None: # root or top-level
+            self.part = intern(name)
+        else:
+            self.part = intern(name[len(parent.name)+1:])
+        self.parent = parent
+        self.children = self.kids = None # leaves are the common case
+        self.expanded = True
+        self.status = MODULE
+        self.generation = 0
+        self.fail = self.err = self.all = self.ran = 0
+        self.seconds = 0.0
+        self.peak = 0
+        self.verdicts = ''
+
+    def __repr__(self):
+        return "<Node %s>" % self.name
+    __str__ = __repr__
+
+    def add(self, node):
+        """Given a Node, add it as a child of ours.
+        """
+        if self.children is None:
+            self.children = {}
+            self.kids = []
+        self.children[node.part] = node
+        bisect.insort(self.kids, node.part)
+
+
+class Tree:
+    """Represent a hierarchy of dotted names.
+
+    Nodes are indexed by name in self.nodes, and each Node keeps a sorted list
+    of its children's names, so adding a name touches only its own branch. The
+    root node has the empty string for a name, and is never shown.
+
+    Names are Python identifiers joined by dots, and '.' sorts before any
+    character in an identifier, so a pre-order walk of the tree gives names in
+    the same order as sorted() would.
+
+    We also keep a sorted list of the names of TestCases with failures or
+    errors, updated in record, so that finding failures never means scanning
+    the whole tree.
+
+    Memory use is about 600 bytes per TestCase, all told, in a Summary: 575 MB
+    for a million TestCases (about 10 million tests) on 64-bit Python 2.7,
+    measured as the growth in resident size when loading a summarize() report.
+    Storing a dictionary of string tuples as well came to about 2100 bytes.
+
+    """
+
+    root = None     # the root Node
+    nodes = None    # a dictionary, {name:Node}
+    index = None    # an Index of name components, for searching
+    failing = None  # a sorted list of the names of failing TestCases
+
+    def __init__(self):
+        self.root = Node('', None)
+        self.nodes = {}
+        self.index = Index()
+        self.failing = []
+
+    def __contains__(self, name):
+        return name in self.nodes
+
+    def __getitem__(self, name):
+        return self.nodes[name]
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+    # Changing the tree
+    # =================
+
+    def add(self, name):
+        """Given a dotted name, add a Node for it if needed, and return it.
+
+        The nearest ancestor we already have becomes the parent; if we have
+        none, the root does. So add ancestors before their descendants (adding
+        names in sorted order does this).
+
+        """
+        if name in self.nodes:
+            return self.nodes[name]
+        parent = self.root
+        ancestor = name
+        while '.' in ancestor:
+            ancestor = ancestor.rsplit('.', 1)[0]
+            if ancestor in self.nodes:
+                parent = self.nodes[ancestor]
+                break
+        node = Node(name, parent)
+        parent.add(node)
+        self.nodes[name] = node
+        self.index.add(node)
+        return node
+
+
+    def record(self, name, fail, err, all, ran, seconds):
+        """Given a TestCase name and its results, update rollups.
+
+        We apply the difference from what we had before to the TestCase and
+        each of its ancestors, so this is proportional to the depth of the
+        tree, not its size. The failure index changes only when the TestCase
+        starts or stops failing.
+
+        """
+        node = self.nodes[name]
+        was_failing = bool(node.fail or node.err)
+        if (fail or err) and not was_failing:
+            bisect.insort(self.failing, name)
+        elif was_failing and not (fail or err):
+            del self.failing[bisect.bisect_left(self.failing, name)]
+        dfail = fail - node.fail
+        derr = err - node.err
+        dall = all - node.all
+        dran = ran - node.ran
+        dseconds = seconds - node.seconds
+        while node is not None:
+            node.fail += dfail
+            node.err += derr
+            node.all += dall
+            node.ran += dran
+            node.seconds += dseconds
+            node = node.parent
+
+
+    # Querying the tree
+    # =================
+
+    def is_visible(self, name):
+        """Given a name, return a boolean: are all of its ancestors expanded?
+        """
+        node = self.nodes[name].parent
+        while node is not self.root:
+            if not node.expanded:
+                return False
+            node = node.parent
+        return True
+
+    def next_failing(self, name):
+        """Given a name, return the first failing TestCase after it, or None.
+        """
+        i = bisect.bisect_right(self.failing, name)
+        if i == len(self.failing):
+            return None
+        return self.failing[i]
+
+    def previous_failing(self, name):
+        """Given a name, return the last failing TestCase before it, or None.
+        """
+        i = bisect.bisect_left(self.failing, name)
+        if i == 0:
+            return None
+        return self.failing[i-1]
+
+    def walk(self, node=None):
+        """Yield the names of the visible descendants of node, in order.
+
+        node defaults to the root. It is not itself included.
+
+        """
+        if node is None:
+            node = self.root
+        if (not node.expanded) or (not node.kids):
+            return
+        stack = [node.children[part] for part in reversed(node.kids)]
+        while stack:
+            node = stack.pop()
+            yield node.name
+            if node.expanded and node.kids:
+                children = node.children
+                for part in reversed(node.kids):
+                    stack.append(children[part])
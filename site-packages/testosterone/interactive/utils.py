@@ -1,14 +1,25 @@
-import Queue
+import bisect
 import curses
+import errno
 import logging
+import os
+import select
+import signal
+import string
 import subprocess
 import textwrap
-import threading
 import traceback
 from curses import ascii
 
 logger = logging.getLogger('testosterone.interactive.utils')
 
+WHITESPACE = string.maketrans( string.whitespace       # for Layout.fits
+                             , ' ' * len(string.whitespace)
+                              )
+CONTROL = string.maketrans( ''.join(map(chr, range(32))) + '\x7f'
+                          , '?' * 33                    # for format_output
+                           )
+
 
 class Bucket:
     """
@@ -40,6 +51,10 @@ class Process(subprocess.Popen):
     prompt = '(Pdb) ' # The signal that it wants to talk.
     intro = '' # If it wants to talk, this will be the first thing it said.
     interactive = False # whether or not we are interacting with the child
+    listener = None # a callable taking each complete line of output, or None
+    output = None # a list of the chunks of output since the last communicate
+    __line = '' # the incomplete last line of output, for listener
+    __tail = '' # the end of our output, for detecting prompt
 
     def __init__(self, *args, **kwargs):
         """Extend to capture I/O streams.
@@ -50,6 +65,7 @@ class Process(subprocess.Popen):
                    }
         kwargs.update(_kwargs)
         subprocess.Popen.__init__(self, *args, **kwargs)
+        self.output = []
 
 
     def __str__(self):
@@ -65,29 +81,71 @@ class Process(subprocess.Popen):
         the conversation is over, use self.poll().
 
         """
-
         if input is not None:
             self.stdin.write(input + '\n')
+        self.output = []
+        self.drain()
+        return self.result(input)
 
-        output = []
-        i = len(self.prompt)
 
+    def drain(self):
+        """Block until the process is done or wants to talk.
+        """
+        fd = self.stdout.fileno()
         while 1:
-            retcode = self.poll()
-            if retcode is None:
-                # Conversation not done; check to see if it's our turn to talk.
-                if len(output) >= i:
-                    latest = ''.join(output[-i:])
-                    if latest == self.prompt:
-                        self.interactive = True
-                        break
-                output.append(self.stdout.read(1))
-            else:
-                # The process is done; assume we can read to EOF.
-                output.append(self.stdout.read())
+            try:
+                select.select([fd], [], [])
+            except select.error, err:
+                if err[0] != errno.EINTR:
+                    raise
+                continue
+            if not self.read():
                 break
 
-        output = ''.join(output)
+
+    def read(self):
+        """Read whatever output is ready; return False if no more is coming.
+
+        No more is coming when the process has closed its output or is waiting
+        for us to talk (in which case self.interactive is set). This doesn't
+        block if select says our stdout is readable, which makes it suitable
+        for use with an EventLoop.
+
+        """
+        data = os.read(self.stdout.fileno(), 4096)
+        if not data: # EOF
+            self.wait()
+            if self.__line and (self.listener is not None):
+                self.listener(self.__line)
+            self.__line = ''
+            return False
+
+        self.output.append(data)
+
+        if self.listener is not None:
+            lines = (self.__line + data).split('\n')
+            self.__line = lines.pop()
+            for line in lines:
+                self.listener(line)
+
+        # Check to see if it's our turn to talk.
+        i = len(self.prompt)
+        self.__tail = (self.__tail + data)[-i:]
+        if (self.__tail == self.prompt) and (self.poll() is None):
+            self.interactive = True
+            return False
+
+        return True
+
+
+    def result(self, input=None):
+        """Return all output since the last communicate.
+
+        If input is None, then raise CommunicationProblem if the process wants
+        to talk.
+
+        """
+        output = ''.join(self.output)
         if self.interactive and (input is None):
             self.intro = output
             raise CommunicationProblem(self)
@@ -95,36 +153,158 @@ class Process(subprocess.Popen):
             return output
 
 
+class Job:
+    """Represent a Process that we read from within an EventLoop.
+
+    When the process is done (or wants to talk), we stop watching it and call
+    callback with the Process. The callback will usually want to call result on
+    it, which raises CommunicationProblem if appropriate.
+
+    """
+
+    def __init__(self, loop, proc, callback):
+        """Takes an EventLoop, a Process, and a callable.
+        """
+        self.loop = loop
+        self.proc = proc
+        self.callback = callback
+        self.fd = proc.stdout.fileno()
+        self.loop.watch(self.fd, self.readable)
+
+    def __repr__(self):
+        return "<Job %s>" % self.proc
+
+    def readable(self):
+        if not self.proc.read():
+            self.loop.unwatch(self.fd)
+            self.callback(self.proc)
+
+    def cancel(self):
+        """Stop watching our process, and kill it.
+        """
+        self.loop.unwatch(self.fd)
+        if self.proc.poll() is None:
+            os.kill(self.proc.pid, signal.SIGTERM)
+            self.proc.wait()
+
+
 class Spinner:
-    """Represent a random work indicator, handled in a separate thread.
+    """Represent a work indicator, animated by timers on an EventLoop.
     """
 
-    def __init__(self, spin):
-        """Takes a callable that actually draws/undraws the spinner.
+    interval = 0.25     # seconds between frames
+    timer = None        # our pending timer, if we are spinning
+
+    def __init__(self, loop, spin):
+        """Takes an EventLoop and a callable that draws the spinner.
+
+        The callable is given the number of the frame to draw (0-3), or None to
+        undraw the spinner.
+
         """
+        self.loop = loop
         self.spin = spin
-        self.flag = Queue.Queue(1)
 
     def start(self):
         """Show a spinner.
         """
-        self.thread = threading.Thread(target=self.spin)
-        self.thread.start()
+        if self.timer is None:
+            self.frame = 0
+            self.tick()
 
     def stop(self):
         """Stop the spinner.
         """
-        self.flag.put(True)
-        self.thread.join()
+        if self.timer is not None:
+            self.loop.cancel(self.timer)
+            self.timer = None
+            self.spin(None)
+
+    def tick(self):
+        self.spin(self.frame)
+        self.frame = (self.frame + 1) % 4
+        self.timer = self.loop.call_later(self.interval, self.tick)
+
+
+
+
+class Canvas:
+    """Buffer writes to a curses window, and only commit cells that changed.
+
+    We keep a record of what each cell of the window currently shows. Writes
+    during a frame go into a pending buffer, where later writes overlay earlier
+    ones, so it's fine to blank a row and then write over it. On flush, we
+    compare the pending buffer with what is on the screen, write only the runs
+    of cells that differ, and then commit everything with a single doupdate.
+
+    Only cells written through us are tracked. If the window is cleared or
+    written to directly, call reset so that we forget what we think is there.
+
+    """
 
-    def __call__(self, call, *args, **kwargs):
-        """Convenient way to run a routine with a spinner.
+    def __init__(self, win):
+        """Takes a curses window.
         """
-        self.start()
-        try:
-            return call(*args, **kwargs)
-        finally:
-            self.stop()
+        self.win = win
+        self.reset()
+
+    def reset(self):
+        """Forget what we think is on the screen.
+        """
+        self.shown = {}     # {rownum: {colnum: (char, attr)}}
+        self.pending = {}   # same, for the frame in progress
+
+
+    # Writes
+    # ======
+
+    def addstr(self, y, x, s, attr=0):
+        """Buffer a string of plain characters.
+        """
+        row = self.pending.setdefault(y, {})
+        for i in range(len(s)):
+            row[x+i] = (s[i], attr)
+
+    def addch(self, y, x, c, attr=0):
+        """Buffer a single character, which may be an int (e.g., ACS_*).
+        """
+        self.pending.setdefault(y, {})[x] = (c, attr)
+
+
+    # Commit
+    # ======
+
+    def flush(self):
+        """Write changed cells to the window, and update the physical screen.
+        """
+        for y, row in self.pending.iteritems():
+            shown = self.shown.setdefault(y, {})
+            run = []            # consecutive changed string cells
+            start = attr = None # where run starts, and its attribute
+            for x in sorted(row):
+                cell = row[x]
+                if shown.get(x) == cell:
+                    continue
+                shown[x] = cell
+                c, a = cell
+                if isinstance(c, int):
+                    self._write(y, start, run, attr)
+                    run = []
+                    self.win.addch(y, x, c, a)
+                elif run and (a == attr) and (x == start + len(run)):
+                    run.append(c)
+                else:
+                    self._write(y, start, run, attr)
+                    run = [c]
+                    start, attr = x, a
+            self._write(y, start, run, attr)
+        self.pending = {}
+        self.win.noutrefresh()
+        curses.doupdate()
+
+    def _write(self, y, x, run, attr):
+        if run:
+            self.win.addstr(y, x, ''.join(run), attr)
 
 
 
@@ -171,16 +351,16 @@ class ScrollArea:
     #   index -- an index of an item currently being displayed
     #   rownum -- a row number relative to the current window object
 
-    def __list(self):
-        def rownum(i):
-            return self.toprow + i - self.start
-        return [(i, rownum(i)) for i in range(self.start, self.end_)]
+    # The window is computed arithmetically, so these are O(1) no matter how
+    # many items there are; iterating is O(numrows).
 
     def __iter__(self):
-        return iter(self.__list())
+        offset = self.toprow - self.start
+        for i in xrange(self.start, self.end_):
+            yield (i, i + offset)
 
     def __len__(self):
-        return len(self.__list())
+        return max(self.end_ - self.start, 0)
 
 
     # Basic API
@@ -219,14 +399,51 @@ class ScrollArea:
 
     def scroll(self, delta):
         """Support multi-line scrolling.
+
+        This is equivalent to calling scroll_one abs(delta) times, refusing if
+        we hit an edge, but it is computed in one step.
+
         """
-        up = delta < 0
-        delta = abs(delta)
-        try:
-            for i in range(delta):
-                self.scroll_one(up)
-        except DoneScrolling:
+        if delta < 0:
+            moved = self._scroll_up(-delta)
+        else:
+            moved = self._scroll_down(delta)
+        if moved < abs(delta):
             self._refuse()
+        else:
+            self.update()
+
+    def _scroll_up(self, n):
+        """Scroll up by at most n rows; return the number of rows scrolled.
+        """
+        if self.numitems == 0:
+            return 0
+        cursor = min(n, self.cursor)            # move within the viewport
+        shift = min(n - cursor, self.start)     # then move the viewport
+        self.cursor -= cursor
+        if shift:
+            slack = max(self.numrows - (self.end_ - self.start), 0)
+            self.start -= shift
+            self.end_ -= max(shift - slack, 0)  # the viewport fills up first
+        return cursor + shift
+
+    def _scroll_down(self, n):
+        """Scroll down by at most n rows; return the number of rows scrolled.
+        """
+        if self.numitems == 0:
+            return 0
+        n = min(n, self.numitems - 1 - self.curitem)
+        if n <= 0:
+            return 0
+        if self.cursor < self.numrows:
+            cursor = min(n, self.numrows - 1 - self.cursor)
+        else:
+            cursor = n
+        shift = n - cursor
+        self.cursor += cursor
+        self.start += shift
+        self.end_ += shift
+        return n
 
 
     # Extended API
@@ -342,6 +559,47 @@ class ScrollArea:
         self.update()
 
 
+    def jump(self, index):
+        """Select the item at index, scrolling as little as possible.
+
+        An index out of range selects the nearest item, and is refused.
+
+        """
+        if self.numitems == 0:
+            self._refuse()
+            return
+        clamped = min(max(index, 0), self.numitems - 1)
+        if self.numitems <= self.numrows:   # single page
+            self.start = 0
+            self.end_ = self.numitems
+            self.cursor = clamped
+        elif clamped < self.start:          # above the viewport
+            self.start = clamped
+            self.end_ = clamped + self.numrows
+            self.cursor = 0
+        elif clamped >= self.start + self.numrows: # below the viewport
+            self.start = clamped - self.numrows + 1
+            self.end_ = clamped + 1
+            self.cursor = self.numrows - 1
+        else:                               # within the viewport
+            self.cursor = clamped - self.start
+            if self.end_ <= clamped:
+                self.end_ = min(self.start + self.numrows, self.numitems)
+        if clamped != index:
+            self._refuse()
+        else:
+            self.update()
+
+    def jump_percent(self, percent):
+        """Select the item percent of the way through the list.
+        """
+        if self.numitems == 0:
+            self._refuse()
+            return
+        percent = min(max(percent, 0), 100)
+        self.jump(int(round((self.numitems - 1) * percent / 100.0)))
+
+
     # Helpers
     # =======
 
@@ -385,9 +643,9 @@ class ScrollArea:
     def move_cursor(self, rownum):
         """Move the cursor to a specific row, selecting the item there.
         """
-        if (self.numrows < self.numitems) and (rownum in range(self.numrows)):
+        if (self.numrows < self.numitems) and (0 <= rownum < self.numrows):
             self.cursor = rownum
-            if rownum not in [i[1] for i in self]:
+            if not (self.toprow <= rownum < self.toprow + len(self)):
                 self._refuse()
             else:
                 self.update()
@@ -395,30 +653,163 @@ class ScrollArea:
             self._refuse()
 
 
-wrapper_1 = textwrap.TextWrapper( initial_indent=''
-                                , subsequent_indent=''
-                                , break_long_words=True
-                                 )
-wrapper_2 = textwrap.TextWrapper( initial_indent='  '
-                                , subsequent_indent='    '
-                                , break_long_words=True
-                                 )
+class Layout:
+    """Represent a traceback as a list of lines wrapped to a width.
+
+    Tracebacks can be huge (think maximum recursion depth), and DetailScreen
+    asks for one on every keypress, so we do as little as we can up front. We
+    collapse runs of repeated frames, and for each remaining entry we only
+    count the lines it wraps to. That is cheap when an entry fits the width,
+    which is nearly always, and such entries are never run through textwrap;
+    lines are made as they are asked for. See format_tb, which memoizes us.
+
+    """
+
+    def __init__(self, width, traceback_):
+        """Takes an int and a string.
+        """
+        self.width = width
+        self.entries = []   # [(wrapper, text)]; wrapper is None for a blank
+        self.offsets = []   # the index of the first line of each entry
+        self.wrapped = {}   # {entry index:[lines]} for entries that don't fit
+        self.numlines = 0
+
+        plain = textwrap.TextWrapper( width=width
+                                    , initial_indent=''
+                                    , subsequent_indent=''
+                                    , break_long_words=True
+                                     )
+        indented = textwrap.TextWrapper( width=width
+                                       , initial_indent='  '
+                                       , subsequent_indent='    '
+                                       , break_long_words=True
+                                        )
+
+        raw = traceback_.splitlines()
+        self.add(plain, raw[0])
+        self.add(None, '')
+        for line in self.collapse([line.strip() for line in raw[1:-1]]):
+            self.add(indented, line)
+            if not line.startswith('File'):
+                self.add(None, '')
+        self.add(plain, raw[-1])
+
+
+    # Container emulation
+    # ===================
+
+    def __len__(self):
+        return self.numlines
+
+    def __getitem__(self, i):
+        """Takes an int index of a line; returns the line.
+        """
+        if i < 0:
+            i += self.numlines
+        if not (0 <= i < self.numlines):
+            raise IndexError("line index out of range")
+        j = bisect.bisect_right(self.offsets, i) - 1 # empty entries share
+        wrapper, text = self.entries[j]              #   the next's offset
+        if wrapper is None:
+            return text
+        elif j in self.wrapped:
+            return self.wrapped[j][i - self.offsets[j]]
+        else:
+            return wrapper.initial_indent + text
+
+
+    # Helpers
+    # =======
+
+    def add(self, wrapper, text):
+        """Given a TextWrapper (or None for a verbatim line) and text, add it.
+        """
+        self.offsets.append(self.numlines)
+        if (wrapper is None) or self.fits(wrapper, text):
+            self.numlines += 1
+        else:
+            lines = wrapper.wrap(text)
+            self.wrapped[len(self.entries)] = lines
+            self.numlines += len(lines)
+        self.entries.append((wrapper, text))
+
+    def fits(self, wrapper, text):
+        """Given a TextWrapper and text, return a boolean: is wrapping a no-op?
+        """
+        if len(wrapper.initial_indent) + len(text) > self.width:
+            return False
+        return (text != '') and (text == text.strip()) and \
+               (text.translate(WHITESPACE) == text)
+
+    def collapse(self, lines):
+        """Given the middle lines of a traceback, collapse repeated frames.
+
+        A frame is a File line and the source line after it, if any. Where the
+        same frame comes up over and over, as with runaway recursion, we keep
+        the first and say how many more times it came up.
+
+        """
+        frames = []
+        i = 0
+        while i < len(lines):
+            n = 1
+            if lines[i].startswith('File') and (i+1 < len(lines)) and \
+               not lines[i+1].startswith('File'):
+                n = 2               # with source
+            frames.append(lines[i:i+n])
+            i += n
+
+        out = []
+        previous = None
+        repeats = 0
+        for frame in frames + [None]:
+            if (frame == previous) and frame[0].startswith('File'):
+                repeats += 1
+                continue
+            if repeats:
+                out.append("[previous frame repeated %d times]" % repeats)
+                repeats = 0
+            if frame is not None:
+                out.extend(frame)
+            previous = frame
+        return out
+
+
+
+_layouts = {}       # {(width, traceback_):Layout}, for format_tb
+_recent = []        # keys of _layouts, oldest first
+_MAX_LAYOUTS = 16   # how many Layouts format_tb keeps
 
 def format_tb(width, traceback_):
-    """Given a traceback, return a list of strings.
+    """Given a width and a traceback, return a Layout, a list of strings.
+
+    Layouts are memoized, since we're asked for the same one over and over as
+    the user moves around a DetailScreen.
+
+    """
+    key = (width, traceback_)
+    layout = _layouts.get(key)
+    if layout is None:
+        layout = _layouts[key] = Layout(width, traceback_)
+        _recent.append(key)
+        if len(_recent) > _MAX_LAYOUTS:
+            del _layouts[_recent.pop(0)]
+    return layout
+
+
+def format_output(width, output):
+    """Given a width and captured program output, return a list of strings.
 
-    I would like to format tracebacks differently, but that will have to
-    wait for another day.
+    Program output is arbitrary, so we don't wrap it nicely like a traceback:
+    we expand tabs, show other control characters as '?', and cut each line
+    into pieces of width characters.
 
     """
-    wrapper_1.width = wrapper_2.width = width
-    raw = traceback_.splitlines()
-    lines = wrapper_1.wrap(raw[0])
-    lines.append('')
-    for line in raw[1:-1]:
-        line = line.strip()
-        lines.extend(wrapper_2.wrap(line))
-        if not line.startswith('File'):
+    lines = []
+    for line in output.splitlines():
+        line = line.expandtabs().translate(CONTROL)
+        if not line:
             lines.append('')
-    lines.extend(wrapper_1.wrap(raw[-1]))
+        for i in range(0, len(line), width):
+            lines.append(line[i:i+width])
     return lines
@@ -0,0 +1,190 @@
+"""Logging that stays off the UI thread, with timed spans for tracing.
+
+Nothing here is configured by default; cli.main calls start when asked to log
+(-v or --log). Records from the 'testosterone' loggers are put on a queue by a
+QueueHandler, and a QueueListener thread writes them to a rotating log file,
+so the UI never waits on the disk.
+
+Spans time a piece of work (discovery, spawning a child, parsing a report,
+rendering a screen) and log one line for it when it ends:
+
+    span=parse ms=12.3 module=foo.TestCase
+
+so the log doubles as a performance trace. When logging is off, span returns a
+do-nothing stand-in, so spans cost next to nothing on hot paths.
+
+"""
+import logging
+import logging.handlers
+import os
+import Queue
+import tempfile
+import threading
+import time
+
+
+FORMAT = "%(asctime)s %(threadName)s %(name)s %(message)s"
+
+logger = logging.getLogger('testosterone')
+
+
+class QueueHandler(logging.Handler):
+    """Put log records on a queue, without ever blocking.
+
+    Records are made self-contained first (message formatted, traceback turned
+    into text), since they are handled later, on another thread. If the queue
+    is full we drop the record and count it in dropped.
+
+    """
+
+    dropped = 0     # the number of records we dropped for want of room
+
+    def __init__(self, queue):
+        logging.Handler.__init__(self)
+        self.queue = queue
+
+    def emit(self, record):
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(
+                                                               record.exc_info)
+                record.exc_info = None
+            self.queue.put_nowait(record)
+        except Queue.Full:
+            self.dropped += 1
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            self.handleError(record)
+
+
+class QueueListener:
+    """Hand log records from a queue to a handler, on a background thread.
+    """
+
+    def __init__(self, queue, handler):
+        """Takes a Queue and a logging.Handler.
+        """
+        self.queue = queue
+        self.handler = handler
+        self.attached = []  # [(logger, QueueHandler)]; see attach
+        self.thread = threading.Thread(target=self.drain, name='log')
+        self.thread.setDaemon(True)
+
+    def attach(self, logger):
+        """Given a logger, send its records to our queue until we stop.
+        """
+        source = QueueHandler(self.queue)
+        logger.addHandler(source)
+        self.attached.append((logger, source))
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        """Detach, handle any records still on the queue, and stop the thread.
+        """
+        for logger, source in self.attached:
+            logger.removeHandler(source)
+            logger.setLevel(logging.NOTSET)
+        self.attached = []
+        if self.thread.isAlive():
+            self.queue.put(None)
+            self.thread.join()
+        self.handler.close()
+
+    def drain(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            self.handler.handle(record)
+
+
+class Span:
+    """Time a piece of work, and log it when it ends; see span.
+    """
+
+    def __init__(self, logger, name, fields):
+        self.logger = logger
+        self.name = name
+        self.fields = fields
+        self.started = time.time()
+
+    def end(self, **fields):
+        """Log the span, with any more fields given; return the seconds taken.
+        """
+        elapsed = time.time() - self.started
+        self.fields.update(fields)
+        extra = ['%s=%s' % item for item in sorted(self.fields.items())]
+        self.logger.debug(' '.join([ 'span=%s' % self.name
+                                   , 'ms=%.1f' % (elapsed * 1000)
+                                    ] + extra))
+        return elapsed
+
+
+class NullSpan:
+    """Stand in for a Span when logging is off.
+    """
+
+    def end(self, **fields):
+        return 0.0
+
+NULL_SPAN = NullSpan()
+
+
+def span(logger, name, **fields):
+    """Given a logger, a name and key=value fields, return a started Span.
+
+    Call end on the return value when the work is done.
+
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return NULL_SPAN
+    return Span(logger, name, fields)
+
+
+def default_path():
+    """Return a log path for this session, in a directory only we can use.
+
+    Each user gets their own directory under the temporary directory, so users
+    on the same host don't collide, and each session gets its own file in it.
+
+    """
+    if hasattr(os, 'getuid'):
+        user = str(os.getuid())
+    else:
+        user = os.environ.get('USERNAME', 'user')
+    directory = os.path.join(tempfile.gettempdir(), 'testosterone-' + user)
+    if not os.path.isdir(directory):
+        os.mkdir(directory, 0700)
+    if hasattr(os, 'getuid') and os.stat(directory).st_uid != os.getuid():
+        directory = tempfile.mkdtemp(prefix='testosterone-') # not ours!
+    name = '%s-%d.log' % (time.strftime('%Y%m%d-%H%M%S'), os.getpid())
+    return os.path.join(directory, name)
+
+
+def start(path=None, max_bytes=5<<20, backups=2):
+    """Start logging to path (default: default_path()); return a QueueListener.
+
+    The log file rotates when it reaches max_bytes, keeping backups old files.
+    Call stop on the return value to flush the log before exiting; that also
+    turns logging off again.
+
+    """
+    if path is None:
+        path = default_path()
+    queue = Queue.Queue(10000)
+    handler = logging.handlers.RotatingFileHandler( path
+                                                  , maxBytes=max_bytes
+                                                  , backupCount=backups
+                                                   )
+    handler.setFormatter(logging.Formatter(FORMAT))
+    listener = QueueListener(queue, handler)
+    listener.start()
+    listener.attach(logger)
+    logger.setLevel(logging.DEBUG)
+    logger.debug("logging to %s" % path)
+    return listener
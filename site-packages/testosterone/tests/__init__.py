@@ -1 +1 @@
-from testosterone.tests import cli, interactive, demo
+from testosterone.tests import cli, interactive, demo, log, startup
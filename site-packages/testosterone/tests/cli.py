@@ -1,7 +1,16 @@
+import os
+import shutil
 import sys
+import tempfile
 import unittest
+from StringIO import StringIO
 
+from testosterone.cli import leaks, ordering, pollution, reruns
+from testosterone.cli.capture import Capture as _Capture
+from testosterone.cli.memory import Meter, peak_rss
 from testosterone.cli.reporters import detail, _Summarize
+from testosterone.cli.utils import BANNER, BORDER, HEADERS_MEM, OUTPUT, TICK
+from testosterone.cli.utils import banner, format_size, parse_size
 from testosterone.tests.utils import reportersTestCase
 
 
@@ -73,6 +82,544 @@ class Detail(reportersTestCase):
         actual = detail('testostertests.itDoesExist', 'TestCase')
         self.assertEqual(expected, actual)
 
+    def testSomeTests(self):
+        tests = ['test_fails', 'test_passes']
+        actual = detail('testostertests', 'TestCase', tests)
+        self.assert_(actual.startswith(BANNER + '\nF.\n'))
+        self.assert_('Ran 2 tests' in actual)
+        self.assert_(actual.endswith('FAILED (failures=1)\n'))
+
+    def testBadTestNameTriggersImportError(self):
+        self.assertRaises( ImportError
+                         , detail, 'testostertests', 'TestCase', ['test_toasts']
+                          )
+
+
+
+
+NOISY = """\
+import sys
+import unittest
+
+class TestCase(unittest.TestCase):
+    def test_prints_and_fails(self):
+        print 'Hey there!'
+        print >> sys.stderr, 'Uh oh.'
+        self.assert_(0)
+    def test_prints_and_passes(self):
+        print 'Hey there!' * 10000
+    def test_fails_quietly(self):
+        self.assert_(0)
+"""
+
+
+NOISY_FLAKY = """\
+import unittest
+
+_state = {'runs': 0}
+
+class TestCase(unittest.TestCase):
+    def test_prints_and_alternates(self):
+        print 'Hey there!'
+        _state['runs'] += 1
+        self.assert_(_state['runs'] % 2 == 0)
+"""
+
+
+class Capture(reportersTestCase):
+
+    pkg = reportersTestCase.pkg + [ ('testostertests/noisy.py', NOISY)
+                                  , ( 'testostertests/noisyflaky.py'
+                                    , NOISY_FLAKY
+                                     )
+                                   ]
+
+    def setUpUp(self):
+        self.capture = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.capture)
+        reportersTestCase.tearDown(self)
+
+    def outputs(self, report):
+        """Given a report, return a list of [stream, size, contents] for it.
+        """
+        out = []
+        for line in report.splitlines():
+            if line.startswith(OUTPUT):
+                stream, size, path = line[len(OUTPUT):].split(None, 2)
+                out.append([stream, int(size), open(path).read()])
+        return out
+
+    def testFailingTestKeepsOutput(self):
+        report = detail( 'testostertests.noisy', 'TestCase'
+                       , ['test_prints_and_fails'], self.capture
+                        )
+        expected = [ ['stdout', 11, 'Hey there!\n']
+                   , ['stderr', 7, 'Uh oh.\n']
+                    ]
+        actual = self.outputs(report)
+        self.assertEqual(expected, actual)
+        self.assert_(report.endswith('FAILED (failures=1)\n'))
+
+    def testPassingTestDiscardsOutput(self):
+        report = detail( 'testostertests.noisy', 'TestCase'
+                       , ['test_prints_and_passes'], self.capture
+                        )
+        expected = ([], [])
+        actual = (self.outputs(report), os.listdir(self.capture))
+        self.assertEqual(expected, actual)
+
+    def testQuietTestHasNoOutput(self):
+        report = detail( 'testostertests.noisy', 'TestCase'
+                       , ['test_fails_quietly'], self.capture
+                        )
+        expected = ([], [])
+        actual = (self.outputs(report), os.listdir(self.capture))
+        self.assertEqual(expected, actual)
+
+    def testStreamsAreRestored(self):
+        stdout, stderr = sys.stdout, sys.stderr
+        detail('testostertests.noisy', 'TestCase', None, self.capture)
+        self.assert_(sys.stdout is stdout)
+        self.assert_(sys.stderr is stderr)
+
+    def testSummarizeSpoolsOutput(self):
+        summarize = _Summarize()
+        spool = StringIO()
+        summarize('testostertests.noisy', spool=spool, capture=self.capture)
+        expected = [['stdout', 11, 'Hey there!\n'], ['stderr', 7, 'Uh oh.\n']]
+        actual = self.outputs(spool.getvalue())
+        self.assertEqual(expected, actual)
+
+    def summarize_quietly(self, **kw):
+        """Summarize noisyflaky with progress; return what reached stdout.
+        """
+        progress = StringIO()
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            _Summarize()( 'testostertests.noisyflaky', progress=progress
+                        , capture=self.capture, **kw)
+            leaked = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        for line in progress.getvalue().splitlines():
+            self.assert_(line.startswith(TICK), line)
+        return leaked
+
+    def testRerunsAreCaptured(self):
+        expected = ''
+        actual = self.summarize_quietly(rerun_failures=2)
+        self.assertEqual(expected, actual)
+
+    def testLeakHuntsAreCaptured(self):
+        expected = ''
+        actual = self.summarize_quietly(hunt_leaks=3)
+        self.assertEqual(expected, actual)
+
+
+    # Capture
+    # =======
+
+    def testSpillsPastLimit(self):
+        capture = _Capture(StringIO(), 'stdout', self.capture)
+        capture.limit = 10
+        capture.write('Hey ')
+        self.assertEqual(None, capture.path)
+        capture.write('there!\n')
+        capture.write('Hey there!\n')
+        expected = ('stdout', 0, 22)
+        actual = (os.path.basename(capture.path)[:6], capture.buffered,
+                  capture.size)
+        self.assertEqual(expected, actual)
+        capture.keep()
+        expected = 'Hey there!\nHey there!\n'
+        actual = open(capture.path).read()
+        self.assertEqual(expected, actual)
+
+    def testDiscardRemovesSpill(self):
+        capture = _Capture(StringIO(), 'stdout', self.capture)
+        capture.limit = 10
+        capture.write('Hey there!\n')
+        capture.discard()
+        expected = []
+        actual = os.listdir(self.capture)
+        self.assertEqual(expected, actual)
+
+    def testDebuggerOutputPassesThrough(self):
+        stream = StringIO()
+        capture = _Capture(stream, 'stdout', self.capture)
+        exec "capture.write('(Pdb) ')" in {'__name__': 'pdb', 'capture': capture}
+        expected = ('(Pdb) ', 0)
+        actual = (stream.getvalue(), capture.size)
+        self.assertEqual(expected, actual)
+
+
+
+LEAKY = """\
+import unittest
+
+_held = []
+
+class Leaky(unittest.TestCase):
+    def test_objects(self):
+        _held.append([])
+    def test_files(self):
+        _held.append(open(__file__))
+
+class Clean(unittest.TestCase):
+    def test_nothing(self):
+        pass
+    def test_fails(self):
+        self.assert_(0)
+"""
+
+
+class Leaks(reportersTestCase):
+
+    pkg = reportersTestCase.pkg + [('testostertests/leaky.py', LEAKY)]
+
+    def setUpUp(self):
+        self.summarize = _Summarize()
+
+    def testLeakyTestCasesAreListed(self):
+        report = self.summarize('testostertests.leaky', hunt_leaks=3)
+        heading, section = report.split("LEAKING TESTCASES (3 runs)")
+        expected = [('testostertests.leaky.Leaky', 'objects')]
+        if leaks.count_fds() is not None:
+            expected.append(('testostertests.leaky.Leaky', 'fds'))
+        rows = [line.split() for line in section.splitlines()[2:]]
+        actual = [(name, resource) for name, resource, growth in rows]
+        self.assertEqual(expected, actual)
+        for name, resource, growth in rows:
+            self.assert_(int(growth) >= 2, growth)
+
+    def testResultsAreFromTheFirstRun(self):
+        report = self.summarize('testostertests.leaky', hunt_leaks=3)
+        expected = "TOTALS".ljust(60) + "  75%    1    0    4"
+        actual = report.split("\n\n")[0].splitlines()[-1]
+        self.assertEqual(expected, actual)
+
+    def testGrowthMustBeAtEveryStep(self):
+        rest = [[5, 5, 5]] * (len(leaks.RESOURCES) - 1)
+        expected = [('objects', 1, 3)]
+        actual = leaks.growth([[1, 2, 3]] + rest)
+        self.assertEqual(expected, actual)
+        expected = []
+        actual = leaks.growth([[1, 2, 2]] + rest)
+        self.assertEqual(expected, actual)
+
+    def testGrowthNeedsTwoSteps(self):
+        rest = [[5, 5]] * (len(leaks.RESOURCES) - 1)
+        expected = []
+        actual = leaks.growth([[1, 2]] + rest)
+        self.assertEqual(expected, actual)
+
+
+FLAKY = """\
+import unittest
+
+_state = {'runs': 0, 'polluted': False}
+
+class Broken(unittest.TestCase):
+    def test_fails(self):
+        self.assert_(0)
+
+class Flaky(unittest.TestCase):
+    def test_alternates(self):
+        _state['runs'] += 1
+        self.assert_(_state['runs'] % 2 == 0)
+
+class Polluted(unittest.TestCase):
+    def test_a_pollutes(self):
+        _state['polluted'] = True
+    def test_b_needs_clean(self):
+        self.assert_(not _state['polluted'])
+"""
+
+
+class Reruns(reportersTestCase):
+
+    pkg = reportersTestCase.pkg + [('testostertests/flaky.py', FLAKY)]
+
+    def setUpUp(self):
+        self.summarize = _Summarize()
+
+    def testVerdictsAreListed(self):
+        report = self.summarize('testostertests.flaky', rerun_failures=2)
+        heading, section = report.split("RERUN FAILURES (2 runs)")
+        expected = [ [ 'testostertests.flaky.Broken.test_fails'
+                     , '!'
+                     , 'consistent'
+                      ]
+                   , [ 'testostertests.flaky.Flaky.test_alternates'
+                     , '~'
+                     , 'flaky'
+                      ]
+                   , [ 'testostertests.flaky.Polluted.test_b_needs_clean'
+                     , '?'
+                     , 'order-dependent'
+                      ]
+                    ]
+        actual = [line.split() for line in section.splitlines()[2:]]
+        self.assertEqual(expected, actual)
+
+    def testResultsAreFromTheFirstRun(self):
+        report = self.summarize('testostertests.flaky', rerun_failures=2)
+        expected = "TOTALS".ljust(60) + "  25%    3    0    4"
+        actual = report.split("\n\n")[0].splitlines()[-1]
+        self.assertEqual(expected, actual)
+
+    def testVerdictsAreTickedAfterTheirTestCase(self):
+        progress = StringIO()
+        self.summarize('testostertests.flaky', progress=progress,
+                       rerun_failures=2)
+        expected = [ 'testostertests.flaky.Flaky'
+                   , 'RERUN'
+                   , 'testostertests.flaky.Polluted'
+                    ]
+        actual = [line.split()[3] for line in progress.getvalue().splitlines()]
+        actual = actual[3:6]
+        self.assertEqual(expected, actual)
+
+    def testClassify(self):
+        expected = [ reruns.CONSISTENT
+                   , reruns.FLAKY
+                   , reruns.FLAKY
+                   , reruns.ORDER_DEPENDENT
+                   , reruns.FLAKY
+                    ]
+        actual = [ reruns.classify([False, False], [False, False])
+                 , reruns.classify([False, True], [])
+                 , reruns.classify([False, False], [True, False])
+                 , reruns.classify([False, False], [True, True])
+                 , reruns.classify([True, True], [True, True])
+                  ]
+        self.assertEqual(expected, actual)
+
+
+POLLUTED = """\
+import unittest
+
+_state = {}
+
+class A(unittest.TestCase):
+    def test_a(self):
+        pass
+
+class B(unittest.TestCase):
+    def test_b(self):
+        _state['dirty'] = True
+
+class C(unittest.TestCase):
+    def test_c(self):
+        pass
+
+class D(unittest.TestCase):
+    def test_d(self):
+        pass
+
+class Victim(unittest.TestCase):
+    def test_victim(self):
+        self.assert_('dirty' not in _state)
+"""
+
+
+class Pollution(reportersTestCase):
+
+    pkg = reportersTestCase.pkg + [('testostertests/polluted.py', POLLUTED)]
+
+    def setUpUp(self):
+        self.names = _Summarize().order('testostertests.polluted')
+
+    def testBisectFindsThePolluter(self):
+        report, found = pollution.bisect( 'testostertests.polluted'
+                                         , self.names
+                                         , 'testostertests.polluted.Victim'
+                                         , workers=2
+                                          )
+        lines = report.splitlines()
+        self.assert_(found)
+        self.assert_(lines[1].startswith(
+                            'POLLUTERS OF testostertests.polluted.Victim'))
+        self.assert_(lines[1].endswith('(1 of 4, 6 trials)'), lines[1])
+        expected = ['testostertests.polluted.B']
+        actual = lines[3:]
+        self.assertEqual(expected, actual)
+
+    def testBisectNeedsTheFailureToReproduce(self):
+        report, found = pollution.bisect( 'testostertests.polluted'
+                                         , self.names
+                                         , 'testostertests.polluted.B'
+                                          )
+        expected = (False, "testostertests.polluted.B doesn't fail after the "
+                           "1 TestCases before it.")
+        actual = (found, report.splitlines()[1])
+        self.assertEqual(expected, actual)
+
+    def testTrialThatFailsToRunIsReported(self):
+        names = ['testostertests.polluted.Nope'] + self.names
+        report, found = pollution.bisect( 'testostertests.polluted'
+                                         , names
+                                         , 'testostertests.polluted.Victim'
+                                         , workers=2
+                                          )
+        lines = report.splitlines()
+        expected = (False, "A trial failed to run:")
+        actual = (found, lines[1])
+        self.assertEqual(expected, actual)
+        self.assert_('testostertests.polluted.Nope' in report)
+
+    def testOrderIsTheOrderWeRunIn(self):
+        expected = [ 'testostertests.polluted.' + name
+                     for name in ('A', 'B', 'C', 'D', 'Victim')
+                    ]
+        actual = self.names
+        self.assertEqual(expected, actual)
+
+    def testDdminFindsPollutersThatOnlyWorkTogether(self):
+        reproduces = lambda trials: [ (2 in trial) and (5 in trial)
+                                      for trial in trials
+                                     ]
+        expected = [2, 5]
+        actual = pollution.ddmin(range(8), reproduces)[0]
+        self.assertEqual(expected, actual)
+
+    def testSplit(self):
+        expected = [[0, 1], [2, 3, 4], [5, 6, 7]]
+        actual = pollution.split(range(8), 3)
+        self.assertEqual(expected, actual)
+
+
+class RandomOrder(reportersTestCase):
+
+    def setUpUp(self):
+        self.summarize = _Summarize()
+
+    def testSameSeedSameOrder(self):
+        expected = self.summarize.order('testostertests', seed=1)
+        actual = self.summarize.order('testostertests', seed=1)
+        self.assertEqual(expected, actual)
+
+    def testOrderIsShuffled(self):
+        usual = self.summarize.order('testostertests')
+        orders = []
+        for seed in range(10):
+            order = self.summarize.order('testostertests', seed=seed)
+            self.assertEqual(sorted(usual), sorted(order))
+            orders.append(order)
+        self.assert_([order for order in orders if order != usual])
+
+    def testMethodsAreShuffledTheSameEverywhere(self):
+        from testostertests import TestCase
+        names = lambda seed: ordering.Loader(seed).getTestCaseNames(TestCase)
+        usual = list(unittest.defaultTestLoader.getTestCaseNames(TestCase))
+        orders = [names(seed) for seed in range(10)]
+        self.assertEqual(orders, [names(seed) for seed in range(10)])
+        self.assert_([order for order in orders if order != usual])
+
+    def testSeedIsInBanner(self):
+        report = self.summarize('testostertests', seed=1234)
+        expected = banner(1234)
+        actual = report.splitlines()[0]
+        self.assertEqual(expected, actual)
+        self.assert_(actual.endswith('<| seed 1234 |>---'))
+        self.assertEqual(80, len(actual))
+
+    def testSeedGivesTheSameResults(self):
+        expected = self.summarize('testostertests')
+        expected = sorted(expected.splitlines()[1:])
+        actual = _Summarize()('testostertests', seed=1234)
+        actual = sorted(actual.splitlines()[1:])
+        self.assertEqual(expected, actual)
+
+
+FAILING = """\
+import unittest
+
+class A(unittest.TestCase):
+    def test_a_fails(self):
+        self.assert_(0)
+    def test_b_errs(self):
+        raise StandardError
+    def test_c_passes(self):
+        pass
+
+class B(unittest.TestCase):
+    def test_fails(self):
+        self.assert_(0)
+"""
+
+
+class FailFast(reportersTestCase):
+
+    pkg = reportersTestCase.pkg + [('testostertests/failing.py', FAILING)]
+
+    def setUpUp(self):
+        self.summarize = _Summarize()
+
+    def testStopsPartwayThroughATestCase(self):
+        report = self.summarize('testostertests.failing', fail_fast=1)
+        prefix = 'testostertests.failing.'
+        expected = [ (prefix + 'A').ljust(60) + '   0%    1    0    3'
+                   , (prefix + 'B').ljust(60) + '   -     -    -    1'
+                   , BORDER
+                   , 'TOTALS'.ljust(60) + '   0%    1    0    4'
+                   , ''
+                   , 'STOPPED AFTER FAILURE 1 (TestCases not run: 1)'
+                    ]
+        actual = report.splitlines()[3:]
+        self.assertEqual(expected, actual)
+
+    def testBudgetSpansTestCases(self):
+        report = self.summarize('testostertests.failing', fail_fast=3)
+        expected = [ 'TOTALS'.ljust(60) + '  25%    2    1    4'
+                   , ''
+                   , 'STOPPED AFTER FAILURE 3 (TestCases not run: 0)'
+                    ]
+        actual = report.splitlines()[-3:]
+        self.assertEqual(expected, actual)
+
+    def testUnspentBudgetDoesNotStop(self):
+        report = self.summarize('testostertests.failing', fail_fast=4)
+        self.assert_('STOPPED' not in report)
+
+    def testTestCasesNotRunAreNotTicked(self):
+        progress = StringIO()
+        self.summarize('testostertests.failing', progress=progress,
+                       fail_fast=2)
+        expected = ['PLAN', 'testostertests.failing.A']
+        actual = [line.split()[3] for line in progress.getvalue().splitlines()]
+        self.assertEqual(expected, actual)
+
+
+class Memory(unittest.TestCase):
+
+    def testPeak(self):
+        self.assert_(peak_rss() > 0)
+
+    def testMeterSeesAllocation(self):
+        meter = Meter()
+        meter.start()
+        ballast = 'x' * (32 << 20)
+        peak, sites = meter.stop()
+        self.assert_(peak >= (32 << 20), peak)
+
+    def testFormatSize(self):
+        expected = ['0.0K', '512K', '1.0M', '1.5M', '12G', '2048T']
+        actual = [format_size(n) for n in ( 0
+                                          , 512 << 10
+                                          , 1023 << 10
+                                          , 1536 << 10
+                                          , 12 << 30
+                                          , 2 << 50
+                                           )]
+        self.assertEqual(expected, actual)
+
+    def testParseSize(self):
+        expected = [0, 512 << 10, 1536 << 10, 12 << 30]
+        actual = [parse_size(s) for s in ('0.0K', '512K', '1.5M', '12G')]
+        self.assertEqual(expected, actual)
 
 
 
@@ -94,6 +641,13 @@ testostertests.itDoesExist.TestCase                            -     -    -    2
 testostertests.itDoesExist.TestCase2                           -     -    -    1
 testostertests.subpkg.TestCase                                 -     -    -    2
 """
+PROGRESS = """\
+<| tick |> PLAN 10
+<| tick |> testostertests.TestCase 60% 1 1 5
+<| tick |> testostertests.itDoesExist.TestCase 100% 0 0 2
+<| tick |> testostertests.itDoesExist.TestCase2 100% 0 0 1
+<| tick |> testostertests.subpkg.TestCase 100% 0 0 2
+"""
 BODY_DOTTED_RUN_VERBOSE = """\
 testostertests.itDoesExist.TestCase                          100%    0    0    2
 testostertests.itDoesExist.TestCase2                         100%    0    0    1
@@ -160,6 +714,31 @@ class Summary(reportersTestCase):
     def testTestCaseTriggersImportError(self):
         self.assertRaises(ImportError, self.summarize, 'testostertests.TestCase')
 
+    def testSummarizeMemory(self):
+        lines = self.summarize('testostertests', memory=True).splitlines()
+        expected = HEADERS_MEM
+        actual = lines[1]
+        self.assertEqual(expected, actual)
+        for row in lines[3:7] + lines[8:9]: # four TestCases and TOTALS
+            self.assert_(parse_size(row.split()[-1]) > 0, row)
+            self.assertEqual(len(BORDER), len(row))
+
+        expected = [ BORDER
+                   , ''
+                   , "HEAVIEST TESTCASES".ljust(75) + " PEAK"
+                   , BORDER
+                    ]
+        actual = lines[7:8] + lines[9:12]
+        self.assertEqual(expected, actual)
+        expected = 4
+        actual = len(lines[12:])
+        self.assertEqual(expected, actual)
+
+    def testSummarizeMemoryFindOnly(self):
+        expected = HEADER + BODY_FIND
+        actual = self.summarize('testostertests', find_only=True, memory=True)
+        self.assert_(actual.startswith(expected))
+
 
     # load_testcases
     # ==============
@@ -289,6 +868,66 @@ class Summary(reportersTestCase):
         actual = self.summarize._Summarize__totals
         self.assertEqual(expected, actual)
 
+    def testPrintBodyProgress(self):
+        self.summarize.module = 'testostertests'
+        self.summarize.progress = StringIO()
+        self.summarize.find_testcases()
+        self.summarize.print_body()
+
+        expected = BODY
+        actual = self.summarize.report.getvalue()
+        self.assertEqual(expected, actual)
+
+        lines = self.summarize.progress.getvalue().splitlines()
+        seconds = [float(line.split()[-1]) for line in lines[1:]]
+        expected = PROGRESS
+        actual = '\n'.join([lines[0]] + [line.rsplit(' ', 1)[0]
+                                        for line in lines[1:]]) + '\n'
+        self.assertEqual(expected, actual)
+        self.assert_(min(seconds) >= 0)
+
+    def testPrintBodySpool(self):
+        self.summarize.module = 'testostertests'
+        self.summarize.spool = StringIO()
+        self.summarize.find_testcases()
+        self.summarize.print_body()
+
+        expected = BODY
+        actual = self.summarize.report.getvalue()
+        self.assertEqual(expected, actual)
+
+        spool = self.summarize.spool.getvalue()
+        header, report = spool.split('\n', 1)
+        expected = ['<|', 'spool', '|>', 'testostertests.TestCase', len(report)]
+        actual = header.split()
+        actual[-1] = int(actual[-1])
+        self.assertEqual(expected, actual)
+        expected = OUTPUT_START
+        actual = report[:len(OUTPUT_START)]
+        self.assertEqual(expected, actual)
+        self.assert_(report.endswith(OUTPUT_END))
+
+    def testPrintBodyMemoryProgress(self):
+        self.summarize.module = 'testostertests'
+        self.summarize.progress = StringIO()
+        self.summarize.memory = True
+        self.summarize.find_testcases()
+        self.summarize.print_body()
+        lines = self.summarize.progress.getvalue().splitlines()
+        peaks = [int(line.split()[-1]) for line in lines[1:]]
+        self.assert_(min(peaks) > 0)
+
+    def testPrintBodyNoRunNoProgress(self):
+        self.summarize.module = 'testostertests'
+        self.summarize.find_only = True
+        self.summarize.progress = StringIO()
+        self.summarize.find_testcases()
+        self.summarize.print_body()
+
+        expected = ''
+        actual = self.summarize.progress.getvalue()
+        self.assertEqual(expected, actual)
+
     def testPrintBodyBaseIsDotted(self):
         self.summarize.module = 'testostertests.itDoesExist'
         self.summarize.find_testcases()
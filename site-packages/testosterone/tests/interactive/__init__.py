@@ -1 +1 @@
-from testosterone.tests.interactive import marshallers, scrollarea
\ No newline at end of file
+from testosterone.tests.interactive import cache, canvas, layout, loop, marshallers, prefetch, screens, scrollarea, search, tree
\ No newline at end of file
@@ -0,0 +1,136 @@
+import os
+import time
+import zlib
+
+from testosterone.interactive.detail import Cache, Detail, sources
+from testosterone.tests.utils import reportersTestCase
+
+
+def make_detail(name, nbytes, started=None):
+    """Given a TestCase name and a size, return a Detail as if it was run.
+    """
+    detail = Detail(name)
+    detail.totals = ('0%', '1', '0', '1')
+    detail.data = {'test_foo': ('failure', 'x' * (nbytes - len('test_foo')))}
+    detail.names = ['test_foo']
+    if started is None:
+        started = time.time() + 1 # safely after the fixture was written
+    detail.started = started
+    return detail
+
+
+class Sources(reportersTestCase):
+
+    def testSourcesForModule(self):
+        expected = self.convert_paths(( 'testostertests/__init__.py'
+                                      , 'testostertests/itDoesExist.py'
+                                       ))
+        expected = [os.path.join(self.site_packages, p) for p in expected]
+        actual = sources('testostertests.itDoesExist.TestCase')
+        self.assertEqual(expected, actual)
+
+    def testSourcesForPackage(self):
+        expected = self.convert_paths(( 'testostertests/__init__.py'
+                                      , 'testostertests/subpkg/__init__.py'
+                                       ))
+        expected = [os.path.join(self.site_packages, p) for p in expected]
+        actual = sources('testostertests.subpkg.TestCase')
+        self.assertEqual(expected, actual)
+
+    def testSourcesNotFound(self):
+        expected = []
+        actual = sources('nonexistent.TestCase')
+        self.assertEqual(expected, actual)
+
+
+    # is_current
+    # ==========
+
+    def testIsCurrent(self):
+        detail = make_detail('testostertests.itDoesExist.TestCase', 100)
+        self.assert_(detail.is_current())
+
+    def testNotCurrentAfterChange(self):
+        detail = make_detail('testostertests.itDoesExist.TestCase', 100)
+        path = sources(detail.module)[-1]
+        later = detail.started + 1
+        os.utime(path, (later, later))
+        self.assert_(not detail.is_current())
+
+    def testNeverRunIsNotCurrent(self):
+        detail = Detail('testostertests.itDoesExist.TestCase')
+        self.assert_(not detail.is_current())
+
+    def testNoSourceIsNotCurrent(self):
+        detail = make_detail('nonexistent.TestCase', 100)
+        self.assert_(not detail.is_current())
+
+
+class LRU(reportersTestCase):
+
+    def setUpUp(self):
+        self.cache = Cache(budget=1000)
+        self.names = [ 'testostertests.TestCase'
+                     , 'testostertests.itDoesExist.TestCase'
+                     , 'testostertests.itDoesExist.TestCase2'
+                      ]
+
+    def testGet(self):
+        detail = make_detail(self.names[0], 100)
+        self.cache.put(detail, 1)
+        self.assert_(self.cache.get(self.names[0], 1) is detail)
+
+    def testGetMissing(self):
+        expected = None
+        actual = self.cache.get(self.names[0], 1)
+        self.assertEqual(expected, actual)
+
+    def testGetOtherGenerationDiscards(self):
+        self.cache.put(make_detail(self.names[0], 100), 1)
+        expected = None
+        actual = self.cache.get(self.names[0], 2)
+        self.assertEqual(expected, actual)
+        self.assert_(self.names[0] not in self.cache)
+
+    def testGetAfterSourceChangeDiscards(self):
+        detail = make_detail(self.names[1], 100)
+        self.cache.put(detail, 1)
+        path = sources(detail.module)[-1]
+        later = detail.started + 1
+        os.utime(path, (later, later))
+        expected = None
+        actual = self.cache.get(self.names[1], 1)
+        self.assertEqual(expected, actual)
+
+    def testPutEvictsLeastRecentlyUsed(self):
+        for name in self.names:
+            self.cache.put(make_detail(name, 400), 1)
+            self.cache.get(self.names[0], 1) # keep the first one fresh
+        expected = [self.names[0], self.names[2]]
+        actual = sorted(self.cache.entries)
+        self.assertEqual(expected, actual)
+        expected = 800
+        actual = self.cache.size
+        self.assertEqual(expected, actual)
+
+    def testPutReplaces(self):
+        self.cache.put(make_detail(self.names[0], 400), 1)
+        self.cache.put(make_detail(self.names[0], 300), 2)
+        expected = (1, 300)
+        actual = (len(self.cache), self.cache.size)
+        self.assertEqual(expected, actual)
+
+    def testPutTooBigIsDropped(self):
+        self.cache.put(make_detail(self.names[0], 400), 1)
+        self.cache.put(make_detail(self.names[1], 2000), 1)
+        expected = [self.names[0]]
+        actual = self.cache.entries.keys()
+        self.assertEqual(expected, actual)
+
+    def testDiscard(self):
+        self.cache.put(make_detail(self.names[0], 400), 1)
+        self.cache.discard(self.names[0])
+        self.cache.discard(self.names[0])
+        expected = (0, 0)
+        actual = (len(self.cache), self.cache.size)
+        self.assertEqual(expected, actual)
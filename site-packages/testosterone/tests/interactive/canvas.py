@@ -0,0 +1,97 @@
+import unittest
+
+from testosterone.interactive import utils
+from testosterone.interactive.utils import Canvas
+
+
+class FakeWindow:
+    """Record writes instead of drawing them.
+    """
+    def __init__(self):
+        self.writes = []
+    def addstr(self, y, x, s, attr=0):
+        self.writes.append((y, x, s, attr))
+    def addch(self, y, x, c, attr=0):
+        self.writes.append((y, x, c, attr))
+    def noutrefresh(self):
+        pass
+
+
+class Basics(unittest.TestCase):
+
+    def setUp(self):
+        self._doupdate = utils.curses.doupdate
+        utils.curses.doupdate = lambda: None
+        self.win = FakeWindow()
+        self.canvas = Canvas(self.win)
+
+    def tearDown(self):
+        utils.curses.doupdate = self._doupdate
+
+
+    def testNothingIsWrittenUntilFlush(self):
+        self.canvas.addstr(0, 0, 'foo')
+        expected = []
+        actual = self.win.writes
+        self.assertEqual(expected, actual)
+
+    def testFlushWritesRuns(self):
+        self.canvas.addstr(0, 0, 'foo', 1)
+        self.canvas.addch(0, 3, 4194424, 1)
+        self.canvas.addstr(0, 4, 'bar', 1)
+        self.canvas.flush()
+        expected = [(0, 0, 'foo', 1), (0, 3, 4194424, 1), (0, 4, 'bar', 1)]
+        actual = self.win.writes
+        self.assertEqual(expected, actual)
+
+    def testUnchangedCellsAreNotRewritten(self):
+        self.canvas.addstr(0, 0, 'foobar')
+        self.canvas.flush()
+        self.win.writes = []
+        self.canvas.addstr(0, 0, 'foobar')
+        self.canvas.flush()
+        expected = []
+        actual = self.win.writes
+        self.assertEqual(expected, actual)
+
+    def testOnlyChangedCellsAreRewritten(self):
+        self.canvas.addstr(0, 0, 'foobar')
+        self.canvas.flush()
+        self.win.writes = []
+        self.canvas.addstr(0, 0, 'fooBAr')
+        self.canvas.flush()
+        expected = [(0, 3, 'BA', 0)]
+        actual = self.win.writes
+        self.assertEqual(expected, actual)
+
+    def testAttributeChangeIsAChange(self):
+        self.canvas.addstr(0, 0, 'foo', 1)
+        self.canvas.flush()
+        self.win.writes = []
+        self.canvas.addstr(0, 0, 'foo', 2)
+        self.canvas.flush()
+        expected = [(0, 0, 'foo', 2)]
+        actual = self.win.writes
+        self.assertEqual(expected, actual)
+
+    def testLaterWritesOverlayEarlierOnes(self):
+        self.canvas.addstr(0, 0, 'foobar')
+        self.canvas.flush()
+        self.win.writes = []
+        self.canvas.addstr(0, 0, '      ')
+        self.canvas.addstr(0, 0, 'foo')
+        self.canvas.flush()
+        expected = [(0, 3, '   ', 0)]
+        actual = self.win.writes
+        self.assertEqual(expected, actual)
+
+    def testResetForgetsTheScreen(self):
+        self.canvas.addstr(0, 0, 'foo')
+        self.canvas.flush()
+        self.canvas.reset()
+        self.win.writes = []
+        self.canvas.addstr(0, 0, 'foo')
+        self.canvas.flush()
+        expected = [(0, 0, 'foo', 0)]
+        actual = self.win.writes
+        self.assertEqual(expected, actual)
@@ -0,0 +1,142 @@
+import textwrap
+import time
+import unittest
+
+from testosterone.interactive.utils import Layout, format_output, format_tb
+
+
+TRACEBACK = """\
+Traceback (most recent call last):
+  File "/tmp/testostertests/__init__.py", line 21, in test_errs
+    raise StandardError('heck, this is a rather long line of source')
+  File "/tmp/testostertests/really/quite/deeply/nested/module.py", line 5, in f
+    g()
+StandardError: heck, and here is a message that goes on for a good while
+"""
+
+
+def wrap_all(width, traceback_):
+    """Given a width and a traceback, wrap every line of it with textwrap.
+
+    This is how format_tb used to work, and Layout should match it.
+
+    """
+    wrapper_1 = textwrap.TextWrapper(width=width, break_long_words=True)
+    wrapper_2 = textwrap.TextWrapper( width=width
+                                    , initial_indent='  '
+                                    , subsequent_indent='    '
+                                    , break_long_words=True
+                                     )
+    raw = traceback_.splitlines()
+    lines = wrapper_1.wrap(raw[0])
+    lines.append('')
+    for line in raw[1:-1]:
+        line = line.strip()
+        lines.extend(wrapper_2.wrap(line))
+        if not line.startswith('File'):
+            lines.append('')
+    lines.extend(wrapper_1.wrap(raw[-1]))
+    return lines
+
+
+def recursion(nframes):
+    """Given a number of repeated frames, return a recursion traceback.
+    """
+    frame = ( '  File "/tmp/testostertests/__init__.py", line 8, in f\n'
+              '    return f()\n'
+             )
+    return ( 'Traceback (most recent call last):\n'
+           + '  File "/tmp/testostertests/__init__.py", line 4, in test\n'
+           + '    f()\n'
+           + frame * nframes
+           + 'RuntimeError: maximum recursion depth exceeded\n'
+            )
+
+
+class Wrapping(unittest.TestCase):
+
+    def testSameAsWrappingEverything(self):
+        for width in (10, 20, 40, 60, 80, 200):
+            expected = wrap_all(width, TRACEBACK)
+            actual = list(Layout(width, TRACEBACK))
+            self.assertEqual(expected, actual)
+
+    def testOddWhitespaceIsWrapped(self):
+        traceback_ = "Traceback:\n  x\t=\x0c1\n  \nError:  two  spaces  "
+        expected = wrap_all(40, traceback_)
+        actual = list(Layout(40, traceback_))
+        self.assertEqual(expected, actual)
+
+    def testLinesThatFitAreNotWrapped(self):
+        layout = Layout(200, TRACEBACK)
+        expected = {}
+        actual = layout.wrapped
+        self.assertEqual(expected, actual)
+
+    def testNegativeIndex(self):
+        layout = Layout(80, TRACEBACK)
+        expected = layout[len(layout)-1]
+        actual = layout[-1]
+        self.assertEqual(expected, actual)
+
+    def testIndexOutOfRange(self):
+        layout = Layout(80, TRACEBACK)
+        self.assertRaises(IndexError, lambda: layout[len(layout)])
+
+
+class Collapsing(unittest.TestCase):
+
+    def testRepeatedFramesCollapse(self):
+        expected = [ 'Traceback (most recent call last):'
+                   , ''
+                   , '  File "/tmp/testostertests/__init__.py", line 4, in test'
+                   , '  f()'
+                   , ''
+                   , '  File "/tmp/testostertests/__init__.py", line 8, in f'
+                   , '  return f()'
+                   , ''
+                   , '  [previous frame repeated 999 times]'
+                   , ''
+                   , 'RuntimeError: maximum recursion depth exceeded'
+                    ]
+        actual = list(Layout(80, recursion(1000)))
+        self.assertEqual(expected, actual)
+
+    def testOneFrameIsNotCollapsed(self):
+        expected = wrap_all(80, recursion(1))
+        actual = list(Layout(80, recursion(1)))
+        self.assertEqual(expected, actual)
+
+    def testDifferentFramesAreKept(self):
+        traceback_ = TRACEBACK.replace('line 5', 'line 21')
+        traceback_ = traceback_.replace('nested/module.py', '__init__.py')
+        expected = wrap_all(80, traceback_)
+        actual = list(Layout(80, traceback_))
+        self.assertEqual(expected, actual)
+
+    def testHugeTracebackIsQuick(self):
+        start = time.time()
+        Layout(80, recursion(100000))
+        self.assert_(time.time() - start < 1.0)
+
+
+class Memoizing(unittest.TestCase):
+
+    def testSameTracebackAndWidth(self):
+        self.assert_(format_tb(80, TRACEBACK) is format_tb(80, TRACEBACK))
+
+    def testOtherWidth(self):
+        self.assert_(format_tb(80, TRACEBACK) is not format_tb(79, TRACEBACK))
+
+
+class Output(unittest.TestCase):
+
+    def testLongLinesAreCut(self):
+        expected = ['Hey t', 'here!', '', 'Uh oh', '.']
+        actual = format_output(5, 'Hey there!\n\nUh oh.\n')
+        self.assertEqual(expected, actual)
+
+    def testTabsAndControlCharacters(self):
+        expected = ['        x??y']
+        actual = format_output(80, '\tx\x1b\x07y')
+        self.assertEqual(expected, actual)
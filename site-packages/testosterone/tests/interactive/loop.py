@@ -0,0 +1,75 @@
+import os
+import time
+import unittest
+
+from testosterone.interactive.loop import EventLoop
+
+
+class Basics(unittest.TestCase):
+
+    def setUp(self):
+        self.stdin = os.pipe()
+        self.loop = EventLoop(self.stdin[0])
+        self.calls = []
+
+    def tearDown(self):
+        self.loop.close()
+        for fd in self.stdin:
+            os.close(fd)
+
+
+    def testTimerFires(self):
+        self.loop.call_later(0, lambda: self.calls.append('timer'))
+        self.loop.wait(1)
+        expected = ['timer']
+        actual = self.calls
+        self.assertEqual(expected, actual)
+
+    def testTimersFireInOrder(self):
+        self.loop.call_later(0.02, lambda: self.calls.append(2))
+        self.loop.call_later(0.01, lambda: self.calls.append(1))
+        while len(self.calls) < 2:
+            self.loop.wait(1)
+        expected = [1, 2]
+        actual = self.calls
+        self.assertEqual(expected, actual)
+
+    def testCancelledTimerDoesntFire(self):
+        timer = self.loop.call_later(0, lambda: self.calls.append('timer'))
+        self.loop.cancel(timer)
+        self.loop.wait(0.01)
+        expected = []
+        actual = self.calls
+        self.assertEqual(expected, actual)
+
+    def testWaitBlocksUntilTimer(self):
+        self.loop.call_later(0.05, lambda: self.calls.append('timer'))
+        start = time.time()
+        self.loop.wait()
+        self.assert_(time.time() - start >= 0.04)
+        expected = ['timer']
+        actual = self.calls
+        self.assertEqual(expected, actual)
+
+    def testWatchedFdIsDispatched(self):
+        r, w = os.pipe()
+        self.loop.watch(r, lambda: self.calls.append(os.read(r, 10)))
+        os.write(w, 'foo')
+        self.loop.wait(1)
+        self.loop.unwatch(r)
+        os.close(r)
+        os.close(w)
+        expected = ['foo']
+        actual = self.calls
+        self.assertEqual(expected, actual)
+
+    def testWaitReturnsTrueForInput(self):
+        os.write(self.stdin[1], 'q')
+        expected = True
+        actual = self.loop.wait(1)
+        self.assertEqual(expected, actual)
+
+    def testWaitReturnsFalseOnTimeout(self):
+        expected = False
+        actual = self.loop.wait(0.01)
+        self.assertEqual(expected, actual)
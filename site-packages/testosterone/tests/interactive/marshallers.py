@@ -1,8 +1,11 @@
 import os
 
+from testosterone.cli.utils import OUTPUT, SPOOL, banner
+from testosterone.interactive import detail as detail_module
 from testosterone.interactive.detail import Detail as _Detail
 from testosterone.interactive.utils import RefreshError
 from testosterone.interactive.summary import Summary as _Summary
+from testosterone.interactive.tree import MODULE, NOT_RUN, STALE, FRESH
 from testosterone.tests.utils import reportersTestCase
 
 
@@ -51,6 +54,13 @@ Ran 1 test in 0.002s
 FAILED (errors=1)
 """
 
+RAW_OUTPUT = RAW_ONE.replace( "StandardError: heck\n"
+                            , "StandardError: heck\n"
+                              "%s stdout 11 /tmp/out dir/stdout-1.txt\n"
+                              "%s stderr 3 /tmp/out dir/stderr-1.txt\n"
+                              % (OUTPUT, OUTPUT)
+                             )
+
 TOTALS = ('60%', '1', '1', '5')
 TOTALS_ONE = ('0%', '0', '1', '1')
 
@@ -80,6 +90,24 @@ StandardError: heck""" % hack]
         }
 
 
+def details(detail):
+    """Given a Detail, return its data with tracebacks decompressed.
+    """
+    return dict([(name, [detail.data[name][0], detail.traceback(name)])
+                 for name in detail.data])
+
+def records(summary):
+    """Given a Summary, return {name: (status, stats)} for everything in it.
+    """
+    out = {}
+    for name, node in summary.tree.nodes.items():
+        stats = None
+        if node.status != MODULE:
+            stats = summary.rollup(name)
+        out[name] = (summary.status(node), stats)
+    return out
+
+
 class Detail(reportersTestCase):
 
     def setUpUp(self):
@@ -110,6 +138,21 @@ class Detail(reportersTestCase):
             actual = err.traceback
             self.assertEqual(expected, actual[:len(expected)])
 
+    def testSpawnHandsOnSeed(self):
+        spawned = []
+        class Process:
+            def __init__(self, args, **kwargs):
+                spawned.append(args)
+                self.pid = 0
+        real = detail_module.Process
+        detail_module.Process = Process
+        try:
+            self.detail.seed = 42
+            self.detail._spawn()
+        finally:
+            detail_module.Process = real
+        self.assert_('--random-order=42' in spawned[0], spawned)
+
 
 
     # _set_data
@@ -119,7 +162,7 @@ class Detail(reportersTestCase):
         self.detail._Detail__raw = _RAW
         self.detail._set_data()
         expected = DATA
-        actual = self.detail.data
+        actual = details(self.detail)
         self.assertEqual(expected, actual)
 
         expected = TOTALS
@@ -130,13 +173,110 @@ class Detail(reportersTestCase):
         self.detail._Detail__raw = RAW_ONE
         self.detail._set_data()
         expected = DATA_ONE
-        actual = self.detail.data
+        actual = details(self.detail)
         self.assertEqual(expected, actual)
 
         expected = TOTALS_ONE
         actual = self.detail.totals
         self.assertEqual(expected, actual)
 
+    def testSetDataMergesSomeTests(self):
+        self.detail._Detail__raw = _RAW
+        self.detail._set_data()
+        self.detail.tests = ['test_fails', 'test_errs']
+        self.detail._Detail__raw = RAW_ONE  # test_fails passed this time
+        self.detail._set_data()
+        expected = DATA_ONE
+        actual = details(self.detail)
+        self.assertEqual(expected, actual)
+
+        expected = ('80%', '0', '1', '5')
+        actual = self.detail.totals
+        self.assertEqual(expected, actual)
+
+    def testSetDataKeepsTestsNotRerun(self):
+        self.detail._Detail__raw = _RAW
+        self.detail._set_data()
+        self.detail.tests = ['test_errs']
+        self.detail._Detail__raw = RAW_ONE
+        self.detail._set_data()
+        expected = DATA
+        actual = details(self.detail)
+        self.assertEqual(expected, actual)
+
+        expected = TOTALS
+        actual = self.detail.totals
+        self.assertEqual(expected, actual)
+
+    def testSetDataSplitsOffOutput(self):
+        self.detail._Detail__raw = RAW_OUTPUT
+        self.detail._set_data()
+        expected = DATA_ONE
+        actual = details(self.detail)
+        self.assertEqual(expected, actual)
+
+        expected = {'test_errs': [ ('stdout', 11, '/tmp/out dir/stdout-1.txt')
+                                 , ('stderr', 3, '/tmp/out dir/stderr-1.txt')
+                                  ]}
+        actual = self.detail.outputs
+        self.assertEqual(expected, actual)
+
+    def testSetDataMergesOutputs(self):
+        self.detail._Detail__raw = RAW_OUTPUT
+        self.detail._set_data()
+        self.detail.tests = ['test_errs']
+        self.detail._Detail__raw = RAW_ONE  # no output this time
+        self.detail._set_data()
+        expected = {}
+        actual = self.detail.outputs
+        self.assertEqual(expected, actual)
+
+
+    # output
+    # ======
+
+    def testOutput(self):
+        path = os.path.join(self.tmp, 'testosterone-output.txt')
+        open(path, 'w').write('Hey there!\n')
+        try:
+            self.detail.outputs = {'test_errs': [('stdout', 11, path)]}
+            expected = "stdout: 11 bytes\n\nHey there!\n"
+            actual = self.detail.output('test_errs')
+            self.assertEqual(expected, actual)
+        finally:
+            os.remove(path)
+
+    def testOutputReadsOnlyTheEnd(self):
+        path = os.path.join(self.tmp, 'testosterone-output.txt')
+        open(path, 'w').write('first line\nsecond line\nthird line\n')
+        try:
+            self.detail.outputs = {'test_errs': [('stdout', 34, path)]}
+            self.detail.output_limit = 16
+            expected = ( "stdout: 34 bytes (the first 23 are in %s)\n\n" % path
+                       + "third line\n"
+                        )
+            actual = self.detail.output('test_errs')
+            self.assertEqual(expected, actual)
+        finally:
+            os.remove(path)
+
+    def testOutputNone(self):
+        expected = ''
+        actual = self.detail.output('test_errs')
+        self.assertEqual(expected, actual)
+
+    def testRefreshSomeTests(self):
+        self.detail.refresh()
+        started = self.detail.started
+        self.detail.refresh(['test_errs'])
+        expected = (TOTALS, ['test_errs', 'test_fails'], started, None)
+        actual = ( self.detail.totals
+                 , self.detail.names
+                 , self.detail.started
+                 , self.detail.tests
+                  )
+        self.assertEqual(expected, actual)
+
 
 
 RAW2 = """\
@@ -162,6 +302,36 @@ LINES = [ 'Hey there!'
 , '--------------------------------------------------------------------------------'
 ]
 
+RAW_MEM = """\
+-------------------------------<| testosterone |>-------------------------------
+MODULE                                                  PASS FAIL  ERR  ALL  MEM
+--------------------------------------------------------------------------------
+testostertests.TestCase                                  60%    1    1    5 1.5M
+testostertests.itDoesExist.TestCase                     100%    0    0    2  12M
+--------------------------------------------------------------------------------
+TOTALS                                                   71%    1    1    7  12M
+
+HEAVIEST TESTCASES                                                          PEAK
+--------------------------------------------------------------------------------
+testostertests.itDoesExist.TestCase                                          12M
+testostertests.TestCase                                                     1.5M
+"""
+
+RAW_RERUN = """\
+-------------------------------<| testosterone |>-------------------------------
+MODULE                                                       PASS FAIL  ERR  ALL
+--------------------------------------------------------------------------------
+testostertests.TestCase                                       60%    1    1    5
+testostertests.itDoesExist.TestCase                          100%    0    0    2
+--------------------------------------------------------------------------------
+TOTALS                                                        71%    1    1    7
+
+RERUN FAILURES (2 runs)                                                  VERDICT
+--------------------------------------------------------------------------------
+testostertests.TestCase.test_errs                            ~             flaky
+testostertests.TestCase.test_fails                           ?   order-dependent
+"""
+
 
 RAW_ALL_PASSING = """\
 Hey there!
@@ -200,8 +370,8 @@ LINES_DOTTED = [ 'Hey there!'
 , '--------------------------------------------------------------------------------'
 ]
 DATA_DOTTED = {
-    'testostertests': [None, None]
-  , 'testostertests.itDoesExist': [('100%', '0', '0', '2'), True]
+    'testostertests': (MODULE, None)
+  , 'testostertests.itDoesExist': (FRESH, ('100%', '0', '0', '2'))
    }
 
 
@@ -323,9 +493,414 @@ class Summary(reportersTestCase):
         actual = self.summary.totals
         self.assertEqual(expected, actual)
 
+    def testSetTotalsAndDataMemory(self):
+        self.summary.module = 'testostertests'
+        self.summary._Summary__raw = RAW_MEM
+        self.summary._set_totals()
+        self.summary._set_data()
+
+        expected = ('71%', '1', '1', '7')
+        actual = self.summary.totals
+        self.assertEqual(expected, actual)
+
+        expected = { 'testostertests': (MODULE, None)
+                   , 'testostertests.TestCase': (FRESH, ('60%', '1', '1', '5'))
+                   , 'testostertests.itDoesExist': (MODULE, None)
+                   , 'testostertests.itDoesExist.TestCase':
+                        (FRESH, ('100%', '0', '0', '2'))
+                    }
+        actual = records(self.summary)
+        self.assertEqual(expected, actual)
+
+        expected = (1536 << 10, 12 << 20)
+        actual = ( self.summary.tree['testostertests.TestCase'].peak
+                 , self.summary.tree['testostertests.itDoesExist.TestCase'].peak
+                  )
+        self.assertEqual(expected, actual)
+
+    def testSetVerdicts(self):
+        self.summary.module = 'testostertests'
+        self.summary._Summary__raw = RAW_RERUN
+        self.summary._set_totals()
+        self.summary._set_data()
+        self.summary._set_verdicts()
+        expected = ('~?', '')
+        actual = ( self.summary.tree['testostertests.TestCase'].verdicts
+                 , self.summary.tree['testostertests.itDoesExist.TestCase'
+                                    ].verdicts
+                  )
+        self.assertEqual(expected, actual)
+
+    def testSetDataSeededBanner(self):
+        self.summary.module = 'testostertests'
+        self.summary._Summary__lines = [banner(1234)] + LINES[2:]
+        self.summary._set_data()
+        expected = ('60%', '1', '1', '5')
+        actual = self.summary.rollup('testostertests.TestCase')
+        self.assertEqual(expected, actual)
+
     def testSetDataDotted(self):
         self.summary._Summary__lines = LINES_DOTTED
         self.summary._set_data()
         expected = DATA_DOTTED
-        actual = self.summary.data
+        actual = records(self.summary)
+        self.assertEqual(expected, actual)
+
+
+    # _tick
+    # =====
+
+    def testTick(self):
+        names = []
+        self.summary.module = 'testostertests'
+        self.summary.progress = names.append
+        self.summary.running = (0, 0, 0, 0, 0)
+        self.summary._tick('<| tick |> PLAN 7')
+        self.summary._tick('Hey there!')
+        self.summary._tick('<| tick |> testostertests.itDoesExist.TestCase '
+                           '60% 1 1 5')
+
+        expected = ['testostertests.itDoesExist.TestCase']
+        actual = names
         self.assertEqual(expected, actual)
+
+        expected = (7, 1, 1, 5, 0)
+        actual = self.summary.running
+        self.assertEqual(expected, actual)
+
+        expected = { 'testostertests': (MODULE, None)
+                   , 'testostertests.itDoesExist': (MODULE, None)
+                   , 'testostertests.itDoesExist.TestCase':
+                        (FRESH, ('60%', '1', '1', '5'))
+                    }
+        actual = records(self.summary)
+        self.assertEqual(expected, actual)
+
+        expected = [ 'testostertests'
+                   , 'testostertests.itDoesExist'
+                   , 'testostertests.itDoesExist.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testTickMemory(self):
+        self.summary.module = 'testostertests'
+        self.summary.progress = lambda name: None
+        self.summary.running = (0, 0, 0, 0, 0)
+        self.summary._tick('<| tick |> testostertests.TestCase '
+                           '60% 1 1 5 0.002 12345678')
+        expected = 12345678
+        actual = self.summary.tree['testostertests.TestCase'].peak
+        self.assertEqual(expected, actual)
+
+    def testTickRerun(self):
+        names = []
+        self.summary.module = 'testostertests'
+        self.summary.progress = names.append
+        self.summary.running = (0, 0, 0, 0, 0)
+        self.summary._tick('<| tick |> testostertests.TestCase 60% 1 1 5')
+        self.summary._tick('<| tick |> RERUN '
+                           'testostertests.TestCase.test_fails flaky')
+        self.summary._tick('<| tick |> RERUN '
+                           'testostertests.TestCase.test_errs flaky')
+        expected = ('~', ['testostertests.TestCase'] * 3)
+        actual = (self.summary.tree['testostertests.TestCase'].verdicts, names)
+        self.assertEqual(expected, actual)
+
+    def testNewResultClearsVerdicts(self):
+        self.summary.module = 'testostertests'
+        self.summary._Summary__raw = RAW_RERUN
+        self.summary._set_totals()
+        self.summary._set_data()
+        self.summary._set_verdicts()
+        self.summary.update('testostertests.TestCase', '100%', '0', '0', '5')
+        expected = ''
+        actual = self.summary.tree['testostertests.TestCase'].verdicts
+        self.assertEqual(expected, actual)
+
+    def testRunMemory(self):
+        self.summary.memory = True
+        self.summary.refresh('testostertests', find_only=False)
+        try:
+            self.assert_(self.summary.tree['testostertests.TestCase'].peak > 0)
+        finally:
+            self.summary.close()
+
+
+    # expand/collapse
+    # ===============
+
+    def setUpTree(self):
+        self.summary._Summary__lines = LINES
+        self.summary.module = 'testostertests'
+        self.summary._set_data()
+
+    def testSetDataNames(self):
+        self.setUpTree()
+        expected = [ 'testostertests'
+                   , 'testostertests.TestCase'
+                   , 'testostertests.itDoesExist'
+                   , 'testostertests.itDoesExist.TestCase'
+                   , 'testostertests.itDoesExist.TestCase2'
+                   , 'testostertests.subpkg'
+                   , 'testostertests.subpkg.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testCollapse(self):
+        self.setUpTree()
+        self.summary.collapse('testostertests.itDoesExist')
+        expected = [ 'testostertests'
+                   , 'testostertests.TestCase'
+                   , 'testostertests.itDoesExist'
+                   , 'testostertests.subpkg'
+                   , 'testostertests.subpkg.TestCase'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testCollapseThenExpand(self):
+        self.setUpTree()
+        before = self.summary.names[:]
+        self.summary.collapse('testostertests.itDoesExist')
+        self.summary.expand('testostertests.itDoesExist')
+        expected = before
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testExpandInsideCollapsedIsHidden(self):
+        self.setUpTree()
+        self.summary.collapse('testostertests.itDoesExist')
+        self.summary.collapse('testostertests')
+        self.summary.expand('testostertests.itDoesExist')
+        expected = ['testostertests']
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+        self.summary.expand('testostertests')
+        expected = 7
+        actual = len(self.summary)
+        self.assertEqual(expected, actual)
+
+    def testNewNamesUnderCollapsedModuleAreHidden(self):
+        self.setUpTree()
+        self.summary.collapse('testostertests.subpkg')
+        self.summary.progress = lambda name: None
+        self.summary.running = (0, 0, 0, 0, 0)
+        self.summary._tick('<| tick |> testostertests.subpkg.TestCase2 '
+                           '100% 0 0 1')
+        expected = [ 'testostertests'
+                   , 'testostertests.TestCase'
+                   , 'testostertests.itDoesExist'
+                   , 'testostertests.itDoesExist.TestCase'
+                   , 'testostertests.itDoesExist.TestCase2'
+                   , 'testostertests.subpkg'
+                    ]
+        actual = self.summary.names
+        self.assertEqual(expected, actual)
+
+    def testIndex(self):
+        self.setUpTree()
+        expected = 3
+        actual = self.summary.index('testostertests.itDoesExist.TestCase')
+        self.assertEqual(expected, actual)
+        self.summary.collapse('testostertests.itDoesExist')
+        self.assertRaises( ValueError
+                         , self.summary.index
+                         , 'testostertests.itDoesExist.TestCase'
+                          )
+
+
+    # rollups
+    # =======
+
+    def testRollup(self):
+        self.setUpTree()
+        expected = ('80%', '1', '1', '10')
+        actual = self.summary.rollup('testostertests')
+        self.assertEqual(expected, actual)
+
+        expected = ('100%', '0', '0', '3')
+        actual = self.summary.rollup('testostertests.itDoesExist')
+        self.assertEqual(expected, actual)
+
+    def testRollupNotRun(self):
+        self.summary._Summary__lines = LINES_DOTTED[:4] + [
+            'testostertests.itDoesExist.TestCase                            -     -    -    2']
+        self.summary.module = 'testostertests'
+        self.summary._set_data()
+        expected = ('-', '-', '-', '2')
+        actual = self.summary.rollup('testostertests')
+        self.assertEqual(expected, actual)
+
+    def testUpdateKeepsTotalsForModule(self):
+        self.setUpTree()
+        self.summary.update('testostertests.TestCase', '100%', '0', '0', '5')
+        expected = ('100%', '0', '0', '10')
+        actual = self.summary.totals
+        self.assertEqual(expected, actual)
+
+        expected = ('100%', '0', '0', '10')
+        actual = self.summary.rollup('testostertests')
+        self.assertEqual(expected, actual)
+
+    def testTickRecordsSeconds(self):
+        self.setUpTree()
+        self.summary.progress = lambda name: None
+        self.summary.running = (0, 0, 0, 0, 0)
+        self.summary._tick('<| tick |> testostertests.subpkg.TestCase '
+                           '50% 1 0 2 0.250')
+        expected = 0.25
+        actual = self.summary.tree['testostertests'].seconds
+        self.assertEqual(expected, actual)
+
+        expected = ('70%', '2', '1', '10')
+        actual = self.summary.rollup('testostertests')
+        self.assertEqual(expected, actual)
+
+
+    # generations
+    # ===========
+
+    def testUpdateMakesOthersStale(self):
+        self.setUpTree()
+        self.summary.update('testostertests.TestCase', '100%', '0', '0', '5')
+        expected = FRESH
+        actual = self.summary.status(self.summary.tree['testostertests.TestCase'])
+        self.assertEqual(expected, actual)
+
+        expected = STALE
+        node = self.summary.tree['testostertests.subpkg.TestCase']
+        actual = self.summary.status(node)
+        self.assertEqual(expected, actual)
+
+    def testSetStaleIsConstantTime(self):
+        self.setUpTree()
+        nodes = self.summary.tree.nodes
+        self.summary.tree.nodes = None  # _set_stale must not look at nodes
+        self.summary._set_stale()
+        self.summary.tree.nodes = nodes
+        expected = STALE
+        node = self.summary.tree['testostertests.subpkg.TestCase']
+        actual = self.summary.status(node)
+        self.assertEqual(expected, actual)
+
+    def testNotRunIsNeverStale(self):
+        self.summary._Summary__lines = LINES_DOTTED[:4] + [
+            'testostertests.itDoesExist.TestCase                            -     -    -    2']
+        self.summary.module = 'testostertests'
+        self.summary._set_data()
+        self.summary._set_stale()
+        expected = NOT_RUN
+        node = self.summary.tree['testostertests.itDoesExist.TestCase']
+        actual = self.summary.status(node)
+        self.assertEqual(expected, actual)
+
+
+    # spool
+    # =====
+
+    def testRunSpoolsFailures(self):
+        self.summary.refresh('testostertests', find_only=False)
+        try:
+            expected = ['testostertests.TestCase']
+            actual = sorted(self.summary.details)
+            self.assertEqual(expected, actual)
+
+            detail = self.summary.detail('testostertests.TestCase')
+            expected = ( TOTALS
+                       , [('test_errs', 'error'), ('test_fails', 'failure')]
+                        )
+            actual = (detail.totals, [detail[i] for i in range(len(detail))])
+            self.assertEqual(expected, actual)
+            self.assert_('heck' in detail.traceback('test_errs'))
+
+            expected = None
+            actual = self.summary.detail('testostertests.TestCase2')
+            self.assertEqual(expected, actual)
+        finally:
+            self.summary.close()
+
+    def testSpoolOutlivesRunsButNotUpdates(self):
+        self.summary.refresh('testostertests', find_only=False)
+        try:
+            self.summary.refresh('testostertests.subpkg', find_only=False)
+            self.assert_('testostertests.TestCase' in self.summary.details)
+            self.summary.update('testostertests.TestCase', '100%', '0', '0', '5')
+            expected = {}
+            actual = self.summary.details
+            self.assertEqual(expected, actual)
+        finally:
+            self.summary.close()
+
+    def testCancelKeepsFinishedResults(self):
+        names = []
+        proc = self.summary.start('testostertests', False, names.append)
+        try:
+            proc.drain()    # as if killed just after the last result
+            self.summary.cancel()
+
+            expected = ()
+            actual = self.summary.running
+            self.assertEqual(expected, actual)
+
+            expected = ['testostertests.TestCase']
+            actual = sorted(self.summary.details)
+            self.assertEqual(expected, actual)
+
+            expected = self.summary.rollup('testostertests')
+            actual = self.summary.totals
+            self.assertEqual(expected, actual)
+
+            expected = (FRESH, TOTALS)
+            actual = records(self.summary)['testostertests.TestCase']
+            self.assertEqual(expected, actual)
+        finally:
+            self.summary.close()
+
+    def testCancelSkipsCutOffReport(self):
+        proc = self.summary.start('testostertests', False, lambda name: None)
+        try:
+            proc.drain()
+            fp = open(self.summary.spool, 'a')
+            fp.write(SPOOL + ' testostertests.TestCase2 1000\nTraceback')
+            fp.close()
+            self.summary.cancel()
+            expected = ['testostertests.TestCase']
+            actual = sorted(self.summary.details)
+            self.assertEqual(expected, actual)
+        finally:
+            self.summary.close()
+
+    def testCancelFindOnlyDoesNothing(self):
+        self.summary.totals = TOTALS
+        proc = self.summary.start('testostertests')
+        proc.drain()
+        self.summary.cancel()
+        expected = (TOTALS, None)
+        actual = (self.summary.totals, self.summary.spool)
+        self.assertEqual(expected, actual)
+
+    def testRunCapturesOutput(self):
+        self.summary.refresh('testostertests', find_only=False)
+        try:
+            capture = self.summary.capture
+            self.assert_(os.path.isdir(capture))
+            expected = []   # only test_prints_stuff printed, and it passed
+            actual = os.listdir(capture)
+            self.assertEqual(expected, actual)
+            detail = self.summary.detail('testostertests.TestCase')
+            expected = capture
+            actual = detail.capture
+            self.assertEqual(expected, actual)
+        finally:
+            self.summary.close()
+        self.assert_(not os.path.exists(capture))
+
+    def testCloseRemovesSpool(self):
+        self.summary.refresh('testostertests', find_only=False)
+        spool = self.summary.spool
+        self.assert_(os.path.isfile(spool))
+        self.summary.close()
+        self.assert_(not os.path.exists(spool))
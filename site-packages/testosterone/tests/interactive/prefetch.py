@@ -0,0 +1,190 @@
+import os
+import time
+
+from testosterone.interactive.detail import Detail
+from testosterone.interactive.loop import EventLoop
+from testosterone.interactive.prefetch import Prefetcher
+from testosterone.interactive.summary import Summary
+from testosterone.interactive.utils import ScrollArea
+from testosterone.tests.interactive.marshallers import RAW_ONE
+from testosterone.tests.utils import reportersTestCase
+
+
+ROWS = [ ('testostertests.itDoesExist.TestA', ('0%', '1', '0', '1'))
+       , ('testostertests.itDoesExist.TestB', ('100%', '0', '0', '1'))
+       , ('testostertests.itDoesExist.TestC', ('0%', '0', '1', '1'))
+       , ('testostertests.itDoesExist.TestD', ('100%', '0', '0', '1'))
+       , ('testostertests.itDoesExist.TestE', ('0%', '1', '0', '1'))
+        ]
+
+
+class Screen:
+    """Stand in for a SummaryScreen.
+    """
+
+    job = None
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.summary = Summary()
+        self.summary._add_names(set([ 'testostertests'
+                                      , 'testostertests.itDoesExist'
+                                       ] + [r[0] for r in ROWS]))
+        for name, stats in ROWS:
+            self.summary._record(name, stats)
+        self.listing = ScrollArea(10, len(self.summary), 0)
+        self.recalled = {}
+
+    def rows(self):
+        return self.summary
+
+    def recall(self, name):
+        return self.recalled.get(name)
+
+
+class Proc:
+    """Stand in for a finished Process.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def result(self):
+        return self.raw
+
+    def poll(self):
+        return 0
+
+
+class Basics(reportersTestCase):
+
+    def setUpUp(self):
+        self.stdin = os.pipe()
+        self.loop = EventLoop(self.stdin[0])
+        self.screen = Screen(self.loop)
+        self.prefetcher = Prefetcher(self.screen)
+
+    def tearDown(self):
+        self.prefetcher.cancel()
+        self.loop.close()
+        for fd in self.stdin:
+            os.close(fd)
+        reportersTestCase.tearDown(self)
+
+    def select(self, name):
+        self.screen.listing.jump(self.screen.summary.index(name))
+
+
+    # pick
+    # ====
+
+    def testPickSelectedFirst(self):
+        self.select('testostertests.itDoesExist.TestC')
+        expected = 'testostertests.itDoesExist.TestC'
+        actual = self.prefetcher.pick()
+        self.assertEqual(expected, actual)
+
+    def testPickNearestFailure(self):
+        self.select('testostertests.itDoesExist.TestD')
+        expected = 'testostertests.itDoesExist.TestE'
+        actual = self.prefetcher.pick()
+        self.assertEqual(expected, actual)
+
+    def testPickSkipsModulesAndPassing(self):
+        self.select('testostertests')
+        expected = 'testostertests.itDoesExist.TestA'
+        actual = self.prefetcher.pick()
+        self.assertEqual(expected, actual)
+
+    def testPickSkipsWhatTheScreenHas(self):
+        self.select('testostertests.itDoesExist.TestC')
+        self.screen.recalled['testostertests.itDoesExist.TestC'] = Detail('testostertests.itDoesExist.TestC')
+        expected = 'testostertests.itDoesExist.TestE'
+        actual = self.prefetcher.pick()
+        self.assertEqual(expected, actual)
+
+    def testPickOnlyNearby(self):
+        self.select('testostertests')
+        self.prefetcher.rows = 1
+        expected = None
+        actual = self.prefetcher.pick()
+        self.assertEqual(expected, actual)
+
+
+    # schedule and cancel
+    # ===================
+
+    def testScheduleWhenDisabledDoesNothing(self):
+        self.prefetcher.schedule()
+        self.assert_(self.prefetcher.timer is None)
+
+    def testScheduleThenCancel(self):
+        self.prefetcher.enabled = True
+        self.prefetcher.schedule()
+        self.assert_(self.prefetcher.timer is not None)
+        self.prefetcher.cancel()
+        self.assert_(self.prefetcher.timer is None)
+
+    def testScheduleWaitsForBudget(self):
+        self.prefetcher.enabled = True
+        self.prefetcher.wait_until = time.time() + 60
+        self.prefetcher.schedule()
+        when = [t[0] for t in self.loop.timers if t[2][0] is not None][0]
+        self.assert_(when > time.time() + 59)
+
+    def testStartWaitsForScreenJob(self):
+        self.screen.job = object()
+        self.prefetcher.start()
+        self.assert_(self.prefetcher.job is None)
+
+
+    # finish and take
+    # ===============
+
+    def finish(self, name, elapsed):
+        self.prefetcher.detail = Detail(name)
+        self.prefetcher.generation = self.screen.summary.tree[name].generation
+        self.prefetcher.started = time.time() - elapsed
+        self.prefetcher.detail.started = time.time() + 1 # after the fixture
+        raw = RAW_ONE.replace('testostertests.TestCase', name)
+        self.prefetcher.finish(Proc(raw))
+
+    def testFinishKeepsDetailForTake(self):
+        self.finish('testostertests.itDoesExist.TestC', 0)
+        generation = self.screen.summary.tree['testostertests.itDoesExist.TestC'].generation
+        detail = self.prefetcher.take('testostertests.itDoesExist.TestC', generation)
+        self.assert_(detail is not None)
+        expected = ['test_errs']
+        actual = detail.names
+        self.assertEqual(expected, actual)
+
+    def testTakeOnlyOnce(self):
+        self.finish('testostertests.itDoesExist.TestC', 0)
+        generation = self.screen.summary.tree['testostertests.itDoesExist.TestC'].generation
+        self.prefetcher.take('testostertests.itDoesExist.TestC', generation)
+        expected = None
+        actual = self.prefetcher.take('testostertests.itDoesExist.TestC', generation)
+        self.assertEqual(expected, actual)
+
+    def testTakeAfterRerunIsNone(self):
+        self.finish('testostertests.itDoesExist.TestC', 0)
+        generation = self.screen.summary.tree['testostertests.itDoesExist.TestC'].generation
+        expected = None
+        actual = self.prefetcher.take('testostertests.itDoesExist.TestC', generation + 1)
+        self.assertEqual(expected, actual)
+
+    def testFinishSpendsBudget(self):
+        self.prefetcher.budget = 0.25
+        self.finish('testostertests.itDoesExist.TestC', 1.0)
+        waited = self.prefetcher.wait_until - time.time()
+        self.assert_(2.9 < waited <= 3.0, waited)
+
+    def testFinishBrokenSkipsIt(self):
+        self.select('testostertests.itDoesExist.TestC')
+        self.prefetcher.detail = Detail('testostertests.itDoesExist.TestC')
+        self.prefetcher.generation = \
+                            self.screen.summary.tree['testostertests.itDoesExist.TestC'].generation
+        self.prefetcher.finish(Proc('Traceback (most recent call last):'))
+        expected = 'testostertests.itDoesExist.TestE'
+        actual = self.prefetcher.pick()
+        self.assertEqual(expected, actual)
@@ -0,0 +1,70 @@
+import os
+from curses import ascii
+
+from testosterone.interactive.detail import Detail
+from testosterone.interactive.loop import EventLoop
+from testosterone.interactive.screens.detail import DetailScreen
+from testosterone.interactive.screens.summary import SummaryScreen
+from testosterone.interactive.utils import ScrollArea
+from testosterone.tests.interactive.prefetch import ROWS
+from testosterone.tests.utils import reportersTestCase
+
+
+class Interface:
+    """Stand in for a CursesInterface.
+    """
+
+    win = colors = blocks = None
+    module = 'testostertests'
+    stopwords = ()
+    memory = False
+    rerun_failures = 0
+    seed = None
+
+    def __init__(self, loop):
+        self.loop = loop
+
+
+class Job:
+    """Stand in for a Job in flight.
+    """
+
+    cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Summary(reportersTestCase):
+
+    def setUpUp(self):
+        self.stdin = os.pipe()
+        self.loop = EventLoop(self.stdin[0])
+        self.screen = SummaryScreen(Interface(self.loop))
+        self.screen.summary._add_names(set([ 'testostertests'
+                                             , 'testostertests.itDoesExist'
+                                              ] + [r[0] for r in ROWS]))
+        for name, stats in ROWS:
+            self.screen.summary._record(name, stats)
+        self.screen.listing = ScrollArea(10, len(self.screen.summary), 0)
+        self.screen.draw_content = lambda: None
+        self.screen.job = Job()
+        self.screen.target = 'testostertests'
+
+    def tearDown(self):
+        self.screen.prefetcher.cancel()
+        self.screen.summary.close()
+        self.loop.close()
+        for fd in self.stdin:
+            os.close(fd)
+        reportersTestCase.tearDown(self)
+
+    def testEnterOnRecalledDetailLeavesJobRunning(self):
+        job = self.screen.job
+        detail = Detail('testostertests.itDoesExist.TestA')
+        self.screen.recall = lambda name: detail
+        self.screen.selected = 'testostertests.itDoesExist.TestA'
+        next_screen = self.screen.react(ascii.LF)
+        self.assert_(isinstance(next_screen, DetailScreen))
+        self.assert_(self.screen.job is job)
+        self.assert_(not job.cancelled)
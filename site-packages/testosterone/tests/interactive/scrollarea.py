@@ -129,6 +129,61 @@ class TwoAndAHalfPageListing(unittest.TestCase):
         self.assertRaises(DoneScrolling, self.area.scroll, -1000)
 
 
+    # jump
+    # ====
+
+    def testJumpWithinViewport(self):
+        self.area.jump(5)
+        expected = (20, 5, 50, 0, 20, 5, range(3,12))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testJumpBelowViewport(self):
+        self.area.jump(30)
+        expected = (20, 19, 50, 11, 31, 30, range(7,16))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testJumpBelowViewportThenAbove(self):
+        self.area.jump(30)
+        self.area.jump(2)
+        expected = (20, 0, 50, 2, 22, 2, range(3,12))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testJumpToLastItem(self):
+        self.area.jump(49)
+        expected = (20, 19, 50, 30, 50, 49, range(15,23))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testJumpPastEdgeOfListTriggersRefusal(self):
+        self.area.refuse = refuse_raise
+        self.assertRaises(DoneScrolling, self.area.jump, 50)
+        expected = (20, 19, 50, 30, 50, 49, range(15,23))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testJumpPercent(self):
+        self.area.jump_percent(50)
+        expected = (20, 19, 50, 6, 26, 25, range(5,14))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testJumpPercentTop(self):
+        self.area.scroll(30)
+        self.area.jump_percent(0)
+        expected = (20, 0, 50, 0, 20, 0, range(3,12))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testJumpPercentBottom(self):
+        self.area.jump_percent(100)
+        expected = (20, 19, 50, 30, 50, 49, range(15,23))
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+
     # page_down
     # =========
 
@@ -358,6 +413,45 @@ class EmptyPage(unittest.TestCase):
     def testEnd(self):
         self.assertRaises(DoneScrolling, self.area.end)
 
+    def testJump(self):
+        self.assertRaises(DoneScrolling, self.area.jump, 0)
+
+    def testJumpPercent(self):
+        self.assertRaises(DoneScrolling, self.area.jump_percent, 50)
+
+
+
+class HugeListing(unittest.TestCase):
+
+    def setUp(self):
+        self.area = ScrollArea(20, 200000, 3)
+        self.area.refuse = refuse_raise
+
+    def testIterationIsOnlyTheViewport(self):
+        self.area.jump(100000)
+        expected = [(i, i-99981+3) for i in range(99981, 100001)]
+        actual = list(self.area)
+        self.assertEqual(expected, actual)
+
+    def testLen(self):
+        self.area.jump_percent(100)
+        expected = 20
+        actual = len(self.area)
+        self.assertEqual(expected, actual)
+
+    def testScrollIsComputedInOneStep(self):
+        self.area.scroll(150000)
+        expected = (20, 19, 200000, 149981, 150001, 150000, [17])
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
+    def testMoveCursor(self):
+        self.area.jump(100000)
+        self.area.move_cursor(3)
+        expected = (20, 3, 200000, 99981, 100001, 99984, [12])
+        actual = self.area.stat()
+        self.assertEqual(expected, actual)
+
 
 
 class ExactlyOneFullPage(unittest.TestCase):
@@ -0,0 +1,151 @@
+import unittest
+
+from testosterone.interactive.search import Failures, View
+from testosterone.interactive.tree import Tree
+
+
+NAMES = [ 'pkg'
+        , 'pkg.mod'
+        , 'pkg.mod.TestCase'
+        , 'pkg.mod.TestFoo'
+        , 'pkg.other'
+        , 'pkg.other.TestCase'
+        , 'pkg.sub'
+        , 'pkg.sub.mod'
+        , 'pkg.sub.mod.TestBar'
+         ]
+
+
+class Basics(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = Tree()
+        for name in NAMES:
+            self.tree.add(name)
+
+    def view(self, query):
+        view = View(self.tree, query)
+        while view.extend(2):
+            pass
+        return view
+
+
+    # Index
+    # =====
+
+    def testMatchSubstring(self):
+        expected = ['testbar', 'testcase', 'testfoo']
+        actual = sorted(self.tree.index.match('est'))
+        self.assertEqual(expected, actual)
+
+    def testMatchIsCaseInsensitive(self):
+        expected = ['testfoo']
+        actual = self.tree.index.match('FOO')
+        self.assertEqual(expected, actual)
+
+    def testMatchFallsBackToFuzzy(self):
+        expected = ['testbar']
+        actual = self.tree.index.match('tbr')
+        self.assertEqual(expected, actual)
+
+    def testMatchNarrowsThenWidens(self):
+        self.tree.index.match('t')
+        self.tree.index.match('te')
+        expected = ['mod', 'other', 'testfoo']
+        actual = sorted(self.tree.index.match('o'))
+        self.assertEqual(expected, actual)
+
+    def testMatchSeesNewComponents(self):
+        self.tree.index.match('test')
+        self.tree.add('pkg.mod.TestBaz')
+        expected = ['testbar', 'testbaz']
+        actual = sorted(self.tree.index.match('testba'))
+        self.assertEqual(expected, actual)
+
+
+    # View
+    # ====
+
+    def testViewShowsAncestors(self):
+        expected = ['pkg', 'pkg.mod', 'pkg.mod.TestFoo']
+        actual = self.view('foo').names
+        self.assertEqual(expected, actual)
+
+    def testViewShowsDescendants(self):
+        expected = ['pkg', 'pkg.sub', 'pkg.sub.mod', 'pkg.sub.mod.TestBar']
+        actual = self.view('sub').names
+        self.assertEqual(expected, actual)
+
+    def testViewIsSorted(self):
+        expected = [ 'pkg'
+                   , 'pkg.mod'
+                   , 'pkg.mod.TestCase'
+                   , 'pkg.mod.TestFoo'
+                   , 'pkg.other'
+                   , 'pkg.other.TestCase'
+                   , 'pkg.sub'
+                   , 'pkg.sub.mod'
+                   , 'pkg.sub.mod.TestBar'
+                    ]
+        actual = self.view('test').names
+        self.assertEqual(expected, actual)
+
+    def testViewIgnoresCollapsed(self):
+        self.tree['pkg.sub'].expanded = False
+        expected = ['pkg', 'pkg.sub', 'pkg.sub.mod', 'pkg.sub.mod.TestBar']
+        actual = self.view('bar').names
+        self.assertEqual(expected, actual)
+
+    def testViewNoMatches(self):
+        view = self.view('xyzzy')
+        expected = ([], True)
+        actual = (view.names, view.done)
+        self.assertEqual(expected, actual)
+
+    def testViewIsComputedInChunks(self):
+        view = View(self.tree, 'test')
+        self.assert_(view.extend(4))
+        expected = ['pkg', 'pkg.mod', 'pkg.mod.TestCase', 'pkg.mod.TestFoo']
+        actual = view.names
+        self.assertEqual(expected, actual)
+        self.assert_(not view.done)
+
+    def testFailures(self):
+        self.tree.record('pkg.mod.TestFoo', 1, 0, 1, 1, 0.0)
+        self.tree.record('pkg.sub.mod.TestBar', 0, 1, 1, 1, 0.0)
+        self.tree.record('pkg.other.TestCase', 0, 0, 1, 1, 0.0)
+        expected = [ 'pkg'
+                   , 'pkg.mod'
+                   , 'pkg.mod.TestFoo'
+                   , 'pkg.sub'
+                   , 'pkg.sub.mod'
+                   , 'pkg.sub.mod.TestBar'
+                    ]
+        actual = Failures(self.tree).names
+        self.assertEqual(expected, actual)
+
+    def testFailuresNone(self):
+        view = Failures(self.tree)
+        expected = ([], True, False)
+        actual = (view.names, view.done, view.extend())
+        self.assertEqual(expected, actual)
+
+    def testViewIndex(self):
+        view = self.view('other')
+        expected = 2
+        actual = view.index('pkg.other.TestCase')
+        self.assertEqual(expected, actual)
+        self.assertRaises(ValueError, view.index, 'pkg.mod')
+
+
+class Streaming(Basics):
+    """Run the same tests with View walking the whole tree as for many hits.
+    """
+
+    def setUp(self):
+        Basics.setUp(self)
+        self.sparse = View.sparse
+        View.sparse = -1
+
+    def tearDown(self):
+        View.sparse = self.sparse
@@ -0,0 +1,155 @@
+import unittest
+
+from testosterone.interactive.tree import Node, Tree
+
+
+NAMES = [ 'pkg'
+        , 'pkg.mod'
+        , 'pkg.mod.TestCase'
+        , 'pkg.mod.TestCase2'
+        , 'pkg.mod_b'
+        , 'pkg.mod_b.TestCase'
+        , 'pkg.sub'
+        , 'pkg.sub.mod'
+        , 'pkg.sub.mod.TestCase'
+         ]
+
+
+class Basics(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = Tree()
+        for name in NAMES:
+            self.tree.add(name)
+
+    def testWalkIsSorted(self):
+        expected = NAMES
+        actual = list(self.tree.walk())
+        self.assertEqual(expected, actual)
+
+    def testNodesAreCompact(self):
+        node = self.tree['pkg.mod.TestCase']
+        self.assert_(not hasattr(node, '__dict__'))
+        self.assertRaises(AttributeError, setattr, node, 'foo', 1)
+
+    def testPartsAreInterned(self):
+        a = self.tree['pkg.mod.TestCase'].part
+        b = self.tree['pkg.mod_b.TestCase'].part
+        self.assert_(a is b)
+
+    def testAddIsIdempotent(self):
+        node = self.tree['pkg.mod']
+        self.assert_(self.tree.add('pkg.mod') is node)
+        expected = len(NAMES)
+        actual = len(self.tree)
+        self.assertEqual(expected, actual)
+
+    def testKidsAreSorted(self):
+        self.tree.add('pkg.aardvark')
+        expected = ['aardvark', 'mod', 'mod_b', 'sub']
+        actual = self.tree['pkg'].kids
+        self.assertEqual(expected, actual)
+
+    def testParentIsNearestAncestor(self):
+        self.tree.add('other.deeply.nested.TestCase')
+        expected = self.tree.root
+        actual = self.tree['other.deeply.nested.TestCase'].parent
+        self.assert_(expected is actual)
+
+    def testWalkSkipsCollapsed(self):
+        self.tree['pkg.mod'].expanded = False
+        expected = [n for n in NAMES if not n.startswith('pkg.mod.')]
+        actual = list(self.tree.walk())
+        self.assertEqual(expected, actual)
+
+    def testWalkSubtree(self):
+        expected = ['pkg.sub.mod', 'pkg.sub.mod.TestCase']
+        actual = list(self.tree.walk(self.tree['pkg.sub']))
+        self.assertEqual(expected, actual)
+
+    def testWalkCollapsedSubtree(self):
+        self.tree['pkg.sub'].expanded = False
+        expected = []
+        actual = list(self.tree.walk(self.tree['pkg.sub']))
+        self.assertEqual(expected, actual)
+
+    def testIsVisible(self):
+        self.tree['pkg.sub'].expanded = False
+        self.assert_(self.tree.is_visible('pkg.sub'))
+        self.assert_(not self.tree.is_visible('pkg.sub.mod'))
+        self.assert_(not self.tree.is_visible('pkg.sub.mod.TestCase'))
+        self.assert_(self.tree.is_visible('pkg.mod.TestCase'))
+
+
+    # record
+    # ======
+
+    def testRecordRollsUp(self):
+        self.tree.record('pkg.mod.TestCase', 1, 0, 3, 3, 0.5)
+        self.tree.record('pkg.sub.mod.TestCase', 0, 2, 4, 4, 1.0)
+        node = self.tree['pkg']
+        expected = (1, 2, 7, 7, 1.5)
+        actual = (node.fail, node.err, node.all, node.ran, node.seconds)
+        self.assertEqual(expected, actual)
+
+    def testRecordAgainReplaces(self):
+        self.tree.record('pkg.mod.TestCase', 1, 0, 3, 3, 0.5)
+        self.tree.record('pkg.mod.TestCase', 0, 0, 3, 3, 0.25)
+        node = self.tree['pkg.mod']
+        expected = (0, 0, 3, 3, 0.25)
+        actual = (node.fail, node.err, node.all, node.ran, node.seconds)
+        self.assertEqual(expected, actual)
+
+    def testRecordLeavesSiblingsAlone(self):
+        self.tree.record('pkg.mod.TestCase', 1, 0, 3, 3, 0.5)
+        node = self.tree['pkg.mod_b']
+        expected = (0, 0, 0, 0, 0.0)
+        actual = (node.fail, node.err, node.all, node.ran, node.seconds)
+        self.assertEqual(expected, actual)
+
+    def testRecordReachesRoot(self):
+        self.tree.record('pkg.mod.TestCase', 1, 0, 3, 3, 0.5)
+        self.tree.record('pkg.mod_b.TestCase', 0, 0, 2, 0, 0.0)
+        node = self.tree.root
+        expected = (1, 0, 5, 3)
+        actual = (node.fail, node.err, node.all, node.ran)
+        self.assertEqual(expected, actual)
+
+
+    # failure index
+    # =============
+
+    def testFailingIsSorted(self):
+        self.tree.record('pkg.sub.mod.TestCase', 0, 1, 1, 1, 0.0)
+        self.tree.record('pkg.mod.TestCase', 1, 0, 3, 3, 0.0)
+        self.tree.record('pkg.mod_b.TestCase', 0, 0, 3, 3, 0.0)
+        expected = ['pkg.mod.TestCase', 'pkg.sub.mod.TestCase']
+        actual = self.tree.failing
+        self.assertEqual(expected, actual)
+
+    def testFailingForgetsFixed(self):
+        self.tree.record('pkg.mod.TestCase', 1, 0, 3, 3, 0.0)
+        self.tree.record('pkg.mod.TestCase', 0, 1, 3, 3, 0.0)
+        self.assertEqual(['pkg.mod.TestCase'], self.tree.failing)
+        self.tree.record('pkg.mod.TestCase', 0, 0, 3, 3, 0.0)
+        self.assertEqual([], self.tree.failing)
+
+    def testNextFailing(self):
+        self.tree.record('pkg.mod.TestCase2', 1, 0, 3, 3, 0.0)
+        self.tree.record('pkg.sub.mod.TestCase', 1, 0, 3, 3, 0.0)
+        expected = ['pkg.mod.TestCase2', 'pkg.sub.mod.TestCase', None]
+        actual = [ self.tree.next_failing('pkg')
+                 , self.tree.next_failing('pkg.mod.TestCase2')
+                 , self.tree.next_failing('pkg.sub.mod.TestCase')
+                  ]
+        self.assertEqual(expected, actual)
+
+    def testPreviousFailing(self):
+        self.tree.record('pkg.mod.TestCase2', 1, 0, 3, 3, 0.0)
+        self.tree.record('pkg.sub.mod.TestCase', 1, 0, 3, 3, 0.0)
+        expected = ['pkg.mod.TestCase2', 'pkg.mod.TestCase2', None]
+        actual = [ self.tree.previous_failing('pkg.sub')
+                 , self.tree.previous_failing('pkg.sub.mod.TestCase')
+                 , self.tree.previous_failing('pkg.mod.TestCase2')
+                  ]
+        self.assertEqual(expected, actual)
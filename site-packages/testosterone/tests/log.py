@@ -0,0 +1,147 @@
+import logging
+import os
+import Queue
+import shutil
+import stat
+import tempfile
+import threading
+import unittest
+
+from testosterone import log
+from testosterone.log import NULL_SPAN, QueueListener, span
+
+
+class Collect(logging.Handler):
+    """A handler that keeps messages, and the names of the threads it ran on.
+    """
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+        self.threads = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+        self.threads.append(threading.currentThread().getName())
+
+
+class Queued(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = Queue.Queue()
+        self.target = Collect()
+        self.listener = QueueListener(self.queue, self.target)
+        self.logger = logging.getLogger('testosterone.tests.log')
+        self.logger.setLevel(logging.DEBUG)
+        self.listener.attach(self.logger)
+
+    def tearDown(self):
+        self.listener.stop()
+
+    def testRecordsArriveInOrder(self):
+        self.listener.start()
+        for i in range(100):
+            self.logger.debug("record %d", i)
+        self.listener.stop()
+        expected = ["record %d" % i for i in range(100)]
+        actual = self.target.messages
+        self.assertEqual(expected, actual)
+
+    def testRecordsAreHandledOnTheLogThread(self):
+        self.listener.start()
+        self.logger.debug("hi")
+        self.listener.stop()
+        expected = ['log']
+        actual = self.target.threads
+        self.assertEqual(expected, actual)
+
+    def testMessageIsFormattedWhenLogged(self):
+        names = ['foo']
+        self.logger.debug("names: %s", names)
+        names.append('bar')
+        self.listener.start()
+        self.listener.stop()
+        expected = ["names: ['foo']"]
+        actual = self.target.messages
+        self.assertEqual(expected, actual)
+
+    def testFullQueueDrops(self):
+        self.listener.stop() # detach
+        listener = QueueListener(Queue.Queue(1), self.target)
+        listener.attach(self.logger)
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.debug("kept")
+        self.logger.debug("dropped")
+        expected = 1
+        actual = listener.attached[0][1].dropped
+        self.assertEqual(expected, actual)
+        listener.stop()
+
+    def testStopDetaches(self):
+        self.listener.start()
+        self.listener.stop()
+        self.logger.debug("after")
+        expected = []
+        actual = self.target.messages
+        self.assertEqual(expected, actual)
+
+
+class Spans(unittest.TestCase):
+
+    def setUp(self):
+        self.target = Collect()
+        self.logger = logging.getLogger('testosterone.tests.log.spans')
+        self.logger.addHandler(self.target)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.target)
+        self.logger.setLevel(logging.NOTSET)
+
+    def testSpanLogsNameTimeAndFields(self):
+        self.logger.setLevel(logging.DEBUG)
+        span(self.logger, 'parse', module='foo').end(tests=3)
+        message = self.target.messages[0]
+        self.assert_(message.startswith('span=parse ms='), message)
+        self.assert_(message.endswith(' module=foo tests=3'), message)
+
+    def testSpanWhenLoggingIsOffIsNull(self):
+        self.logger.setLevel(logging.INFO)
+        self.assert_(span(self.logger, 'parse') is NULL_SPAN)
+        NULL_SPAN.end(tests=3)
+        expected = []
+        actual = self.target.messages
+        self.assertEqual(expected, actual)
+
+
+class Files(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def testDefaultPathIsPerUserAndSession(self):
+        path = log.default_path()
+        directory = os.path.dirname(path)
+        self.assert_(str(os.getpid()) in os.path.basename(path))
+        expected = (0700, os.getuid())
+        st = os.stat(directory)
+        actual = (stat.S_IMODE(st.st_mode), st.st_uid)
+        self.assertEqual(expected, actual)
+
+    def testStartRotates(self):
+        path = os.path.join(self.tmp, 'test.log')
+        listener = log.start(path, max_bytes=500, backups=1)
+        for i in range(20):
+            log.logger.debug("line %d", i)
+        listener.stop()
+        expected = ['test.log', 'test.log.1']
+        actual = sorted(os.listdir(self.tmp))
+        self.assertEqual(expected, actual)
+        self.assert_('line 19' in open(path).read())
+
+    def testStopTurnsLoggingOff(self):
+        listener = log.start(os.path.join(self.tmp, 'test.log'))
+        listener.stop()
+        self.assert_(not log.logger.isEnabledFor(logging.DEBUG))
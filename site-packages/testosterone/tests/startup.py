@@ -0,0 +1,84 @@
+"""Guard, and measure, what it costs to start testosterone.
+
+We are started once for the curses interface, and then again in a child process
+for every refresh, so startup time adds up. The tests guard what gets imported
+at startup; timing depends on the machine, so it is left to the benchmark you
+get by running this module as a script (or 'make startup').
+
+"""
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+import testosterone
+
+
+SITE_PACKAGES = os.path.dirname(os.path.dirname(testosterone.__file__))
+
+HEAVY = ( 'curses'
+        , 'logging'
+        , 'testosterone.cli.reporters'
+        , 'testosterone.interactive'
+        , 'unittest'
+         )
+
+
+def child(statement):
+    """Given a Python statement, run it in a fresh interpreter; return stdout.
+    """
+    environ = os.environ.copy()
+    environ['PYTHONPATH'] = SITE_PACKAGES
+    proc = subprocess.Popen( [sys.executable, '-c', statement]
+                           , env=environ
+                           , stdout=subprocess.PIPE
+                            )
+    return proc.communicate()[0]
+
+def loaded(statement):
+    """Given a Python statement, return the heavy modules it loads.
+    """
+    out = child(statement + "; import sys; print ' '.join(sys.modules)")
+    modules = out.split()
+    return [m for m in HEAVY if m in modules]
+
+def startup(statement, n=10):
+    """Given a Python statement, return the best time of n fresh runs of it.
+    """
+    best = None
+    for i in range(n):
+        start = time.time()
+        child(statement)
+        elapsed = time.time() - start
+        if (best is None) or (elapsed < best):
+            best = elapsed
+    return best
+
+
+class Startup(unittest.TestCase):
+
+    def testImportIsCheap(self):
+        expected = []
+        actual = loaded("import testosterone")
+        self.assertEqual(expected, actual)
+
+    def testImportMainIsCheap(self):
+        expected = []
+        actual = loaded("import testosterone.cli.main")
+        self.assertEqual(expected, actual)
+
+
+if __name__ == '__main__':
+    base = startup("pass")
+    print "python -c pass                     %5.1f ms" % (base * 1000)
+    for statement in ( "import testosterone"
+                     , "import testosterone.cli.main"
+                     , "import testosterone.cli.reporters"
+                     , "import testosterone.interactive"
+                      ):
+        elapsed = startup(statement)
+        print "%-34s %5.1f ms (+%.1f)" % ( statement
+                                         , elapsed * 1000
+                                         , (elapsed - base) * 1000
+                                          )